@@ -0,0 +1,133 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from excel_export import ExportJob
+from export_worker import DATABASE_TITLES
+
+# The full business export: every sheet of the sales, purchase and service
+# exports (parties, line items and payments) in one run, read by worker
+# processes so the app's own threads are left alone. Each database is read
+# inside a single read transaction, so its sheets are one consistent
+# snapshot; WAL lets bills keep being written meanwhile.
+#
+# 'csv' writes a CSV file per sheet into a new folder, one worker per
+# database running side by side; this is the fast format. 'xlsx' writes a
+# single workbook, which has to come from one process and is bound by
+# openpyxl's speed.
+#
+# Workers run export_worker.py as a script rather than through
+# multiprocessing, whose 'spawn' start would import the app's main module
+# (and with it every window) into each of them.
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "export_worker.py")
+POLL_SECONDS = 0.1
+
+
+def _start_worker(args):
+    # Returns (process, reader, progress, stderr file); progress is
+    # [done, total], kept current from the worker's stdout by the reader
+    errors = tempfile.TemporaryFile()
+    try:
+        process = subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT, *args],
+            stdout=subprocess.PIPE, stderr=errors, text=True,
+            creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0))
+    except BaseException:
+        errors.close()
+        raise
+    progress = [0, 0]
+
+    def read():
+        for line in process.stdout:
+            key, _, value = line.partition(" ")
+            if key in ("done", "total"):
+                progress[key == "total"] = int(value)
+
+    reader = threading.Thread(target=read, name="export-progress", daemon=True)
+    reader.start()
+    return process, reader, progress, errors
+
+
+def _worker_error(errors):
+    errors.seek(0)
+    lines = errors.read().decode(errors="replace").strip().splitlines()
+    return lines[-1] if lines else "worker process failed"
+
+
+def export_business(folder, fmt="csv", job=None):
+    """
+    Exports all three databases into folder: a business_<time> folder of
+    CSV files for fmt 'csv' (sales_pending.csv, ...), or one
+    business_<time>.xlsx workbook for 'xlsx' (sheets 'Sales Pending', ...).
+    Returns the path written. Progress and cancelling go through job as with
+    excel_export.export_workbook.
+    """
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if fmt == "csv":
+        target = os.path.join(folder, f"business_{stamp}")
+        os.makedirs(target)
+        commands = [["csv", target, db_name] for db_name in DATABASE_TITLES]
+    elif fmt == "xlsx":
+        try:
+            import openpyxl  # noqa: F401  (checked before the worker starts)
+        except ImportError:
+            raise RuntimeError("Excel export needs the openpyxl package (pip install openpyxl)")
+        target = os.path.join(folder, f"business_{stamp}.xlsx")
+        commands = [["xlsx", target, *DATABASE_TITLES]]
+    else:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    job = job or ExportJob()
+    workers = []
+    try:
+        for args in commands:
+            workers.append(_start_worker(args))
+        running = True
+        while running:
+            job.check_cancelled()
+            running = False
+            for process, _, _, errors in workers:
+                code = process.poll()
+                if code is None:
+                    running = True
+                elif code:
+                    # The first failure stops the others straight away
+                    raise RuntimeError(_worker_error(errors))
+            job.done = sum(progress[0] for _, _, progress, _ in workers)
+            job.total = sum(progress[1] for _, _, progress, _ in workers)
+            if running:
+                time.sleep(POLL_SECONDS)
+        for _, reader, _, _ in workers:
+            reader.join()
+        job.done = sum(progress[0] for _, _, progress, _ in workers)
+        job.total = sum(progress[1] for _, _, progress, _ in workers)
+    except BaseException:
+        for process, _, _, _ in workers:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+        if os.path.isdir(target):
+            shutil.rmtree(target, ignore_errors=True)
+        elif os.path.exists(target + ".part"):
+            os.remove(target + ".part")
+        raise
+    finally:
+        for process, reader, _, errors in workers:
+            reader.join()
+            process.stdout.close()
+            errors.close()
+    return target
+
+
+if __name__ == "__main__":
+    # python business_export.py [folder] [--xlsx]
+    args = [a for a in sys.argv[1:] if a != "--xlsx"]
+    out_folder = args[0] if args else os.path.join(os.path.expanduser("~"), "Downloads")
+    started = time.perf_counter()
+    result = export_business(out_folder, "xlsx" if "--xlsx" in sys.argv else "csv")
+    print(f"Exported to {result} in {time.perf_counter() - started:.1f}s")
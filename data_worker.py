@@ -0,0 +1,168 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from db_pool import close_thread_connections
+
+# Runs backend queries off the Tk main thread. Workers never touch widgets:
+# finished jobs go onto a queue that the main thread drains with after(),
+# and only then are the callbacks run. Each worker thread gets its own
+# pooled database connections, closed by shutdown().
+#
+# Jobs submitted with a key supersede any earlier job with the same key
+# (e.g. the previous autocomplete lookup): the earlier job is cancelled if
+# it has not started yet, and its result is dropped if it has.
+
+MAX_WORKERS = 2
+POLL_MS = 30
+
+_executor = None
+_results = queue.Queue()
+_lock = threading.Lock()
+_latest = {}        # key -> generation of the newest job submitted for it
+_pending = {}       # key -> Future of that job
+_queued = set()     # Futures not yet finished, so shutdown() can cancel them
+_generation = 0
+_outstanding = 0    # jobs whose result has not been delivered yet
+_poll_after = None  # (root, after id) while the drain loop is scheduled
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="data-worker")
+    return _executor
+
+
+def _run(job, func, args, kwargs):
+    try:
+        _results.put((job, True, func(*args, **kwargs)))
+    except Exception as e:
+        _results.put((job, False, e))
+
+
+def submit(widget, func, *args, on_result=None, on_error=None, key=None, **kwargs):
+    """
+    Runs func(*args, **kwargs) on a worker thread. When it finishes,
+    on_result(result) or on_error(exception) is called on the Tk main thread,
+    provided widget still exists and no newer job with the same key was
+    submitted. Must be called from the main thread. Returns the job's key
+    generation, usable with is_current().
+    """
+    global _generation, _outstanding
+    with _lock:
+        _generation += 1
+        generation = _generation
+        if key is not None:
+            _latest[key] = generation
+            previous = _pending.pop(key, None)
+            if previous is not None and previous.cancel():
+                _outstanding -= 1
+        _outstanding += 1
+    job = {"key": key, "generation": generation, "widget": widget,
+           "on_result": on_result, "on_error": on_error}
+    future = _get_executor().submit(_run, job, func, args, kwargs)
+    with _lock:
+        _queued.add(future)
+    future.add_done_callback(_forget)
+    if key is not None:
+        with _lock:
+            if _latest.get(key) == generation:
+                _pending[key] = future
+    _schedule_drain(widget)
+    return generation
+
+
+def _forget(future):
+    with _lock:
+        _queued.discard(future)
+
+
+def cancel(key):
+    """Drops the pending job for key; its callbacks will not run."""
+    global _outstanding
+    with _lock:
+        _latest.pop(key, None)
+        future = _pending.pop(key, None)
+        if future is not None and future.cancel():
+            _outstanding -= 1
+
+
+def is_current(key, generation):
+    with _lock:
+        return _latest.get(key) == generation
+
+
+def _schedule_drain(widget):
+    global _poll_after
+    if _poll_after is not None:
+        return
+    root = widget.nametowidget(".")
+    _poll_after = (root, root.after(POLL_MS, _drain))
+
+
+def _drain():
+    global _poll_after, _outstanding
+    root = _poll_after[0]
+    _poll_after = None
+    while True:
+        try:
+            job, ok, value = _results.get_nowait()
+        except queue.Empty:
+            break
+        key = job["key"]
+        with _lock:
+            _outstanding -= 1
+            if key is not None:
+                if _latest.get(key) != job["generation"]:
+                    continue
+                _pending.pop(key, None)
+                del _latest[key]
+        try:
+            if not job["widget"].winfo_exists():
+                continue
+        except Exception:
+            continue
+        callback = job["on_result"] if ok else job["on_error"]
+        try:
+            if callback is not None:
+                callback(value)
+            elif not ok:
+                print(f"Background query failed: {value}")
+        except Exception as e:
+            print(f"Error delivering background result: {e}")
+    with _lock:
+        busy = _outstanding > 0
+    if busy and _poll_after is None:
+        try:
+            _poll_after = (root, root.after(POLL_MS, _drain))
+        except Exception:
+            pass
+
+
+def shutdown():
+    """
+    Cancels queued jobs, waits for the running ones to finish and closes
+    every worker thread's pooled connections.
+    """
+    global _executor
+    if _executor is None:
+        return
+    executor, _executor = _executor, None
+    with _lock:
+        queued = list(_queued)
+    for future in queued:
+        future.cancel()
+    # One closer per worker: each holds its thread at the barrier until all
+    # have arrived, so no thread picks up two of them
+    barrier = threading.Barrier(MAX_WORKERS)
+
+    def close():
+        try:
+            barrier.wait(timeout=5)
+        except threading.BrokenBarrierError:
+            pass
+        close_thread_connections()
+
+    for _ in range(MAX_WORKERS):
+        executor.submit(close)
+    executor.shutdown(wait=True)
@@ -0,0 +1,78 @@
+# Product catalog. Each database keeps a 'product' table with one row per
+# item, keyed by item_key: the trimmed, lower-case name that stock has always
+# grouped by. item_key is therefore the same in every database, while
+# product_id is the integer key that lines in this database point at.
+# Triggers file every new or renamed line under its product and keep the
+# latest price and description, so readers join on product_id or read the
+# catalog instead of normalizing free text on every query.
+
+PRODUCT_TABLE_SQL = """
+        CREATE TABLE IF NOT EXISTS product (
+            product_id INTEGER PRIMARY KEY,
+            item_key TEXT NOT NULL UNIQUE COLLATE NOCASE,
+            display_name TEXT NOT NULL,
+            last_purchase_price REAL,
+            last_sale_price REAL,
+            description TEXT
+        )"""
+
+
+def _upsert(table, item_col, price_col, price_field):
+    # Trigger body filing the NEW line under its product
+    key = f"LOWER(TRIM(NEW.{item_col}))"
+    return f"""
+            INSERT INTO product (item_key, display_name, {price_field}, description)
+            VALUES ({key}, TRIM(NEW.{item_col}), NEW.{price_col}, NEW.description)
+            ON CONFLICT(item_key) DO UPDATE SET
+                {price_field} = excluded.{price_field},
+                description = COALESCE(NULLIF(excluded.description, ''), description);
+            UPDATE {table}
+            SET product_id = (SELECT product_id FROM product WHERE item_key = {key})
+            WHERE id = NEW.id;"""
+
+
+def catalog_sql(table, item_col, price_col, price_field):
+    """
+    Returns the statements that add product_id to the line table, keep it
+    filled by triggers and fill the catalog from the lines already there.
+    price_field is the catalog column this table's price goes to
+    ("last_sale_price" or "last_purchase_price").
+    """
+    upsert = _upsert(table, item_col, price_col, price_field)
+    return [
+        f"ALTER TABLE {table} ADD COLUMN product_id INTEGER REFERENCES product(product_id)",
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_product ON {table}(product_id)",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_catalog_insert AFTER INSERT ON {table}
+        BEGIN{upsert}
+        END""",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_catalog_update AFTER UPDATE OF {item_col} ON {table}
+        BEGIN{upsert}
+        END""",
+        # Oldest line first, so the latest price and description win
+        f"""
+        INSERT INTO product (item_key, display_name, {price_field}, description)
+        SELECT LOWER(TRIM({item_col})), TRIM({item_col}), {price_col}, description
+        FROM {table} WHERE TRUE ORDER BY id
+        ON CONFLICT(item_key) DO UPDATE SET
+            {price_field} = excluded.{price_field},
+            description = COALESCE(NULLIF(excluded.description, ''), description)""",
+        f"""
+        UPDATE {table}
+        SET product_id = (SELECT product_id FROM product WHERE item_key = LOWER(TRIM({table}.{item_col})))""",
+    ]
+
+
+def catalog_edit_sql(table, item_col, price_col, price_field):
+    """
+    Returns the statements that also file a line under its product again
+    when only its price or description is edited, not just its name.
+    """
+    return [
+        f"DROP TRIGGER IF EXISTS {table}_catalog_update",
+        f"""
+        CREATE TRIGGER {table}_catalog_update AFTER UPDATE OF {item_col}, {price_col}, description ON {table}
+        BEGIN{_upsert(table, item_col, price_col, price_field)}
+        END""",
+    ]
@@ -0,0 +1,54 @@
+from datetime import date, datetime, timedelta
+
+# Every date column in the three databases holds local time as
+# 'YYYY-MM-DD HH:MM:SS' text. That sorts in time order, so a day range is a
+# plain comparison on the stored column ("date >= '2024-05-01' AND
+# date < '2024-05-08'") that the date indexes can answer, where DATE(date) or
+# replace(date, ...) in a WHERE clause forces a scan of every row.
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def now():
+    """The current local time as stored in the databases."""
+    return datetime.now().strftime(DATE_FORMAT)
+
+
+def _day(value):
+    # Accepts 'YYYY-MM-DD' or 'YYYY/MM/DD', with or without a time
+    return date.fromisoformat(value[:10].replace("/", "-"))
+
+
+def day_range(column, from_day=None, to_day=None):
+    """
+    Returns (sql, params) selecting rows whose column falls on from_day
+    through to_day (both inclusive, either may be None), e.g.
+    ("p.date >= ? AND p.date < ?", ["2024-05-01", "2024-05-08"]).
+    sql is empty when neither day is given.
+    """
+    clauses, params = [], []
+    if from_day:
+        clauses.append(f"{column} >= ?")
+        params.append(_day(from_day).isoformat())
+    if to_day:
+        clauses.append(f"{column} < ?")
+        params.append((_day(to_day) + timedelta(days=1)).isoformat())
+    return " AND ".join(clauses), params
+
+
+def normalize_dates_sql(table, column="date"):
+    """
+    Returns the statements rewriting table.column into DATE_FORMAT:
+    'YYYY/MM/DD HH:MM:SS' (older service rows) gets dashes and a bare
+    'YYYY-MM-DD' (party header rows) gets a midnight time.
+    """
+    return [
+        f"""
+        UPDATE {table}
+        SET {column} = replace(substr({column}, 1, 10), '/', '-') || substr({column}, 11)
+        WHERE {column} GLOB '[0-9][0-9][0-9][0-9]/[0-9][0-9]/[0-9][0-9]*'""",
+        f"""
+        UPDATE {table}
+        SET {column} = {column} || ' 00:00:00'
+        WHERE {column} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'""",
+    ]
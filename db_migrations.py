@@ -0,0 +1,112 @@
+import sqlite3
+from contextlib import contextmanager
+from db_pool import get_connection
+
+# Each backend keeps its own list of migrations:
+#     [(version, description, [sql or callable(conn), ...]), ...]
+# A database records the last version applied in PRAGMA user_version, so
+# existing shop databases are upgraded in place the next time they open.
+
+
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def run_migrations(db_name, migrations):
+    """
+    Applies every migration newer than the database's user_version, each in
+    its own transaction. Returns the resulting schema version.
+    """
+    conn = get_connection(db_name)
+    version = get_schema_version(conn)
+    for target, description, steps in sorted(migrations, key=lambda m: m[0]):
+        if target <= version:
+            continue
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {int(target)}")
+            conn.commit()
+        except sqlite3.Error as e:
+            conn.rollback()
+            print(f"[{db_name}] migration {target} ({description}) failed: {e}")
+            raise
+        version = target
+        print(f"[{db_name}] migrated to schema version {target}: {description}")
+    return version
+
+
+def explain(conn, sql, params=()):
+    """Returns the detail lines of EXPLAIN QUERY PLAN for one query."""
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+
+
+@contextmanager
+def traced_statements(db_name):
+    """
+    Collects every statement run on the calling thread's db_name connection
+    inside the with block, with its parameters filled in:
+
+        with traced_statements("customer") as statements:
+            customer_backend.get_customer_by_phone("98...")
+    """
+    conn = get_connection(db_name)
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        yield statements
+    finally:
+        conn.set_trace_callback(None)
+
+
+def _scans_table(line, subqueries, first_rows):
+    # True for a plan line reading a whole table (or a whole index of one)
+    words = line.split()
+    if words[0] != "SCAN" or words[1] in subqueries or "VIRTUAL TABLE" in line or "CONSTANT ROW" in line:
+        return False
+    # With nothing to filter on, walking an index in order stops after LIMIT rows
+    return not (first_rows and " USING " in line and "INDEX" in line)
+
+
+def find_table_scans(db_name, statements):
+    """
+    Runs EXPLAIN QUERY PLAN on each query in statements (as collected by
+    traced_statements) and returns {statement: [plan lines]} for every one
+    that scans a table. Scans of the name index or of a subquery's own
+    result do not count, nor does reading the first rows along an index
+    (ORDER BY ... LIMIT with no WHERE).
+    """
+    conn = get_connection(db_name)
+    scans = {}
+    for sql in statements:
+        if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+            continue
+        plan = explain(conn, sql)
+        subqueries = {line.split()[-1] for line in plan if line.startswith(("MATERIALIZE ", "CO-ROUTINE "))}
+        words = sql.upper().split()
+        first_rows = "LIMIT" in words and "WHERE" not in words
+        if any(_scans_table(line, subqueries, first_rows) for line in plan):
+            scans[sql] = plan
+    return scans
+
+
+if __name__ == "__main__":
+    # python db_migrations.py [vacuum]
+    # Importing a backend migrates its database. The query plans of the
+    # backends' lookups are checked by tests/test_query_plans.py.
+    import sys
+    from db_name_search import vacuum
+    from outward import customer_backend  # noqa: F401
+    from inward import db_backend  # noqa: F401
+    from service import service_backend  # noqa: F401
+
+    for db_name, party in (("customer", "customer"), ("purchase", "purchaser"),
+                           ("service", "service_customer")):
+        if sys.argv[1:] == ["vacuum"]:
+            vacuum(db_name, party)
+            print(f"[{db_name}] vacuumed, name index rebuilt")
+        print(f"[{db_name}] schema version {get_schema_version(get_connection(db_name))}")
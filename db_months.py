@@ -0,0 +1,56 @@
+# Per-month change counters for the line item and payment tables, used by
+# the Parquet export to rewrite only the months that changed since its last
+# run, and by the product autocomplete to notice any edit to a line.
+# Triggers move a '<table>_month_<YYYY-MM>' counter in the sequence table on
+# every insert, update or delete of a row dated in that month (an update
+# that moves a row to another month moves both counters). Rows whose date is
+# not 'YYYY-MM-...' count under the month 'unknown'.
+
+MONTH_PATTERN = "[0-9][0-9][0-9][0-9]-[0-9][0-9]-*"
+
+
+def month_of(column):
+    """SQL for the 'YYYY-MM' month of a date column, or 'unknown'."""
+    return f"CASE WHEN {column} GLOB '{MONTH_PATTERN}' THEN substr({column}, 1, 7) ELSE 'unknown' END"
+
+
+def month_changes_sql(table):
+    """Returns the statements that seed and maintain table's month counters."""
+    def bump(row):
+        return f"""
+            INSERT INTO sequence (name, value) VALUES ('{table}_month_' || {month_of(row + '.date')}, 1)
+            ON CONFLICT(name) DO UPDATE SET value = value + 1;"""
+    return [
+        f"""
+        INSERT OR IGNORE INTO sequence (name, value)
+        SELECT '{table}_month_' || {month_of('date')}, 1 FROM {table} GROUP BY 1""",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_month_insert AFTER INSERT ON {table}
+        BEGIN{bump('NEW')}
+        END""",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_month_update AFTER UPDATE ON {table}
+        BEGIN{bump('OLD')}{bump('NEW')}
+        END""",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_month_delete AFTER DELETE ON {table}
+        BEGIN{bump('OLD')}
+        END""",
+    ]
+
+
+def month_changes(conn, table):
+    """Returns {month: change counter} for every month table has had rows in."""
+    prefix = f"{table}_month_"
+    rows = conn.execute("SELECT name, value FROM sequence WHERE name GLOB ?", (prefix + "*",))
+    return {name[len(prefix):]: value for name, value in rows}
+
+
+def change_count(conn, table):
+    """
+    Returns the sum of table's month counters, which moves on every insert,
+    update or delete of one of its rows.
+    """
+    row = conn.execute("SELECT TOTAL(value) FROM sequence WHERE name GLOB ?",
+                       (f"{table}_month_*",)).fetchone()
+    return int(row[0])
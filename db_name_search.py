@@ -0,0 +1,104 @@
+from db_pool import get_connection
+
+# Full-text name search for the party tables (customer, purchaser,
+# service_customer). Each gets an external-content FTS5 table over its name
+# and place, kept in sync by triggers, so a search reads the index instead of
+# running '%word%' over every row. Words are matched as prefixes of the words
+# in a name ("ram" finds "Ram Kumar" and "Sri Ramesh"), with prefix indexes for
+# the 1-3 letter stage of typing. Results are ranked with bm25, a name match
+# weighing more than a place match.
+#
+# The party tables are keyed by TEXT ids, so the index is keyed on their
+# implicit rowid, which VACUUM is free to renumber. Anything that vacuums a
+# database must rebuild its name index afterwards; vacuum() below does both,
+# and is what `python db_migrations.py vacuum` runs.
+
+NAME_WEIGHT = 10.0
+PLACE_WEIGHT = 1.0
+DEFAULT_LIMIT = 50
+
+
+def name_index_sql(table, name_col, place_col):
+    """
+    Returns the statements creating {table}_fts, its sync triggers, and
+    filling it from the rows already in table.
+    """
+    fts = f"{table}_fts"
+    insert_new = (f"INSERT INTO {fts} (rowid, {name_col}, {place_col}) "
+                  f"VALUES (NEW.rowid, NEW.{name_col}, NEW.{place_col});")
+    delete_old = (f"INSERT INTO {fts} ({fts}, rowid, {name_col}, {place_col}) "
+                  f"VALUES ('delete', OLD.rowid, OLD.{name_col}, OLD.{place_col});")
+    return [
+        f"""
+        CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {name_col}, {place_col},
+            content='{table}', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2', prefix='1 2 3'
+        )""",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table}
+        BEGIN {insert_new} END""",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table}
+        BEGIN {delete_old} END""",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {name_col}, {place_col} ON {table}
+        BEGIN {delete_old} {insert_new} END""",
+        rebuild_name_index_sql(table),
+    ]
+
+
+def rebuild_name_index_sql(table):
+    """Returns the statement refilling {table}_fts from the rows of table."""
+    return f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')"
+
+
+def vacuum(db_name, table):
+    """
+    VACUUMs db_name and then rebuilds the name index of its party table,
+    whose rowids the VACUUM may have renumbered.
+    """
+    conn = get_connection(db_name)
+    conn.execute("VACUUM")
+    with conn:
+        conn.execute(rebuild_name_index_sql(table))
+
+
+def match_expression(words, operator="OR"):
+    """
+    Builds an FTS5 query matching every word as a prefix, e.g.
+    ['ram', 'ku'] -> '"ram"* OR "ku"*'. Returns None if nothing is searchable.
+    """
+    terms = []
+    for word in words:
+        word = word.strip()
+        if word:
+            terms.append('"' + word.replace('"', '""') + '"*')
+    if not terms:
+        return None
+    return f" {operator} ".join(terms)
+
+
+def ranked_rows(c, table, columns, words, operator="OR", limit=DEFAULT_LIMIT):
+    """
+    Runs a ranked search of table's name index and returns the chosen
+    columns of the matching rows, best match first.
+    """
+    expression = match_expression(words, operator)
+    if expression is None:
+        return []
+    fts = f"{table}_fts"
+    # Rank inside the index first and only then fetch the winning rows
+    c.execute(f"""
+        SELECT {", ".join("t." + col for col in columns)}
+        FROM (
+            SELECT rowid, bm25({fts}, {NAME_WEIGHT}, {PLACE_WEIGHT}) AS score
+            FROM {fts}
+            WHERE {fts} MATCH ?
+            ORDER BY score
+            LIMIT ?
+        ) hit
+        JOIN {table} t ON t.rowid = hit.rowid
+        ORDER BY hit.score
+    """, (expression, limit))
+    return c.fetchall()
@@ -0,0 +1,60 @@
+# Keyset pagination for the general-view listings. A page ends at some
+# (date, id) row; the next page is the rows strictly past it in the listing
+# order, so every page is a range read on a (date) index (whose entries end
+# in the rowid) no matter how deep into the table it is, unlike OFFSET.
+
+DEFAULT_PAGE_SIZE = 200
+
+
+def keyset_page(date_col, id_col, after=None, order="recent"):
+    """
+    Returns (where_sql, params, order_sql) for one page of rows ordered by
+    (date_col, id_col): newest first for order 'recent', oldest first for
+    'oldest'. after is the (date, id) of the previous page's last row, or
+    None for the first page (where_sql is then empty).
+    """
+    if order == "recent":
+        direction, compare, bound = "DESC", "<", "<="
+    else:
+        direction, compare, bound = "ASC", ">", ">="
+    order_sql = f"ORDER BY {date_col} {direction}, {id_col} {direction}"
+    if after is None:
+        return "", [], order_sql
+    # The plain bound gives the index a range; the row value settles ties
+    where_sql = f"{date_col} {bound} ? AND ({date_col}, {id_col}) {compare} (?, ?)"
+    return where_sql, [after[0], after[0], after[1]], order_sql
+
+
+def page_cursor(row, date_index, id_index):
+    """The (date, id) to pass as after= for the page following row."""
+    return row[date_index], row[id_index]
+
+
+class KeysetPager:
+    """
+    The fetch_more of one listing for a virtual_table.TableData: each call
+    returns the next page of fetch_page(after=cursor), cut to its first keep
+    columns, and [] once the last page has been read. date_index and id_index
+    locate the cursor in a row, as for page_cursor().
+
+    Each listing gets a pager of its own, so one still being read to the end
+    on a worker thread cannot move the cursor of the listing that replaced it.
+    """
+
+    def __init__(self, fetch_page, date_index, id_index, keep=None, page_size=DEFAULT_PAGE_SIZE):
+        self.fetch_page = fetch_page
+        self.date_index = date_index
+        self.id_index = id_index
+        self.keep = keep
+        self.page_size = page_size
+        self.after = None
+        self.done = False
+
+    def __call__(self):
+        if self.done:
+            return []
+        rows = self.fetch_page(after=self.after)
+        if rows:
+            self.after = page_cursor(rows[-1], self.date_index, self.id_index)
+        self.done = len(rows) < self.page_size
+        return [row[:self.keep] for row in rows] if self.keep is not None else rows
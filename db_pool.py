@@ -0,0 +1,150 @@
+import sqlite3
+import os
+import json
+import threading
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DB_PATHS = {
+    "customer": os.path.join(BASE_DIR, "outward", "customer.db"),
+    "purchase": os.path.join(BASE_DIR, "inward", "purchase.db"),
+    "service": os.path.join(BASE_DIR, "service", "service.db"),
+}
+
+# sqlite3 keeps a per-connection LRU of prepared statements; since the
+# connections below live for the whole session, every backend query is
+# compiled once and re-bound afterwards.
+STATEMENT_CACHE_SIZE = 256
+
+# Applied in this order every time a database is opened. WAL lets the
+# dashboard and the exports read while a bill is being written; busy_timeout
+# goes first so the journal switch itself waits instead of failing.
+# Any key can be overridden from db_pragmas.json next to this file.
+PRAGMA_PROFILE = {
+    "busy_timeout": 5000,           # ms to wait on a locked database
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",        # safe with WAL, one fsync per checkpoint
+    "cache_size": -16000,           # negative = KiB, so ~16 MB page cache
+    "mmap_size": 64 * 1024 * 1024,
+    "temp_store": "MEMORY",
+    "foreign_keys": "ON",
+}
+
+PRAGMA_CONFIG_PATH = os.path.join(BASE_DIR, "db_pragmas.json")
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {name: {"opened": 0, "reused": 0} for name in DB_PATHS}
+
+
+def load_pragma_profile():
+    """Returns PRAGMA_PROFILE merged with any overrides from db_pragmas.json."""
+    profile = dict(PRAGMA_PROFILE)
+    try:
+        if os.path.exists(PRAGMA_CONFIG_PATH):
+            with open(PRAGMA_CONFIG_PATH) as f:
+                overrides = json.load(f)
+            profile.update({k: v for k, v in overrides.items() if k in PRAGMA_PROFILE})
+    except Exception as e:
+        print(f"Could not read {PRAGMA_CONFIG_PATH}: {e}")
+    return profile
+
+
+_active_profile = load_pragma_profile()
+
+
+def set_pragma_profile(**overrides):
+    """
+    Changes the profile used for connections opened from now on,
+    e.g. set_pragma_profile(synchronous="FULL").
+    """
+    unknown = set(overrides) - set(PRAGMA_PROFILE)
+    if unknown:
+        raise KeyError(f"Unknown pragma(s): {', '.join(sorted(unknown))}")
+    _active_profile.update(overrides)
+
+
+def apply_pragmas(conn, profile=None):
+    for name, value in (profile or _active_profile).items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+def _open_connection(path):
+    conn = sqlite3.connect(path, cached_statements=STATEMENT_CACHE_SIZE)
+    apply_pragmas(conn)
+    return conn
+
+
+def _count(db_name, key):
+    with _stats_lock:
+        _stats[db_name][key] += 1
+
+
+def get_connection(db_name):
+    """
+    Returns the long-lived connection to 'customer', 'purchase' or 'service'
+    for the calling thread, opening it on first use.
+    The connection must not be closed by the caller; 'with conn:' still
+    commits or rolls back as usual.
+    """
+    if db_name not in DB_PATHS:
+        raise KeyError(f"Unknown database: {db_name}")
+    conns = getattr(_local, "connections", None)
+    if conns is None:
+        conns = _local.connections = {}
+    conn = conns.get(db_name)
+    if conn is None:
+        conn = _open_connection(DB_PATHS[db_name])
+        conns[db_name] = conn
+        _count(db_name, "opened")
+    else:
+        _count(db_name, "reused")
+    return conn
+
+
+def close_thread_connections():
+    """Closes every pooled connection owned by the calling thread."""
+    conns = getattr(_local, "connections", None)
+    if not conns:
+        return
+    for conn in conns.values():
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    conns.clear()
+
+
+def check_pragmas():
+    """
+    Reads back the effective settings of every database on this thread,
+    prints them and warns where SQLite did not honour the profile
+    (e.g. WAL is refused on some network drives).
+    Returns {db_name: {pragma: effective_value}}.
+    """
+    report = {}
+    for db_name in DB_PATHS:
+        conn = get_connection(db_name)
+        effective = {}
+        for name, wanted in _active_profile.items():
+            value = conn.execute(f"PRAGMA {name}").fetchone()[0]
+            effective[name] = value
+            if name == "journal_mode" and str(value).lower() != str(wanted).lower():
+                print(f"[{db_name}] journal_mode is {value}, expected {wanted}")
+        report[db_name] = effective
+        print(f"[{db_name}] " + ", ".join(f"{k}={v}" for k, v in effective.items()))
+    return report
+
+
+def get_pool_stats():
+    """
+    Returns {db_name: {"opened": n, "reused": n}} plus a "total" entry,
+    showing how many connection setups the pool has saved.
+    """
+    with _stats_lock:
+        report = {name: dict(counts) for name, counts in _stats.items()}
+    report["total"] = {
+        "opened": sum(c["opened"] for c in report.values()),
+        "reused": sum(c["reused"] for c in report.values()),
+    }
+    return report
@@ -0,0 +1,73 @@
+import threading
+from collections import deque
+from db_pool import get_connection
+
+# Every database carries a small 'sequence' table holding the last number
+# handed out for each named counter (bill numbers, CU/PU ids, service ids).
+# Numbers are taken with an UPDATE inside the caller's write transaction, so
+# the record and its number commit or roll back together and two terminals
+# sharing a database can never be given the same one.
+
+SEQUENCE_TABLE_SQL = """
+        CREATE TABLE IF NOT EXISTS sequence (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )"""
+
+_reserved = {}
+_reserved_lock = threading.Lock()
+
+
+def seed_sequence(c, name, value):
+    """Raises the counter to at least value (never lowers it)."""
+    c.execute("""
+        INSERT INTO sequence (name, value) VALUES (?, ?)
+        ON CONFLICT(name) DO UPDATE SET value = MAX(value, excluded.value)
+    """, (name, int(value or 0)))
+
+
+def next_value(c, name, count=1):
+    """
+    Takes count numbers from the counter inside c's transaction and
+    returns the first of them.
+    """
+    c.execute("INSERT OR IGNORE INTO sequence (name, value) VALUES (?, 0)", (name,))
+    c.execute("UPDATE sequence SET value = value + ? WHERE name = ?", (count, name))
+    c.execute("SELECT value FROM sequence WHERE name = ?", (name,))
+    return c.fetchone()[0] - count + 1
+
+
+def peek_value(c, name):
+    """Returns the number the counter would hand out next, without taking it."""
+    c.execute("SELECT value FROM sequence WHERE name = ?", (name,))
+    row = c.fetchone()
+    return (row[0] if row else 0) + 1
+
+
+def reserve_block(db_name, name, count):
+    """
+    Reserves count numbers for this process in their own transaction, for
+    high-rate billing. allocate() hands these out before touching the table.
+    Must be called outside any open transaction on this thread. A reserved
+    number whose record is never written is simply skipped.
+    Returns (first, last).
+    """
+    conn = get_connection(db_name)
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        first = next_value(conn.cursor(), name, count)
+    with _reserved_lock:
+        _reserved.setdefault((db_name, name), deque()).extend(range(first, first + count))
+    return first, first + count - 1
+
+
+def allocate(c, db_name, name):
+    """
+    Returns the next number for a record being written in c's transaction,
+    using this process's reserved block first.
+    """
+    with _reserved_lock:
+        block = _reserved.get((db_name, name))
+        if block:
+            return block.popleft()
+    return next_value(c, name)
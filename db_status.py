@@ -0,0 +1,72 @@
+import threading
+from db_pool import get_connection
+
+# Status counts for the stats panels. The header tables (customer, purchaser,
+# service_customer) keep status as lower-case 'pending' / 'completed' on an
+# index whose entries also carry remaining_amount, so one GROUP BY pass over
+# the index gives both the counts and the amounts still outstanding.
+# Triggers lower-case whatever status a writer passes and move a
+# '<table>_change' counter in the sequence table on every change to the
+# table; the summary is cached per table until that counter moves.
+
+_lock = threading.Lock()
+_cache = {}  # (database, table) -> (change counter, summary)
+
+
+def status_sql(table):
+    """Returns the statements that normalise, index and watch table.status."""
+    normalise = f"""
+            UPDATE {table} SET status = LOWER(TRIM(status))
+            WHERE rowid = NEW.rowid AND status != LOWER(TRIM(status));"""
+    bump = f"""
+            UPDATE sequence SET value = value + 1 WHERE name = '{table}_change';"""
+    return [
+        f"UPDATE {table} SET status = LOWER(TRIM(status)) WHERE status != LOWER(TRIM(status))",
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_status ON {table}(status, remaining_amount)",
+        f"INSERT OR IGNORE INTO sequence (name, value) VALUES ('{table}_change', 0)",
+        # recursive_triggers is off, so the normalising UPDATE does not re-fire these
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_status_insert AFTER INSERT ON {table}
+        BEGIN{normalise}{bump}
+        END""",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_status_update AFTER UPDATE ON {table}
+        BEGIN{normalise}{bump}
+        END""",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_status_delete AFTER DELETE ON {table}
+        BEGIN{bump}
+        END""",
+    ]
+
+
+def _read_change(conn, table):
+    row = conn.execute("SELECT value FROM sequence WHERE name = ?", (f"{table}_change",)).fetchone()
+    return row[0] if row else None
+
+
+def status_summary(db_name, table):
+    """
+    Returns {"total", "pending", "completed", "outstanding"} for table in
+    db_name: the row counts by status and the sum of remaining_amount over
+    all rows (negative amounts are refunds due). Safe to call from worker
+    threads.
+    """
+    conn = get_connection(db_name)
+    with _lock:
+        change = _read_change(conn, table)
+        cached = _cache.get((db_name, table))
+        if cached is not None and change is not None and cached[0] == change:
+            return dict(cached[1])
+        summary = {"total": 0, "pending": 0, "completed": 0, "outstanding": 0.0}
+        rows = conn.execute(f"""
+            SELECT status, COUNT(*), TOTAL(remaining_amount)
+            FROM {table} GROUP BY status
+        """)
+        for status, count, remaining in rows:
+            summary["total"] += count
+            if status in ("pending", "completed"):
+                summary[status] += count
+            summary["outstanding"] += remaining
+        _cache[(db_name, table)] = (change, summary)
+        return dict(summary)
@@ -0,0 +1,122 @@
+from db_pool import get_connection
+from db_sequences import next_value
+
+# purchase.db and customer.db each keep a 'stock_ledger' table with one row
+# per item: the total quantity moved in (purchases) or out (sales), how many
+# product lines make it up and when it last changed. Triggers on the product
+# table keep it in step with every insert, return (qty/item update) and
+# delete, including rows removed by ON DELETE CASCADE, so the stock screen
+# reads a few hundred rows instead of aggregating the whole history.
+# Items are keyed the way stock has always been grouped: trimmed, lower case.
+# Quantities are truncated per line as int(qty) did before.
+#
+# Every change stamps the ledger row with the next 'stock_change' number from
+# the sequence table, so a reader that remembers the highest number it has
+# seen only needs the rows above it. Items whose last line is gone stay with
+# line_count 0 for the same reason. A rebuild bumps 'stock_ledger_generation'
+# to tell readers to start over.
+
+STOCK_LEDGER_TABLE_SQL = """
+        CREATE TABLE IF NOT EXISTS stock_ledger (
+            item_key TEXT PRIMARY KEY,
+            qty INTEGER NOT NULL,
+            line_count INTEGER NOT NULL,
+            last_movement TEXT,
+            change_no INTEGER NOT NULL DEFAULT 0
+        )"""
+
+STOCK_LEDGER_INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_stock_ledger_change_no ON stock_ledger(change_no)"
+
+_TRIGGER_SUFFIXES = ("insert", "update", "delete")
+
+_NEXT_CHANGE = """
+            UPDATE sequence SET value = value + 1 WHERE name = 'stock_change';"""
+_CHANGE_NO = "(SELECT value FROM sequence WHERE name = 'stock_change')"
+
+
+def stock_ledger_triggers(table):
+    """Returns the CREATE TRIGGER statements that keep stock_ledger in step with table."""
+    add_new = """
+            INSERT INTO stock_ledger (item_key, qty, line_count, last_movement, change_no)
+            VALUES (LOWER(TRIM(NEW.item)), CAST(NEW.qty AS INTEGER), 1, {moved}, %s)
+            ON CONFLICT(item_key) DO UPDATE SET
+                qty = qty + excluded.qty,
+                line_count = line_count + 1,
+                last_movement = excluded.last_movement,
+                change_no = excluded.change_no;""" % _CHANGE_NO
+    remove_old = """
+            UPDATE stock_ledger
+            SET qty = qty - CAST(OLD.qty AS INTEGER),
+                line_count = line_count - 1,
+                last_movement = datetime('now', 'localtime'),
+                change_no = %s
+            WHERE item_key = LOWER(TRIM(OLD.item));""" % _CHANGE_NO
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_stock_insert AFTER INSERT ON {table}
+        BEGIN{_NEXT_CHANGE}{add_new.format(moved="NEW.date")}
+        END""",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_stock_update AFTER UPDATE OF item, qty ON {table}
+        BEGIN{_NEXT_CHANGE}{remove_old}{add_new.format(moved="datetime('now', 'localtime')")}
+        END""",
+        f"""
+        CREATE TRIGGER IF NOT EXISTS {table}_stock_delete AFTER DELETE ON {table}
+        BEGIN{_NEXT_CHANGE}{remove_old}
+        END""",
+    ]
+
+
+def add_change_numbers(conn, table):
+    """
+    Migration step for ledgers created before change numbers existed:
+    adds the column and index and replaces the triggers.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(stock_ledger)")]
+    if "change_no" not in columns:
+        conn.execute("ALTER TABLE stock_ledger ADD COLUMN change_no INTEGER NOT NULL DEFAULT 0")
+    conn.execute(STOCK_LEDGER_INDEX_SQL)
+    for suffix in _TRIGGER_SUFFIXES:
+        conn.execute(f"DROP TRIGGER IF EXISTS {table}_stock_{suffix}")
+    for sql in stock_ledger_triggers(table):
+        conn.execute(sql)
+    rebuild_stock_ledger(conn.cursor(), table)
+
+
+def rebuild_stock_ledger(c, table):
+    """Recomputes stock_ledger from every row of table inside c's transaction."""
+    next_value(c, "stock_change")
+    next_value(c, "stock_ledger_generation")
+    c.execute("DELETE FROM stock_ledger")
+    c.execute(f"""
+        INSERT INTO stock_ledger (item_key, qty, line_count, last_movement, change_no)
+        SELECT LOWER(TRIM(item)), SUM(CAST(qty AS INTEGER)), COUNT(*), MAX(date),
+               {_CHANGE_NO}
+        FROM {table}
+        GROUP BY LOWER(TRIM(item))
+    """)
+    c.execute("SELECT COUNT(*) FROM stock_ledger")
+    return c.fetchone()[0]
+
+
+def read_stock_ledger(db_name, after_change=0):
+    """
+    Returns (generation, last_change_no, rows) where rows is a list of
+    (item_key, qty, line_count) changed after after_change; pass 0 for all.
+    Read in one transaction so the three agree.
+    """
+    conn = get_connection(db_name)
+    c = conn.cursor()
+    with conn:
+        c.execute("BEGIN")
+        c.execute("SELECT value FROM sequence WHERE name = 'stock_ledger_generation'")
+        row = c.fetchone()
+        generation = row[0] if row else 0
+        c.execute("SELECT value FROM sequence WHERE name = 'stock_change'")
+        row = c.fetchone()
+        last_change = row[0] if row else 0
+        c.execute(
+            "SELECT item_key, qty, line_count FROM stock_ledger WHERE change_no > ?",
+            (after_change,))
+        rows = c.fetchall()
+    return generation, last_change, rows
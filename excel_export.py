@@ -0,0 +1,197 @@
+import os
+import threading
+from db_pool import close_thread_connections, get_connection
+
+# Streaming Excel export. Rows are read from a cursor a chunk at a time and
+# appended to an openpyxl write-only workbook, which spools each sheet to a
+# temporary file instead of holding cells in memory, so an export of any
+# size runs in about the memory of one chunk. All sheets are read inside
+# one read transaction, so they agree with each other even while bills are
+# being written. The workbook is written next to its final name and only
+# renamed into place once complete; a cancelled or failed export leaves
+# nothing behind.
+#
+# openpyxl is only needed once an export actually runs.
+
+EXPORT_CHUNK = 2000
+
+# database -> (party table, id column, name column)
+PARTY_TABLES = {
+    "customer": ("customer", "customer_id", "customer_name"),
+    "purchase": ("purchaser", "purchaser_id", "purchaser_name"),
+    "service": ("service_customer", "service_id", "customer_name"),
+}
+
+# database -> (line table, sheet columns, selected columns of the line alias l)
+LINE_TABLES = {
+    "customer": ("customer_product", ["Item", "Qty", "Price", "Description", "Amount", "Date"],
+                 "l.item, l.qty, l.price, l.description, l.amount, l.date"),
+    "purchase": ("purchase_product", ["Item", "Qty", "Price", "Description", "Amount", "Date"],
+                 "l.item, l.qty, l.price, l.description, l.amount, l.date"),
+    "service": ("service_item", ["Item", "Fault", "Amount", "Date"],
+                "l.item_name, l.description, l.amount, l.date"),
+}
+
+PAYMENT_TABLES = {
+    "customer": "customer_payment",
+    "purchase": "purchase_payment",
+    "service": "service_payment",
+}
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class ExportJob:
+    """
+    One export running on its own thread. The worker updates done/total as
+    it goes; the window showing it reads them, and calls cancel() to stop
+    it. Once finished is set, result holds the file written or error the
+    exception raised (ExportCancelled if it was cancelled).
+    """
+
+    def __init__(self):
+        self.done = 0
+        self.total = 0
+        self.finished = False
+        self.result = None
+        self.error = None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def check_cancelled(self):
+        if self._cancelled.is_set():
+            raise ExportCancelled()
+
+    def start(self, func, *args, **kwargs):
+        """Runs func(*args, job=self, **kwargs) on a new background thread."""
+        def run():
+            try:
+                self.result = func(*args, job=self, **kwargs)
+            except BaseException as e:
+                self.error = e
+            finally:
+                close_thread_connections()
+                self.finished = True
+        threading.Thread(target=run, name="export", daemon=True).start()
+        return self
+
+
+def _split_remaining(row):
+    # Pending rows show what is still owed and what is to be refunded apart
+    remaining = row[7] if row[7] is not None else 0
+    return row[:7] + (remaining if remaining > 0 else None,
+                      -remaining if remaining < 0 else None)
+
+
+def party_sheets(db_name, include_lines=False):
+    """
+    Returns the sheets of db_name's party export: Pending and Completed,
+    plus every line item and payment when include_lines is set. Each sheet
+    is a dict with name, columns, sql, count_sql, params and row (a function
+    turning a fetched row into the cells written, or None to write it as is).
+    """
+    party, id_col, name_col = PARTY_TABLES[db_name]
+    party_columns = f"{id_col}, {name_col}, place, phone_number, total_amount, date, amount_paid, remaining_amount"
+    sheets = [
+        {"name": "Pending",
+         "columns": ["ID", "Name", "Place", "Phone", "Total", "Date", "Paid", "Remaining to Pay", "Refund"],
+         "sql": f"SELECT {party_columns} FROM {party} WHERE status = ? ORDER BY {name_col}",
+         "count_sql": f"SELECT COUNT(*) FROM {party} WHERE status = ?",
+         "params": ("pending",), "row": _split_remaining},
+        {"name": "Completed",
+         "columns": ["ID", "Name", "Place", "Phone", "Total", "Date", "Paid"],
+         "sql": f"SELECT {party_columns} FROM {party} WHERE status = ? ORDER BY {name_col}",
+         "count_sql": f"SELECT COUNT(*) FROM {party} WHERE status = ?",
+         "params": ("completed",), "row": lambda row: row[:7]},
+    ]
+    if include_lines:
+        lines, line_columns, line_select = LINE_TABLES[db_name]
+        payments = PAYMENT_TABLES[db_name]
+        sheets += [
+            {"name": "Items",
+             "columns": ["ID", "Name"] + line_columns,
+             "sql": f"""
+                SELECT l.{id_col}, u.{name_col}, {line_select}
+                FROM {lines} l JOIN {party} u ON l.{id_col} = u.{id_col}
+                ORDER BY l.date, l.id""",
+             "count_sql": f"SELECT COUNT(*) FROM {lines}",
+             "params": (), "row": None},
+            {"name": "Payments",
+             "columns": ["ID", "Name", "Payment ID", "Date", "Amount", "Type", "Remarks"],
+             "sql": f"""
+                SELECT p.{id_col}, u.{name_col}, p.payment_id, p.date, p.amount_paid,
+                       p.transaction_type, p.remarks
+                FROM {payments} p JOIN {party} u ON p.{id_col} = u.{id_col}
+                ORDER BY p.date, p.id""",
+             "count_sql": f"SELECT COUNT(*) FROM {payments}",
+             "params": (), "row": None},
+        ]
+    return sheets
+
+
+def export_workbook(path, db_name, sheets, job=None, chunk_size=EXPORT_CHUNK):
+    """
+    Writes sheets (see party_sheets) from db_name to the xlsx file path,
+    reporting progress on job if given. Returns path. Raises
+    ExportCancelled if the job is cancelled part way.
+    """
+    return export_databases(path, [(db_name, sheets)], job, chunk_size)
+
+
+def export_databases(path, parts, job=None, chunk_size=EXPORT_CHUNK):
+    """
+    Like export_workbook, for one workbook holding the sheets of several
+    databases: parts is [(db_name, sheets), ...] and sheet names must be
+    unique across them. Every database is read inside its own read
+    transaction, all begun before the first row is written.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise RuntimeError("Excel export needs the openpyxl package (pip install openpyxl)")
+
+    job = job or ExportJob()
+    partial = path + ".part"
+    began = []
+    try:
+        for db_name, sheets in parts:
+            conn = get_connection(db_name)
+            if not conn.in_transaction:
+                conn.execute("BEGIN")
+                began.append(conn)
+        job.total = sum(get_connection(db_name).execute(sheet["count_sql"], sheet["params"]).fetchone()[0]
+                        for db_name, sheets in parts for sheet in sheets)
+        workbook = Workbook(write_only=True)
+        for db_name, sheets in parts:
+            conn = get_connection(db_name)
+            for sheet in sheets:
+                worksheet = workbook.create_sheet(sheet["name"])
+                worksheet.append(sheet["columns"])
+                make_row = sheet["row"]
+                cursor = conn.execute(sheet["sql"], sheet["params"])
+                while True:
+                    job.check_cancelled()
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        worksheet.append(make_row(row) if make_row else row)
+                    job.done += len(rows)
+        job.check_cancelled()
+        workbook.save(partial)
+        os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    finally:
+        for conn in began:
+            conn.rollback()
+    return path
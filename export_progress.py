@@ -0,0 +1,60 @@
+import tkinter as tk
+from tkinter import ttk
+from excel_export import ExportCancelled, ExportJob
+
+# A small window that follows an ExportJob: a progress bar, the row count
+# and a Cancel button. The export itself runs on its own thread, so the
+# rest of the app stays usable (and the data_worker pool free) meanwhile.
+
+POLL_MS = 100
+
+
+def run_export(parent, theme, title, func, *args, on_done=None, on_error=None, **kwargs):
+    """
+    Starts func(*args, job=job, **kwargs) on a background thread and shows
+    its progress. When it ends the window closes and on_done(result) or
+    on_error(exception) runs on the Tk thread; a cancelled export just
+    closes the window. Returns the ExportJob.
+    """
+    bg = theme.get("notif_container_bg", theme["bg"])
+    top = tk.Toplevel(parent)
+    top.title(title)
+    top.configure(bg=bg)
+    top.resizable(False, False)
+
+    tk.Label(top, text=title, font=("Arial", 14, "bold"), bg=bg, fg=theme["fg"]).pack(padx=20, pady=(18, 6))
+    bar = ttk.Progressbar(top, length=360, mode="determinate", maximum=1)
+    bar.pack(padx=20, pady=4)
+    count_label = tk.Label(top, text="Preparing...", font=("Arial", 11), bg=bg, fg=theme["fg"])
+    count_label.pack(pady=(0, 10))
+    cancel_btn = tk.Button(top, text="Cancel", font=("Arial", 12, "bold"), bg=bg, fg=theme["fg"],
+                           relief="ridge")
+    cancel_btn.pack(ipadx=18, ipady=2, pady=(0, 12))
+
+    job = ExportJob().start(func, *args, **kwargs)
+
+    def cancel():
+        job.cancel()
+        cancel_btn.config(state="disabled", text="Cancelling...")
+
+    cancel_btn.config(command=cancel)
+    top.protocol("WM_DELETE_WINDOW", cancel)
+
+    def poll():
+        if not top.winfo_exists():
+            return
+        if job.total:
+            bar.config(maximum=job.total, value=job.done)
+            count_label.config(text=f"{job.done:,} of {job.total:,} rows")
+        if not job.finished:
+            top.after(POLL_MS, poll)
+            return
+        top.destroy()
+        if job.error is None:
+            if on_done is not None:
+                on_done(job.result)
+        elif not isinstance(job.error, ExportCancelled) and on_error is not None:
+            on_error(job.error)
+
+    top.after(POLL_MS, poll)
+    return job
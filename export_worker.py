@@ -0,0 +1,84 @@
+import csv
+import os
+import sys
+from db_pool import get_connection
+from excel_export import EXPORT_CHUNK, ExportJob, export_databases, party_sheets
+
+# One worker process of the full business export (see business_export),
+# started as a script so that it loads only the database and export modules,
+# never the app's windows:
+#
+#     python export_worker.py csv <folder> <database>
+#     python export_worker.py xlsx <path> <database> [<database> ...]
+#
+# Progress goes to stdout as "total <rows>" and "done <rows>" lines; a
+# failure exits non-zero with its traceback on stderr.
+
+DATABASE_TITLES = {"customer": "Sales", "purchase": "Purchase", "service": "Service"}
+
+
+class _PrintedJob(ExportJob):
+    # An ExportJob whose progress is printed for the parent process to read
+
+    @property
+    def total(self):
+        return self._total
+
+    @total.setter
+    def total(self, value):
+        self._total = value
+        print(f"total {value}", flush=True)
+
+    @property
+    def done(self):
+        return self._done
+
+    @done.setter
+    def done(self, value):
+        self._done = value
+        print(f"done {value}", flush=True)
+
+
+def write_csv(folder, db_name, job):
+    """Writes db_name's sheets as <title>_<sheet>.csv files into folder."""
+    conn = get_connection(db_name)
+    title = DATABASE_TITLES[db_name].lower()
+    sheets = party_sheets(db_name, include_lines=True)
+    conn.execute("BEGIN")
+    try:
+        job.total = sum(conn.execute(sheet["count_sql"], sheet["params"]).fetchone()[0]
+                        for sheet in sheets)
+        for sheet in sheets:
+            path = os.path.join(folder, f"{title}_{sheet['name'].lower()}.csv")
+            make_row = sheet["row"]
+            cursor = conn.execute(sheet["sql"], sheet["params"])
+            with open(path, "w", newline="", encoding="utf-8-sig") as f:
+                writer = csv.writer(f)
+                writer.writerow(sheet["columns"])
+                while True:
+                    rows = cursor.fetchmany(EXPORT_CHUNK)
+                    if not rows:
+                        break
+                    writer.writerows([make_row(row) for row in rows] if make_row else rows)
+                    job.done += len(rows)
+    finally:
+        conn.rollback()
+
+
+def write_xlsx(path, db_names, job):
+    """Writes the sheets of db_names into one workbook, e.g. 'Sales Pending'."""
+    parts = []
+    for db_name in db_names:
+        sheets = party_sheets(db_name, include_lines=True)
+        for sheet in sheets:
+            sheet["name"] = f"{DATABASE_TITLES[db_name]} {sheet['name']}"
+        parts.append((db_name, sheets))
+    export_databases(path, parts, job)
+
+
+if __name__ == "__main__":
+    fmt, target, *databases = sys.argv[1:]
+    if fmt == "csv":
+        write_csv(target, databases[0], _PrintedJob())
+    else:
+        write_xlsx(target, databases, _PrintedJob())
@@ -1,10 +1,22 @@
+import os
+import sys
 import tkinter as tk
+from pathlib import Path
 from tkinter import ttk
 from stock_backend import get_stock_data
+import data_worker
+from business_export import export_business
+from export_progress import run_export
+from parquet_export import export_parquet
 from sales_stats import SalesStats
 from purchase_stats import PurchaseStats
 from service_stats import ServiceStats
 
+# Alert levels in display order, and the height of one alert row in pixels.
+ALERT_LEVELS = ("danger", "info", "warning", "safe")
+NOTIF_ROW_HEIGHT = 40
+NOTIF_REFRESH_MS = 30000
+
 
 class HomeDashboardFrame(tk.Frame):
     def __init__(self, parent, get_theme_colors):
@@ -13,8 +25,13 @@ class HomeDashboardFrame(tk.Frame):
         self.theme = self.get_theme_colors()
         if "info" not in self.theme:
             self.theme["info"] = "#FF8C00"
+        # Current alerts {key: (level, text)} and their display order. Only
+        # the rows in view have widgets; they are recycled while scrolling.
+        self.alerts = {}
+        self.alert_keys = []
+        self._alert_rows = []
+        self._notif_after_id = None
         self._setup_ui()
-        self.notification_labels = {}  # Keeps track of current notification widgets
 
         self._refresh_notifications()
 
@@ -35,7 +52,6 @@ class HomeDashboardFrame(tk.Frame):
         # Update notification area
         self.notif_label.configure(bg=self.theme["notif_container_bg"], fg=self.theme["fg"])
         self.notif_canvas.configure(bg=self.theme["notif_container_bg"])
-        self.notif_frame.configure(bg=self.theme["notif_container_bg"])
 
         # Update summary box and all its children
         self.summary_frame.configure(bg=self.theme["notif_container_bg"])
@@ -48,13 +64,17 @@ class HomeDashboardFrame(tk.Frame):
             canvas.create_oval(2, 2, 18, 18, fill=self.theme.get(color_key, "#FFF"), outline=self.theme.get(color_key, "#FFF"))
             label = row.winfo_children()[1]
             label.configure(bg=self.theme["notif_container_bg"], fg=self.theme["fg"])
+        self.export_btn.configure(bg=self.theme["notif_container_bg"], fg=self.theme["fg"])
+        self.parquet_btn.configure(bg=self.theme["notif_container_bg"], fg=self.theme["fg"])
 
         # Update right panel frames and headings
         self.sales_stats.update_theme(self.theme)
         self.purchase_stats.update_theme(self.theme)
         self.service_stats.update_theme(self.theme)
-        self._refresh_notifications()
-       
+        for row in self._alert_rows:
+            row["shown"] = None
+        self._render_visible_alerts()
+
 
     def _setup_ui(self):
         self.configure(bg=self.theme["bg"])
@@ -91,16 +111,13 @@ class HomeDashboardFrame(tk.Frame):
         notif_area.columnconfigure(0, weight=1)
 
         self.notif_canvas = tk.Canvas(notif_area, bg=self.theme["notif_container_bg"],
-                                      highlightthickness=0, bd=0)
-        self.notif_frame = tk.Frame(self.notif_canvas, bg=self.theme["notif_container_bg"])
-        self.notif_frame_id = self.notif_canvas.create_window((0, 0), window=self.notif_frame, anchor="nw")
+                                      highlightthickness=0, bd=0, yscrollincrement=NOTIF_ROW_HEIGHT)
         self.notif_canvas.grid(row=0, column=0, sticky="nsew")
         self.notif_scroll = ttk.Scrollbar(notif_area, orient="vertical", command=self.notif_canvas.yview)
-        self.notif_canvas.configure(yscrollcommand=self.notif_scroll.set)
+        self.notif_canvas.configure(yscrollcommand=self._on_notif_scroll)
         self.notif_scroll.grid(row=0, column=1, sticky="ns")
         self.notif_scroll.grid_remove()  # Hide by default
 
-        self.notif_frame.bind("<Configure>", self._on_notif_frame_configure)
         self.notif_canvas.bind("<Configure>", self._on_canvas_configure)
 
         # Inventory Summary at the bottom of left panel (with color circles)
@@ -128,6 +145,32 @@ class HomeDashboardFrame(tk.Frame):
             row.pack(anchor="w", pady=1)
             self.summary_rows.append(row)
 
+        # Every sheet of all three databases in one go; see business_export
+        self.export_btn = tk.Button(
+            self.left_panel,
+            text="Full Business Export",
+            font=("Arial", 12, "bold"),
+            bg=self.theme["notif_container_bg"],
+            fg=self.theme["fg"],
+            bd=1,
+            relief="ridge",
+            command=self.export_all
+        )
+        self.export_btn.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(10, 0))
+
+        # Line items and payments as Parquet for notebooks; see parquet_export
+        self.parquet_btn = tk.Button(
+            self.left_panel,
+            text="Analytics Export (Parquet)",
+            font=("Arial", 12, "bold"),
+            bg=self.theme["notif_container_bg"],
+            fg=self.theme["fg"],
+            bd=1,
+            relief="ridge",
+            command=self.export_analytics
+        )
+        self.parquet_btn.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(10, 0))
+
         # Right panel (2/3, split into 3 vertical parts)s
         self.right_panel = tk.Frame(self, bg=self.theme["bg"])
         self.right_panel.grid(row=1, column=1, sticky="nswe", padx=(5, 5), pady=10)
@@ -189,102 +232,174 @@ class HomeDashboardFrame(tk.Frame):
         self.columnconfigure(1, weight=2)
         self.rowconfigure(1, weight=1)
 
-    def _on_canvas_configure(self, event):
-        self.notif_canvas.itemconfig(self.notif_frame_id, width=event.width)
+    def export_all(self):
+        fmt = self._ask_export_format()
+        if fmt is None:
+            return
+        downloads = str(Path.home() / "Downloads")
+        run_export(self, self.theme, "Full business export", export_business, downloads, fmt,
+                   on_done=self._export_all_finished,
+                   on_error=lambda e: self.sales_stats.show_themed_messagebox("Error", f"Failed to export: {e}"))
+
+    def _ask_export_format(self):
+        # CSV is written by one worker per database side by side; a single
+        # workbook comes from one process and takes much longer when large
+        bg = self.theme.get("notif_container_bg", self.theme["bg"])
+        choice = []
+        top = tk.Toplevel(self)
+        top.title("Full business export")
+        top.configure(bg=bg)
+        top.grab_set()
+        w, h = 420, 170
+        x = top.winfo_screenwidth() // 2 - w // 2
+        y = top.winfo_screenheight() // 2 - h // 2
+        top.geometry(f"{w}x{h}+{x}+{y}")
+
+        tk.Label(top, text="Export every sale, purchase and service as:", font=("Arial", 12, "bold"),
+                 bg=bg, fg=self.theme["fg"]).pack(pady=(18, 12))
+        buttons = tk.Frame(top, bg=bg)
+        buttons.pack()
+        for text, fmt in (("CSV files (fast)", "csv"), ("One Excel workbook", "xlsx"), ("Cancel", None)):
+            tk.Button(
+                buttons, text=text, font=("Arial", 11, "bold"),
+                bg=bg, fg=self.theme["fg"], relief="ridge",
+                command=lambda fmt=fmt: (choice.append(fmt), top.destroy())
+            ).pack(side=tk.LEFT, padx=6, ipadx=6, ipady=2)
+        top.wait_window()
+        return choice[0] if choice else None
+
+    def export_analytics(self):
+        # Always the same folder, so each run only adds the months that changed
+        folder = str(Path.home() / "Downloads" / "TrackEdge Parquet")
+        run_export(self, self.theme, "Analytics export", export_parquet, folder,
+                   on_done=self._export_all_finished,
+                   on_error=lambda e: self.sales_stats.show_themed_messagebox("Error", f"Failed to export: {e}"))
+
+    def _export_all_finished(self, path):
+        self.sales_stats.show_themed_messagebox(
+            "Success",
+            f"Data exported to {path}\n\nClick OK to open it."
+        )
+        try:
+            if sys.platform.startswith('darwin'):
+                os.system(f'open "{path}"')
+            elif os.name == 'nt':
+                os.startfile(path)
+            elif os.name == 'posix':
+                os.system(f'xdg-open "{path}"')
+        except Exception as open_err:
+            self.sales_stats.show_themed_messagebox("Open Export", f"Could not open it automatically: {open_err}")
 
-    def _on_notif_frame_configure(self, event):
-        needs_scroll = self.notif_frame.winfo_height() > self.notif_canvas.winfo_height()
-        if needs_scroll:
+    def _on_canvas_configure(self, event):
+        for row in self._alert_rows:
+            self.notif_canvas.itemconfig(row["window"], width=max(event.width - 8, 1))
+        self._update_notif_scrollregion()
+        self._render_visible_alerts()
+
+    def _on_notif_scroll(self, first, last):
+        self.notif_scroll.set(first, last)
+        self._render_visible_alerts()
+
+    def _update_notif_scrollregion(self):
+        total_height = len(self.alert_keys) * NOTIF_ROW_HEIGHT
+        if total_height > self.notif_canvas.winfo_height():
             self.notif_scroll.grid()
         else:
             self.notif_scroll.grid_remove()
-        self.notif_canvas.configure(scrollregion=self.notif_canvas.bbox("all"))
-    
+        self.notif_canvas.configure(scrollregion=(0, 0, self.notif_canvas.winfo_width(), total_height))
+
+    @staticmethod
+    def _compute_alerts(stock_data, missing_purchase):
+        """
+        One pass over the stock: returns ({key: (level, text)}, {level: count}).
+        Low stock is 0-2, medium 3-5, healthy above 5; items sold more than
+        purchased also get a 'purchase missing' alert.
+        """
+        alerts = {}
+        counts = dict.fromkeys(ALERT_LEVELS, 0)
+        for item, qty in stock_data.items():
+            level = "danger" if qty <= 2 else "warning" if qty <= 5 else "safe"
+            alerts[f"{level}:{item}"] = (level, f"{item}: {qty}")
+            counts[level] += 1
+            diff = missing_purchase.get(item)
+            if diff:
+                alerts[f"info:{item}"] = ("info", f"Purchase missing for {item}: {diff} more sold than purchased")
+                counts["info"] += 1
+        return alerts, counts
+
     def _refresh_notifications(self):
-        stock_data, missing_purchase = get_stock_data()
-        low, missing, med, ok = 0, 0, 0, 0
+        if self._notif_after_id is not None:
+            self.after_cancel(self._notif_after_id)
+        data_worker.submit(
+            self, lambda: self._compute_alerts(*get_stock_data()),
+            on_result=self._show_alerts, key="home.stock_alerts"
+        )
+        self._notif_after_id = self.after(NOTIF_REFRESH_MS, self._refresh_notifications)
 
-        # Build a set of current notification keys
-        current_keys = set()
+    def _show_alerts(self, result):
+        alerts, counts = result
 
-        # 1. RED: Low stock (<10)
-        for item, qty in stock_data.items():
-            if qty <=2  and qty >= 0:
-                key = f"danger:{item}"
-                self._update_or_create_notification(key, f"{item}: {qty}", "danger")
-                low += 1
-                current_keys.add(key)
-
-        # 2. ORANGE: Missing purchase (sales > purchases)
-        for item, diff in missing_purchase.items():
-            key = f"info:{item}"
-            msg = f"Purchase missing for {item}: {diff} more sold than purchased"
-            self._update_or_create_notification(key, msg, "info")
-            missing += 1
-            current_keys.add(key)
-
-        # 3. YELLOW: Medium stock (10-19)
-        for item, qty in stock_data.items():
-            if 3 <= qty <= 5:
-                key = f"warning:{item}"
-                self._update_or_create_notification(key, f"{item}: {qty}", "warning")
-                med += 1
-                current_keys.add(key)
+        # Only re-sort when alerts come or go; a changed quantity keeps its place
+        if alerts.keys() != self.alerts.keys():
+            rank = {level: i for i, level in enumerate(ALERT_LEVELS)}
+            self.alert_keys = sorted(alerts, key=lambda k: (rank[alerts[k][0]], k))
+            self.alerts = alerts
+            self._update_notif_scrollregion()
+        else:
+            self.alerts = alerts
+        self._render_visible_alerts()
 
-        # 4. GREEN: Healthy stock (≥20)
-        for item, qty in stock_data.items():
-            if qty >5:
-                key = f"safe:{item}"
-                self._update_or_create_notification(key, f"{item}: {qty}", "safe")
-                ok += 1
-                current_keys.add(key)
-
-        # Remove notifications that are no longer relevant
-        for key in list(self.notification_labels.keys()):
-            if key not in current_keys:
-                self.notification_labels[key].destroy()
-                del self.notification_labels[key]
-
-        # Update summary labels (unchanged)
         for row, text in zip(
             self.summary_rows,
             [
-                f"Low Stock : {low}",
-                f"Purchase Missing: {missing}",
-                f"Medium Stock : {med}",
-                f"Healthy Stock : {ok}"
+                f"Low Stock : {counts['danger']}",
+                f"Purchase Missing: {counts['info']}",
+                f"Medium Stock : {counts['warning']}",
+                f"Healthy Stock : {counts['safe']}"
             ]
         ):
             label = row.winfo_children()[1]
-            label.config(text=text)
-
-        self.after(30000, self._refresh_notifications)
-     
-    def _update_or_create_notification(self, key, text, level):
-        color = self.theme.get(level, "#FFF")
-        fg = self.theme["fg"]
-        if key in self.notification_labels:
-            frame = self.notification_labels[key]
-            label = frame.winfo_children()[0]
-            label.config(text=text, bg=color, fg=fg)
-            frame.config(bg=color)
-        else:
-            frame = tk.Frame(self.notif_frame, bg=color, padx=8, pady=4)
-            frame.pack(fill=tk.X, pady=4, padx=4)
-            label = tk.Label(frame, text=text, font=("Arial", 13, "bold"), bg=color, fg=fg)
-            label.pack(anchor="w")
-            self.notification_labels[key] = frame
-
-    def _add_notification(self, item, qty, level, message=None):
-        color = self.theme.get(level, "#FFF")
-        fg = self.theme["fg"]
-        frame = tk.Frame(self.notif_frame, bg=color, padx=8, pady=4)
-        frame.pack(fill=tk.X, pady=4, padx=4)
-        if message:
-            text = message.format(item=item, diff=qty)
-        else:
-            text = f"{item}: {qty}"
-        label = tk.Label(frame, text=text, font=("Arial", 13, "bold"), bg=color, fg=fg)
-        label.pack(anchor="w")
-
-    
+            if label.cget("text") != text:
+                label.config(text=text)
+
+    def _render_visible_alerts(self):
+        """
+        Points the pooled row widgets at the alerts currently in view and
+        reconfigures only the rows whose alert, text or colour changed.
+        """
+        canvas = self.notif_canvas
+        view_height = max(canvas.winfo_height(), NOTIF_ROW_HEIGHT)
+        first = max(int(canvas.canvasy(0)) // NOTIF_ROW_HEIGHT, 0)
+        needed = min(view_height // NOTIF_ROW_HEIGHT + 2, len(self.alert_keys) - first)
+        while len(self._alert_rows) < needed:
+            self._alert_rows.append(self._create_alert_row())
+
+        for slot, row in enumerate(self._alert_rows):
+            index = first + slot
+            if slot >= needed:
+                if row["shown"] is not False:
+                    canvas.itemconfig(row["window"], state="hidden")
+                    row["shown"] = False
+                continue
+            key = self.alert_keys[index]
+            level, text = self.alerts[key]
+            shown = (index, level, text)
+            if row["shown"] == shown:
+                continue
+            if not row["shown"]:
+                canvas.itemconfig(row["window"], state="normal")
+            canvas.coords(row["window"], 4, index * NOTIF_ROW_HEIGHT + 4)
+            color = self.theme.get(level, "#FFF")
+            row["frame"].config(bg=color)
+            row["label"].config(text=text, bg=color, fg=self.theme["fg"])
+            row["shown"] = shown
+
+    def _create_alert_row(self):
+        frame = tk.Frame(self.notif_canvas, padx=8, pady=4)
+        label = tk.Label(frame, font=("Arial", 13, "bold"), anchor="w")
+        label.pack(fill=tk.X)
+        window = self.notif_canvas.create_window(
+            4, 0, window=frame, anchor="nw",
+            width=max(self.notif_canvas.winfo_width() - 8, 1),
+            height=NOTIF_ROW_HEIGHT - 8, state="hidden")
+        return {"frame": frame, "label": label, "window": window, "shown": False}
@@ -1,32 +1,38 @@
 import sqlite3
-import os
-from datetime import datetime
-
-DB_NAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "purchase.db")
+from db_pool import DB_PATHS, get_connection
+from db_migrations import run_migrations
+from db_sequences import SEQUENCE_TABLE_SQL, allocate, peek_value, seed_sequence
+from db_stock_ledger import (STOCK_LEDGER_TABLE_SQL, add_change_numbers, rebuild_stock_ledger,
+                             stock_ledger_triggers)
+from db_catalog import PRODUCT_TABLE_SQL, catalog_edit_sql, catalog_sql
+from db_dates import day_range, normalize_dates_sql, now
+from db_months import month_changes_sql
+from db_status import status_sql
+from db_paging import DEFAULT_PAGE_SIZE, keyset_page
+from db_name_search import name_index_sql, ranked_rows, rebuild_name_index_sql
+from id_generator import new_id
+from phone_index import PhonePrefixIndex
+
+DB_NAME = DB_PATHS["purchase"]
 
 def get_db_connection():
-    conn = sqlite3.connect(DB_NAME)
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
-
-def create_tables():
-    with get_db_connection() as conn:
-        c = conn.cursor()
+    return get_connection("purchase")
 
-        c.execute("""
+MIGRATIONS = [
+    (1, "base tables", [
+        """
 CREATE TABLE IF NOT EXISTS purchaser (
     purchaser_id TEXT PRIMARY KEY,
     purchaser_name TEXT NOT NULL,
     place TEXT NOT NULL,
-    phone_number TEXT NOT NULL UNIQUE,  -- <--- ADD UNIQUE HERE
+    phone_number TEXT NOT NULL UNIQUE,
     total_amount REAL NOT NULL,
     date TEXT NOT NULL,
     amount_paid REAL NOT NULL,
     remaining_amount REAL NOT NULL,
     status TEXT NOT NULL
-)""")
-
-        c.execute("""
+)""",
+        """
         CREATE TABLE IF NOT EXISTS purchase_product (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             purchaser_id TEXT NOT NULL,
@@ -35,10 +41,10 @@ CREATE TABLE IF NOT EXISTS purchaser (
             price REAL NOT NULL,
             description TEXT,
             amount REAL NOT NULL,
-            date TEXT NOT NULL,  -- <-- Add this line
+            date TEXT NOT NULL,
             FOREIGN KEY (purchaser_id) REFERENCES purchaser(purchaser_id) ON DELETE CASCADE
-        )""")
-        c.execute("""
+        )""",
+        """
         CREATE TABLE IF NOT EXISTS purchase_payment (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     purchaser_id TEXT NOT NULL,
@@ -48,16 +54,79 @@ CREATE TABLE IF NOT EXISTS purchaser (
     transaction_type TEXT NOT NULL DEFAULT 'debit',
     remarks TEXT,
     FOREIGN KEY (purchaser_id) REFERENCES purchaser(purchaser_id) ON DELETE CASCADE
-)""")
+)""",
+    ]),
+    (2, "secondary indexes for per-purchaser views", [
+        "CREATE INDEX IF NOT EXISTS idx_purchaser_name_phone ON purchaser(purchaser_name, phone_number)",
+        # NOCASE so that LIKE 'prefix%' (case-insensitive) can use the index
+        "CREATE INDEX IF NOT EXISTS idx_purchaser_phone_nocase ON purchaser(phone_number COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_purchase_product_purchaser_date ON purchase_product(purchaser_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_purchase_product_date ON purchase_product(date)",
+        "CREATE INDEX IF NOT EXISTS idx_purchase_product_item ON purchase_product(item COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_purchase_payment_purchaser_date ON purchase_payment(purchaser_id, date)",
+    ]),
+    (3, "sequence table for purchaser ids", [
+        SEQUENCE_TABLE_SQL,
+        lambda conn: _seed_sequences(conn.cursor()),
+    ]),
+    (4, "stock ledger of items purchased", [
+        STOCK_LEDGER_TABLE_SQL,
+        *stock_ledger_triggers("purchase_product"),
+        lambda conn: rebuild_stock_ledger(conn.cursor(), "purchase_product"),
+    ]),
+    (5, "stock ledger change numbers", [
+        lambda conn: add_change_numbers(conn, "purchase_product"),
+    ]),
+    (6, "full-text index on purchaser names and places",
+        name_index_sql("purchaser", "purchaser_name", "place")),
+    (7, "product catalog", [
+        PRODUCT_TABLE_SQL,
+        *catalog_sql("purchase_product", "item", "price", "last_purchase_price"),
+    ]),
+    (8, "dates as sortable YYYY-MM-DD HH:MM:SS text", [
+        *normalize_dates_sql("purchaser"),
+        *normalize_dates_sql("purchase_product"),
+        *normalize_dates_sql("purchase_payment"),
+        "CREATE INDEX IF NOT EXISTS idx_purchase_payment_date ON purchase_payment(date)",
+    ]),
+    (9, "indexed lower-case status",
+        status_sql("purchaser")),
+    (10, "per-month change counters for the Parquet export", [
+        *month_changes_sql("purchase_product"),
+        *month_changes_sql("purchase_payment"),
+    ]),
+    # In case the database was vacuumed since the index was built
+    (11, "name index rebuilt against current rowids", [
+        rebuild_name_index_sql("purchaser"),
+    ]),
+    (12, "catalog follows price and description edits",
+        catalog_edit_sql("purchase_product", "item", "price", "last_purchase_price")),
+]
+
+def _seed_sequences(c):
+    # Carry on from the highest PU id in use
+    c.execute("SELECT MAX(CAST(SUBSTR(purchaser_id, 3) AS INTEGER)) FROM purchaser WHERE purchaser_id LIKE 'PU%'")
+    seed_sequence(c, "purchaser_id", c.fetchone()[0])
+
+def _load_phone_entries():
+    return get_db_connection().execute(
+        "SELECT phone_number, purchaser_name, place FROM purchaser").fetchall()
+
+# Phone autocomplete answers from memory; see phone_index.py
+PHONE_INDEX = PhonePrefixIndex(_load_phone_entries)
+
+def create_tables():
+    run_migrations("purchase", MIGRATIONS)
 
 create_tables()
+def _next_purchaser_id(c):
+    return f"PU{allocate(c, 'purchase', 'purchaser_id'):05d}"
+
 def get_next_purchaser_id():
+    """Returns the id the next new purchaser will get, without reserving it."""
     try:
         with get_db_connection() as conn:
-            c = conn.cursor()
-            c.execute("SELECT purchaser_id FROM purchaser ORDER BY purchaser_id DESC LIMIT 1")
-            row = c.fetchone()
-            return f"PU{int(row[0][2:])+1:05d}" if row else "PU00001"
+            return f"PU{peek_value(conn.cursor(), 'purchaser_id'):05d}"
     except sqlite3.Error as e:
         print(f"ID generation error: {e}")
         return "PU00001"  # Fallback
@@ -76,23 +145,43 @@ def add_purchaser(name, place, phone, total_amount, amount_paid):
 
 
     try:
-        purchaser_id = get_next_purchaser_id()
-        date_now = datetime.now().strftime("%Y-%m-%d")
+        date_now = now()
         remaining = total_amount - amount_paid
         status = "completed" if remaining == 0 else "pending"
         with get_db_connection() as conn:
             c = conn.cursor()
+            purchaser_id = _next_purchaser_id(c)
             c.execute("""
             INSERT INTO purchaser VALUES
             (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (purchaser_id, name, place, phone, total_amount, 
                  date_now, amount_paid, remaining, status))
+        PHONE_INDEX.add(phone, name, place)
         return purchaser_id
     except sqlite3.Error as e:
         print(f"Add purchaser error: {e}")
         return None
 
 
+def _apply_balance_delta(c, purchaser_id, total_delta=0, paid_delta=0):
+    """
+    Moves the purchaser header's running balances by the given deltas instead of
+    re-summing every line and payment the purchaser has ever had.
+    """
+    c.execute("""
+        UPDATE purchaser
+        SET total_amount = total_amount + :total,
+            amount_paid = amount_paid + :paid,
+            remaining_amount = (total_amount + :total) - (amount_paid + :paid),
+            status = CASE WHEN (total_amount + :total) - (amount_paid + :paid) <= 0.001
+                          THEN 'completed' ELSE 'pending' END
+        WHERE purchaser_id = :id
+    """, {"total": total_delta, "paid": paid_delta, "id": purchaser_id})
+
+def _paid_delta(transaction_type, amount_paid):
+    # 'debit' rows are money paid towards the bill, 'credit' rows are refunds
+    return amount_paid if transaction_type == 'debit' else -amount_paid
+
 def add_purchase_product(purchaser_id, item, qty, price, description, amount, date_now):
     try:
         with get_db_connection() as conn:
@@ -100,24 +189,9 @@ def add_purchase_product(purchaser_id, item, qty, price, description, amount, da
             c.execute("""
                 INSERT INTO purchase_product 
                 (purchaser_id, item, qty, price, description, amount, date)
-                VALUES (?, ?, ?, ?, ?, ?, ?)      -- <-- Add one more ? here
-            """, (purchaser_id, item, qty, price, description, amount, date_now))  # <-- Add date_now here
-
-            c.execute("""
-                SELECT SUM(amount) FROM purchase_product WHERE purchaser_id=?
-            """, (purchaser_id,))
-            total_amount = c.fetchone()[0] or 0
-            c.execute("""
-                SELECT amount_paid FROM purchaser WHERE purchaser_id=?
-            """, (purchaser_id,))
-            amount_paid = c.fetchone()[0] or 0
-
-            remaining = total_amount - amount_paid
-            status = "completed" if remaining <= 0.001 else "pending"
-            c.execute("""
-                UPDATE purchaser SET total_amount=?, remaining_amount=?, status=?
-                WHERE purchaser_id=?
-            """, (total_amount, remaining, status, purchaser_id))
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (purchaser_id, item, qty, price, description, amount, date_now))
+            _apply_balance_delta(c, purchaser_id, total_delta=amount)
 
         return True
     except sqlite3.Error as e:
@@ -133,34 +207,12 @@ def add_purchase_payment(purchaser_id, payment_id, date, amount_paid, transactio
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
-
             c.execute("""
                 INSERT INTO purchase_payment 
                 (purchaser_id, payment_id, date, amount_paid, transaction_type, remarks)
                 VALUES (?, ?, ?, ?, ?, ?)
             """, (purchaser_id, payment_id, date, amount_paid, transaction_type, remarks))
-
-            c.execute("""
-                SELECT 
-                    COALESCE(SUM(CASE WHEN transaction_type='debit' THEN amount_paid ELSE 0 END), 0) -
-                    COALESCE(SUM(CASE WHEN transaction_type='credit' THEN amount_paid ELSE 0 END), 0)
-                FROM purchase_payment WHERE purchaser_id=?
-            """, (purchaser_id,))
-            total_paid = c.fetchone()[0] or 0
-
-
-            c.execute("""
-                SELECT total_amount FROM purchaser WHERE purchaser_id=?
-            """, (purchaser_id,))
-            total_amount = c.fetchone()[0] or 0
-
-            remaining = total_amount - total_paid
-            status = "completed" if remaining <= 0.001 else "pending"
-
-            c.execute("""
-                UPDATE purchaser SET amount_paid=?, remaining_amount=?, status=?
-                WHERE purchaser_id=?
-            """, (total_paid, remaining, status, purchaser_id))
+            _apply_balance_delta(c, purchaser_id, paid_delta=_paid_delta(transaction_type, amount_paid))
 
         return True
     except sqlite3.Error as e:
@@ -169,42 +221,82 @@ def add_purchase_payment(purchaser_id, payment_id, date, amount_paid, transactio
 
 
 
+def commit_purchase_bill(name, place, phone, products, amount_paid=0, payment_id=None, date_now=None):
+    """
+    Writes a whole purchase bill in one transaction: the purchaser (reused when
+    the name+phone pair exists), every line in products as
+    [(item, qty, price, description, amount), ...] and the payment.
+    The running balances are moved once for the whole bill.
+    Returns the purchaser_id, or None if anything failed (nothing is written then).
+    """
+    if date_now is None:
+        date_now = now()
+    conn = get_db_connection()
+    try:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            c = conn.cursor()
+            c.execute("SELECT purchaser_id FROM purchaser WHERE purchaser_name=? AND phone_number=?", (name, phone))
+            row = c.fetchone()
+            created = not row
+            if row:
+                purchaser_id = row[0]
+            else:
+                # A phone already used by another name fails the UNIQUE check and rolls back
+                purchaser_id = _next_purchaser_id(c)
+                c.execute("""
+                INSERT INTO purchaser VALUES
+                (?, ?, ?, ?, 0, ?, 0, 0, 'pending')
+                """, (purchaser_id, name, place, phone, date_now))
+
+            c.executemany("""
+                INSERT INTO purchase_product
+                (purchaser_id, item, qty, price, description, amount, date)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, [(purchaser_id, item, qty, price, description, amount, date_now)
+                  for item, qty, price, description, amount in products])
+
+            if amount_paid > 0:
+                c.execute("""
+                    INSERT INTO purchase_payment
+                    (purchaser_id, payment_id, date, amount_paid, transaction_type, remarks)
+                    VALUES (?, ?, ?, ?, 'debit', NULL)
+                """, (purchaser_id, payment_id or generate_payment_id(), date_now, amount_paid))
+
+            bill_total = sum(p[4] for p in products)
+            _apply_balance_delta(c, purchaser_id, total_delta=bill_total, paid_delta=max(amount_paid, 0))
+        if created:
+            PHONE_INDEX.add(phone, name, place)
+        return purchaser_id
+    except sqlite3.Error as e:
+        print(f"Commit purchase bill error: {e}")
+        return None
+
+
 def search_purchasers_by_name(prefix):
+    """
+    Returns up to 5 (purchaser_name, place, phone_number) where every word of
+    prefix starts a word of the name or place, best match first and a name
+    typed out in full ahead of the rest; the first 5 by name if prefix is empty.
+    """
     with get_db_connection() as conn:
         c = conn.cursor()
-        if prefix:
-            c.execute("""
-                SELECT purchaser_name, place, phone_number FROM purchaser
-                WHERE purchaser_name LIKE ?
-                ORDER BY purchaser_name ASC
-                LIMIT 5
-            """, ('%' + prefix + '%',))
-        else:
-            c.execute("""
-                SELECT purchaser_name, place, phone_number FROM purchaser
-                ORDER BY purchaser_name ASC
-                LIMIT 5
-            """)
+        if prefix.split():
+            rows = ranked_rows(c, "purchaser", ["purchaser_name", "place", "phone_number"],
+                               prefix.split(), operator="AND", limit=5)
+            typed = prefix.strip().lower()
+            return sorted(rows, key=lambda row: row[0].lower() != typed)
+        c.execute("""
+            SELECT purchaser_name, place, phone_number FROM purchaser
+            ORDER BY purchaser_name ASC
+            LIMIT 5
+        """)
         return c.fetchall()
 
 
 def search_purchasers_by_phone(prefix):
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        if prefix:
-            c.execute("""
-                SELECT phone_number, purchaser_name, place FROM purchaser
-                WHERE phone_number LIKE ?
-                ORDER BY phone_number ASC
-                LIMIT 5
-            """, (prefix + '%',))
-        else:
-            c.execute("""
-                SELECT phone_number, purchaser_name, place FROM purchaser
-                ORDER BY phone_number ASC
-                LIMIT 5
-            """)
-        return c.fetchall()
+    """Returns up to 5 (phone_number, purchaser_name, place) whose phone starts with prefix."""
+    return PHONE_INDEX.lookup(prefix, limit=5)
 
 def check_purchaser_name_phone_match(name, phone):
     with get_db_connection() as conn:
@@ -221,36 +313,28 @@ def phone_exists(phone):
         return c.fetchone() is not None
 
 def get_all_phone_numbers():
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        c.execute("SELECT phone_number FROM purchaser")
-        return [row[0] for row in c.fetchall()]
+    return PHONE_INDEX.phones()
     
 def search_products_by_prefix(prefix):
     with get_db_connection() as conn:
         c = conn.cursor()
         c.execute("""
-            SELECT item, price, description
-            FROM purchase_product
-            WHERE item LIKE ?
-            GROUP BY item
-            ORDER BY item ASC
+            SELECT display_name, last_purchase_price, description
+            FROM product
+            WHERE item_key LIKE ?
+            ORDER BY item_key ASC
             LIMIT 10
-        """, (prefix + '%',))
+        """, (prefix.strip() + '%',))
         return c.fetchall()
 
 def search_purchasers_by_name_words(words):
     """
-    Returns a list of (purchaser_name,) matching any word in the name (case-insensitive).
+    Returns a list of (purchaser_name,) whose name or place has a word
+    starting with any of words (case-insensitive), best match first.
     """
     with get_db_connection() as conn:
-        c = conn.cursor()
-        if not words:
-            return []
-        query = "SELECT DISTINCT purchaser_name FROM purchaser WHERE " + " OR ".join(["purchaser_name LIKE ?"] * len(words))
-        params = [f"%{word}%" for word in words]
-        c.execute(query, params)
-        return c.fetchall()
+        rows = ranked_rows(conn.cursor(), "purchaser", ["purchaser_name"], words)
+    return list(dict.fromkeys(rows))
 
 def get_purchaser_by_name(name):
     """
@@ -312,63 +396,6 @@ def get_payments_by_purchaser_id(purchaser_id):
         """, (purchaser_id,))
         return c.fetchall()
 
-def get_all_activity_dates(name, phone):
-    """
-    Returns a set of all unique dates where either a product was purchased
-    or a payment was made for the given customer.
-    """
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        c.execute("""
-            SELECT DISTINCT DATE(pp.date)
-FROM purchase_product pp
-JOIN purchaser u ON pp.purchaser_id = u.purchaser_id
-WHERE u.purchaser_name=? AND u.phone_number=?
-
-        """, (name, phone))
-        product_dates = set(row[0] for row in c.fetchall())
-        c.execute("""
-           SELECT DISTINCT DATE(p.date)
-FROM purchase_payment p
-JOIN purchaser u ON p.purchaser_id = u.purchaser_id
-WHERE u.purchaser_name=? AND u.phone_number=?
-
-        """, (name, phone))
-        payment_dates = set(row[0] for row in c.fetchall())
-        return product_dates.union(payment_dates)
-
-def get_payment_dates_by_name_phone(name, phone):
-    """
-    Returns a set of unique dates where payments exist for this customer.
-    """
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        c.execute("""
-            SELECT DISTINCT DATE(p.date)
-FROM purchase_payment p
-JOIN purchaser u ON p.purchaser_id = u.purchaser_id
-WHERE u.purchaser_name=? AND u.phone_number=?
-
-        """, (name, phone))
-        return set(row[0] for row in c.fetchall())
-    
-def get_payments_by_name_phone_and_date(name, phone, date):
-    """
-    Returns all payments for this customer on a specific date.
-    """
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        c.execute("""
-            SELECT p.date, p.payment_id, p.purchaser_id, p.amount_paid
-            FROM purchase_payment p
-            JOIN purchaser u ON p.purchaser_id = u.purchaser_id
-            WHERE u.purchaser_name=? AND u.phone_number=? AND DATE(p.date)=?
-
-            ORDER BY p.date ASC
-        """, (name, phone, date))
-
-        return c.fetchall()
-
 def get_products_by_name_phone_and_date(name, phone, start_date=None, end_date=None):
     """
     Returns all products purchased by this customer between start_date and end_date (inclusive).
@@ -383,30 +410,65 @@ def get_products_by_name_phone_and_date(name, phone, start_date=None, end_date=N
             WHERE u.purchaser_name=? AND u.phone_number=?
         """
         params = [name, phone]
-        if start_date and end_date:
-            base_query += " AND DATE(pp.date) BETWEEN ? AND ?"
-            params.extend([start_date, end_date])
-        elif start_date:
-            base_query += " AND DATE(pp.date) >= ?"
-            params.append(start_date)
-        elif end_date:
-            base_query += " AND DATE(pp.date) <= ?"
-            params.append(end_date)
+        in_range, range_params = day_range("pp.date", start_date, end_date)
+        if in_range:
+            base_query += " AND " + in_range
+            params.extend(range_params)
         base_query += " ORDER BY pp.date ASC"
         c.execute(base_query, params)
         return c.fetchall()
 
+def get_history_by_day(name, phone, start_date=None, end_date=None):
+    """
+    Returns the purchaser's products and payments grouped by day, newest day
+    first, as [(day, products, payments), ...] with products as
+    (item, qty, price, description, amount, date) and payments as
+    (date, payment_id, purchaser_id, amount_paid), each oldest first.
+    Two queries however many days there are; start_date/end_date bound the
+    days (both inclusive).
+    """
+    products_range, products_params = day_range("pp.date", start_date, end_date)
+    payments_range, payments_params = day_range("p.date", start_date, end_date)
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute(f"""
+            SELECT pp.item, pp.qty, pp.price, pp.description, pp.amount, pp.date
+            FROM purchase_product pp
+            JOIN purchaser u ON pp.purchaser_id = u.purchaser_id
+            WHERE u.purchaser_name=? AND u.phone_number=? {"AND " + products_range if products_range else ""}
+            ORDER BY pp.date ASC
+        """, (name, phone, *products_params))
+        products = c.fetchall()
+        c.execute(f"""
+            SELECT p.date, p.payment_id, p.purchaser_id, p.amount_paid
+            FROM purchase_payment p
+            JOIN purchaser u ON p.purchaser_id = u.purchaser_id
+            WHERE u.purchaser_name=? AND u.phone_number=? {"AND " + payments_range if payments_range else ""}
+            ORDER BY p.date ASC
+        """, (name, phone, *payments_params))
+        payments = c.fetchall()
+
+    days = {}
+    for row in products:
+        days.setdefault(row[5][:10], ([], []))[0].append(row)
+    for row in payments:
+        days.setdefault(row[0][:10], ([], []))[1].append(row)
+    return [(day, *days[day]) for day in sorted(days, reverse=True)]
+
 def generate_payment_id():
-    """Generate a payment ID like PAY20250514185648 (using current timestamp)."""
-    return "PAY" + datetime.now().strftime("%Y%m%d%H%M%S")
+    """Generate a payment ID like PAY20250514185648-0000001-3fa2."""
+    return new_id("PAY")
+
+def generate_refund_id():
+    """Generate a refund ID like REFUND-20250514185648-0000001-3fa2."""
+    return new_id("REFUND-")
 
 def add_purchase_payment_to_record(purchaser_id, amount_paid):
     """
     Adds a payment to the purchase_payment table and updates the purchaser's amount_paid, remaining_amount, and status.
     Returns (True, new_remaining, new_status) on success, (False, None, None) on failure.
     """
-    from datetime import datetime
-    date_now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    date_now = now()
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
@@ -420,7 +482,7 @@ def add_purchase_payment_to_record(purchaser_id, amount_paid):
                 return False, None, None
 
             # Insert payment
-            payment_id = f"PAY{int(datetime.now().timestamp())}"
+            payment_id = generate_payment_id()
             c.execute("""
                 INSERT INTO purchase_payment (purchaser_id, payment_id, date, amount_paid)
                 VALUES (?, ?, ?, ?)
@@ -456,13 +518,14 @@ def get_purchases_by_date_range(from_date=None, to_date=None):
     with get_db_connection() as conn:
         c = conn.cursor()
         if from_date and to_date:
-            c.execute("""
+            in_range, range_params = day_range("p.date", from_date, to_date)
+            c.execute(f"""
                 SELECT u.purchaser_name, p.item, p.qty, p.price, p.amount, p.date
                 FROM purchase_product p
                 JOIN purchaser u ON p.purchaser_id = u.purchaser_id
-                WHERE DATE(p.date) BETWEEN ? AND ?
+                WHERE {in_range}
                 ORDER BY p.date DESC
-            """, (from_date, to_date))
+            """, range_params)
         else:
             c.execute("""
                 SELECT u.purchaser_name, p.item, p.qty, p.price, p.amount, p.date
@@ -475,6 +538,28 @@ def get_purchases_by_date_range(from_date=None, to_date=None):
 
 
     
+def list_purchases_page(from_date=None, to_date=None, after=None, limit=DEFAULT_PAGE_SIZE, order="recent"):
+    """
+    Returns one page of purchase lines as (purchaser_name, item, qty, price, amount, date, id),
+    newest first ('recent') or oldest first ('oldest'), limited to the days
+    from_date..to_date when given. For the next page pass
+    after=db_paging.page_cursor(last_row, 5, 6).
+    """
+    in_range, range_params = day_range("p.date", from_date, to_date)
+    after_sql, after_params, order_sql = keyset_page("p.date", "p.id", after, order)
+    where = " AND ".join(clause for clause in (in_range, after_sql) if clause)
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute(f"""
+            SELECT u.purchaser_name, p.item, p.qty, p.price, p.amount, p.date, p.id
+            FROM purchase_product p
+            JOIN purchaser u ON p.purchaser_id = u.purchaser_id
+            {"WHERE " + where if where else ""}
+            {order_sql}
+            LIMIT ?
+        """, (*range_params, *after_params, limit))
+        return c.fetchall()
+
 def get_recent_purchase_payments(order='recent', limit=5):
     """
     Returns a list of (purchaser_name, payment_id, amount_paid, date)
@@ -486,26 +571,24 @@ def get_recent_purchase_payments(order='recent', limit=5):
             SELECT u.purchaser_name, p.payment_id, p.amount_paid, p.date
             FROM purchase_payment p
             JOIN purchaser u ON p.purchaser_id = u.purchaser_id
-            ORDER BY datetime(p.date) {"DESC" if order == "recent" else "ASC"}
+            ORDER BY p.date {"DESC" if order == "recent" else "ASC"}
             LIMIT ?
         """, (limit,))
         return c.fetchall()
 
 def update_purchaser_phone_place(old_name, old_place, new_phone, new_place):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("SELECT * FROM purchaser WHERE purchaser_name=? AND place=?", (old_name, old_place))
-    row = c.fetchone()
-    if not row:
-        conn.close()
-        return False
-    c.execute("SELECT * FROM purchaser WHERE phone_number=? AND NOT (purchaser_name=? AND place=?)", (new_phone, old_name, old_place))
-    if c.fetchone():
-        conn.close()
-        return False
-    c.execute("UPDATE purchaser SET phone_number=?, place=? WHERE purchaser_name=? AND place=?", (new_phone, new_place, old_name, old_place))
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("SELECT * FROM purchaser WHERE purchaser_name=? AND place=?", (old_name, old_place))
+        row = c.fetchone()
+        if not row:
+            return False
+        c.execute("SELECT * FROM purchaser WHERE phone_number=? AND NOT (purchaser_name=? AND place=?)", (new_phone, old_name, old_place))
+        if c.fetchone():
+            return False
+        c.execute("UPDATE purchaser SET phone_number=?, place=? WHERE purchaser_name=? AND place=?", (new_phone, new_place, old_name, old_place))
+        conn.commit()
+    PHONE_INDEX.invalidate()
     return True
 
 def get_all_products_by_name_phone(name, phone):
@@ -602,12 +685,13 @@ def get_transactions_by_name_phone_and_date(name, phone, start, end):
             return []
         purchaser_id = row[0]
         if start and end:
-            c.execute("""
+            in_range, range_params = day_range("p.date", start, end)
+            c.execute(f"""
                 SELECT p.date, p.payment_id, p.purchaser_id, p.amount_paid
                 FROM purchase_payment p
-                WHERE p.purchaser_id=? AND DATE(p.date) BETWEEN ? AND ?
+                WHERE p.purchaser_id=? AND {in_range}
                 ORDER BY p.date DESC
-            """, (purchaser_id, start, end))
+            """, (purchaser_id, *range_params))
         else:
             c.execute("""
                 SELECT p.date, p.payment_id, p.purchaser_id, p.amount_paid
@@ -636,12 +720,50 @@ def get_purchases_by_name_phone_and_date(name, phone, from_date=None, to_date=No
         """
         params = [name, phone]
         if from_date and to_date:
-            query += " AND DATE(p.date) BETWEEN ? AND ?"
-            params.extend([from_date, to_date])
+            in_range, range_params = day_range("p.date", from_date, to_date)
+            query += " AND " + in_range
+            params.extend(range_params)
         query += " ORDER BY p.date DESC"
         c.execute(query, params)
         return c.fetchall()
 
 
+def verify_balances(fix=False):
+    """
+    Re-derives every purchaser's total, paid, remaining and status from the
+    line items and payments in one pass and returns the rows that drifted
+    from the running balances as
+    [(purchaser_id, (stored total, paid, remaining, status), (derived ...)), ...].
+    With fix=True the stored balances are overwritten with the derived ones.
+    """
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("""
+            SELECT h.purchaser_id, h.total_amount, h.amount_paid, h.remaining_amount, h.status,
+                   COALESCE(p.total, 0), COALESCE(pay.paid, 0)
+            FROM purchaser h
+            LEFT JOIN (SELECT purchaser_id, SUM(amount) AS total
+                       FROM purchase_product GROUP BY purchaser_id) p ON p.purchaser_id = h.purchaser_id
+            LEFT JOIN (SELECT purchaser_id,
+                              SUM(CASE WHEN transaction_type='debit' THEN amount_paid ELSE -amount_paid END) AS paid
+                       FROM purchase_payment GROUP BY purchaser_id) pay ON pay.purchaser_id = h.purchaser_id
+        """)
+        drift = []
+        for row_id, total, paid, remaining, status, real_total, real_paid in c.fetchall():
+            real_remaining = real_total - real_paid
+            real_status = "completed" if real_remaining <= 0.001 else "pending"
+            if (abs(total - real_total) > 0.001 or abs(paid - real_paid) > 0.001
+                    or abs(remaining - real_remaining) > 0.001 or status.lower() != real_status):
+                drift.append((row_id, (total, paid, remaining, status),
+                              (real_total, real_paid, real_remaining, real_status)))
+        if fix and drift:
+            c.executemany("""
+                UPDATE purchaser SET total_amount=?, amount_paid=?, remaining_amount=?, status=?
+                WHERE purchaser_id=?
+            """, [(*derived, row_id) for row_id, _, derived in drift])
+            conn.commit()
+        return drift
+
+
 if __name__ == "__main__":
     print("Tables created successfully!")
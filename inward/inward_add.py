@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import ttk
 import themes
 from inward import db_backend
+from product_autocomplete import ProductAutocompleteEntry
 
 
 from datetime import datetime
@@ -232,7 +233,7 @@ class InwardAddFrame(tk.Frame):
         row['amount_var'] = tk.StringVar(value="0.00")
         row['description_var'] = tk.StringVar()
         row['sno_label'] = tk.Label(self.scrollable_frame, text="", anchor="center", justify="center")
-        row['product_entry'] = ProductAutocompleteEntry(self.scrollable_frame, row, textvariable=row['product_var'], width=30, justify="center")
+        row['product_entry'] = ProductAutocompleteEntry(self.scrollable_frame, row, side="purchase", textvariable=row['product_var'], width=30, justify="center")
         row['qty_entry'] = tk.Entry(self.scrollable_frame, textvariable=row['qty_var'], width=16, justify="center")
         row['price_entry'] = tk.Entry(self.scrollable_frame, textvariable=row['price_var'], width=16, justify="center")
         row['amount_label'] = tk.Label(self.scrollable_frame, textvariable=row['amount_var'], anchor="center", justify="center")
@@ -319,31 +320,8 @@ class InwardAddFrame(tk.Frame):
             self.show_notification("Amounts must be valid numbers.", title="Invalid Amount")
             return
 
-        # Check purchaser logic
-        # 1. If name and phone combo exists, allow (reuse purchaser_id)
-        # 2. If phone exists with different name, error
-        # 3. Else, add new purchaser
-
-        purchaser_id = None
-        if db_backend.check_purchaser_name_phone_match(name, phone):
-            # Get existing purchaser_id for this name-phone combo
-            with db_backend.get_db_connection() as conn:
-                c = conn.cursor()
-                c.execute("SELECT purchaser_id FROM purchaser WHERE purchaser_name=? AND phone_number=?", (name, phone))
-                row = c.fetchone()
-                if row:
-                    purchaser_id = row[0]
-        elif db_backend.phone_exists(phone):
-            self.show_notification("This phone number is already registered with a different name.", title="Error")
-            return
-        else:
-            # New name and phone, add new purchaser
-            purchaser_id = db_backend.add_purchaser(name, place, phone, total_amount, amount_to_pay)
-            if not purchaser_id:
-                self.show_notification("Failed to add purchaser. Please try again.", title="Error")
-                return
-
-        # Add products
+        # Validate every product row before anything is written
+        products = []
         for row in self.rows:
             item = row['product_var'].get().strip()
             qty_str = row['qty_var'].get().strip()
@@ -362,27 +340,24 @@ class InwardAddFrame(tk.Frame):
             except ValueError:
                 self.show_notification("Please enter valid numbers for quantity, price, and amount.", title="Invalid Product Data")
                 return
-                
-            db_backend.add_purchase_product(
-            purchaser_id,
-            item,
-            qty,
-            price,
-            description,
-            amount,
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S")   # <-- Add this!
-        )
+            products.append((item, qty, price, description, amount))
 
+        # Check purchaser logic
+        # 1. If name and phone combo exists, allow (reuse purchaser_id)
+        # 2. If phone exists with different name, error
+        # 3. Else, a new purchaser is added together with the bill
+        if not db_backend.check_purchaser_name_phone_match(name, phone) and db_backend.phone_exists(phone):
+            self.show_notification("This phone number is already registered with a different name.", title="Error")
+            return
 
-        # Add payment record if any amount is paid
-        if amount_to_pay > 0:
-            payment_id = f"PAY{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            db_backend.add_purchase_payment(
-                purchaser_id,
-                payment_id,
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                amount_to_pay
-            )
+        # Purchaser, products and payment go in as one transaction
+        payment_id = db_backend.generate_payment_id()
+        purchaser_id = db_backend.commit_purchase_bill(
+            name, place, phone, products, amount_to_pay, payment_id=payment_id
+        )
+        if not purchaser_id:
+            self.show_notification("Failed to save the purchase. Nothing was recorded, please try again.", title="Error")
+            return
 
         # Show confirmation
         balance = total_amount - amount_to_pay
@@ -483,58 +458,6 @@ class AutocompleteEntry(tk.Entry):
     def comparison(self):
         pattern = self.var.get()
         return [w for w in self.autocomplete_list if w.startswith(pattern)]
-import tkinter as tk
-
-class ProductAutocompleteEntry(tk.Entry):
-    def __init__(self, parent, row, *args, **kwargs):
-        super().__init__(parent, *args, **kwargs)
-        self.row = row  # Reference to the row dict
-        self.listbox = None
-        self.bind('<KeyRelease>', self.check_autocomplete)
-
-    def check_autocomplete(self, event):
-        typed = self.get()
-        if not typed:
-            self.hide_listbox()
-            return
-        matches = db_backend.search_products_by_prefix(typed)  # Returns list of (item, price, desc)
-        if matches:
-            self.show_listbox([m[0] for m in matches], matches)
-        else:
-            self.hide_listbox()
-
-    def show_listbox(self, names, matches):
-        if not self.listbox:
-            # Use the root window as parent for the Listbox for correct placement
-            root = self.winfo_toplevel()
-            self.listbox = tk.Listbox(root, width=20)
-            # Calculate absolute position
-            x = self.winfo_rootx()
-            y = self.winfo_rooty() + self.winfo_height()
-            self.listbox.place(x=x, y=y)
-            self.listbox.bind("<<ListboxSelect>>", lambda e: self.select_from_listbox(matches))
-        self.listbox.delete(0, tk.END)
-        for name in names:
-            self.listbox.insert(tk.END, name)
-
-    def hide_listbox(self):
-        if self.listbox:
-            self.listbox.destroy()
-            self.listbox = None
-
-    def select_from_listbox(self, matches):
-        if not self.listbox:
-            return
-        idx = self.listbox.curselection()
-        if not idx:
-            return
-        selected = matches[idx[0]]
-        # Autofill product name, price, and description
-        self.delete(0, tk.END)
-        self.insert(0, selected[0])
-        self.row['price_var'].set(str(selected[1]))
-        self.row['description_var'].set(selected[2])
-        self.hide_listbox()
 
 
 # Standalone test
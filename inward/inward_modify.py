@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import ttk
 from inward import db_backend
 from tkcalendar import DateEntry
+from virtual_table import VirtualTable
 
 
 class InwardModifyFrame(tk.Frame):
@@ -479,7 +480,6 @@ class InwardModifyFrame(tk.Frame):
 
     def show_product_cards(self, products):
         colors = self.get_colors()
-        card_bg = colors.get("card_bg", "#f0f0f0")
 
         for widget in self.modify_frame.winfo_children():
             widget.destroy()
@@ -529,53 +529,18 @@ class InwardModifyFrame(tk.Frame):
         table_container.grid(row=1, column=0, sticky="nsew")
         outer_frame.grid_rowconfigure(1, weight=1)
 
-        # Scrollable canvas
-        table_canvas = tk.Canvas(table_container, bg=colors["bg"], highlightthickness=0)
-        table_canvas.grid(row=0, column=0, sticky="nsew")
-        table_scrollbar = ttk.Scrollbar(table_container, orient="vertical", command=table_canvas.yview)
-        table_scrollbar.grid(row=0, column=1, sticky="ns")
-        table_container.grid_rowconfigure(0, weight=1)
-        table_container.grid_columnconfigure(0, weight=1)
-
-        table_frame = tk.Frame(table_canvas, bg=colors["bg"])
-        table_canvas.create_window((0, 0), window=table_frame, anchor="nw")
-        table_canvas.configure(yscrollcommand=table_scrollbar.set)
-
-        def on_canvas_configure(event):
-            table_canvas.itemconfig("table_frame", width=event.width)
-        table_canvas.bind("<Configure>", lambda event: table_canvas.itemconfig(table_canvas.find_withtag("table_frame"), width=event.width))
-
-        # --- Table Header with Actions ---
-        headers = ["Item", "Qty", "Price", "Description", "Amount", "Date", "Actions"]
-        for col, h in enumerate(headers):
-            tk.Label(table_frame, text=h, bg=colors["bg"], fg=colors["fg"], font=("Arial", 10, "bold"),
-                    borderwidth=1, relief="solid", anchor="center").grid(row=0, column=col, sticky="nsew", padx=1, pady=1)
-
-        # --- Table Rows ---
-        for row_idx, product in enumerate(products, start=1):
-            for col_idx, value in enumerate(product):
-                display_value = value
-                if headers[col_idx] in ["Price", "Amount"]:
-                    try:
-                        display_value = f"₹{float(value):.2f}"
-                    except Exception:
-                        display_value = str(value)
-                tk.Label(table_frame, text=display_value, bg=card_bg, fg=colors["fg"], borderwidth=1,
-                        relief="solid", anchor="center").grid(row=row_idx, column=col_idx, sticky="nsew", padx=1, pady=1)
-            # Actions column with Edit and Delete
-            actions_frame = tk.Frame(table_frame, bg=card_bg)
-            actions_frame.grid(row=row_idx, column=len(headers)-1, sticky="nsew", padx=1, pady=1)
-            tk.Button(actions_frame, text="Edit", bg=colors["button_bg"], fg=colors["fg"],
-          command=lambda p=product: self.show_edit_form(p), width=6).pack(side="left", padx=2)
-
-            tk.Button(actions_frame, text="Delete", bg=colors["button_bg"], fg=colors["fg"],
-                    command=lambda p=product: self.on_delete_product(p), width=6).pack(side="left", padx=2)
-       
-
+        def rupees(value):
+            try:
+                return f"₹{float(value):.2f}"
+            except Exception:
+                return str(value)
 
-        # --- Make columns expand equally ---
-        for col in range(len(headers)):
-            table_frame.grid_columnconfigure(col, weight=1)
+        # Only the rows on screen are drawn; Edit and Delete act on the clicked row
+        table = VirtualTable(
+            table_container, ["Item", "Qty", "Price", "Description", "Amount", "Date"], colors,
+            data=products, formatters={2: rupees, 4: rupees},
+            actions=[("Edit", self.show_edit_form), ("Delete", self.on_delete_product)])
+        table.pack(fill="both", expand=True)
 
 
     def reset_date_filter(self):
@@ -1081,7 +1046,7 @@ class InwardModifyFrame(tk.Frame):
                 return
             purchaser_id = purchaser[0]
             import datetime
-            payment_id = f"REFUND-{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
+            payment_id = db_backend.generate_refund_id()
             now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             remarks = f"CREDITED {refund_amt:.2f}"
 
@@ -27,6 +27,8 @@ from themes import THEMES
 
 import themes  # Import your new themes module
 from user import CompanyInfoForm, load_company_info
+from db_pool import get_pool_stats, close_thread_connections, check_pragmas
+import data_worker
 import json
 
 
@@ -524,6 +526,7 @@ class TrackedgeApp:
         self.apply_theme()
 
 def main():
+    check_pragmas()
     root = tk.Tk()
     root.withdraw()  # Hide main window initially
 
@@ -547,6 +550,11 @@ def main():
 
     root.after(2500, show_main_app)
     root.mainloop()
+    data_worker.shutdown()
+
+    pool_stats = get_pool_stats()["total"]
+    print(f"DB connections opened: {pool_stats['opened']}, reused: {pool_stats['reused']}")
+    close_thread_connections()
 
 
 if __name__ == "__main__":
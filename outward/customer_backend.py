@@ -1,32 +1,41 @@
 import sqlite3
 import os
-from datetime import datetime
-
-DB_NAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), "customer.db")
+import json
+from db_pool import BASE_DIR, DB_PATHS, get_connection
+from db_migrations import run_migrations
+from db_sequences import SEQUENCE_TABLE_SQL, allocate, peek_value, seed_sequence
+from db_stock_ledger import (STOCK_LEDGER_TABLE_SQL, add_change_numbers, rebuild_stock_ledger,
+                             stock_ledger_triggers)
+from db_catalog import PRODUCT_TABLE_SQL, catalog_edit_sql, catalog_sql
+from db_dates import day_range, normalize_dates_sql, now
+from db_months import month_changes_sql
+from db_status import status_sql
+from db_paging import DEFAULT_PAGE_SIZE, keyset_page
+from db_name_search import name_index_sql, ranked_rows, rebuild_name_index_sql
+from id_generator import new_id
+from phone_index import PhonePrefixIndex
+
+DB_NAME = DB_PATHS["customer"]
+BILL_COUNTER_PATH = os.path.join(BASE_DIR, "outward", "bill_counter.json")
 
 def get_db_connection():
-    conn = sqlite3.connect(DB_NAME)
-    conn.execute("PRAGMA foreign_keys = ON")
-    return conn
-
-def create_tables():
-    with get_db_connection() as conn:
-        c = conn.cursor()
+    return get_connection("customer")
 
-        c.execute("""
+MIGRATIONS = [
+    (1, "base tables", [
+        """
 CREATE TABLE IF NOT EXISTS customer (
     customer_id TEXT PRIMARY KEY,
     customer_name TEXT NOT NULL,
     place TEXT NOT NULL,
-    phone_number TEXT NOT NULL UNIQUE,  -- <--- ADD UNIQUE HERE
+    phone_number TEXT NOT NULL UNIQUE,
     total_amount REAL NOT NULL,
     date TEXT NOT NULL,
     amount_paid REAL NOT NULL,
     remaining_amount REAL NOT NULL,
     status TEXT NOT NULL
-)""")
-
-        c.execute("""
+)""",
+        """
         CREATE TABLE IF NOT EXISTS customer_product (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             customer_id TEXT NOT NULL,
@@ -35,10 +44,10 @@ CREATE TABLE IF NOT EXISTS customer (
             price REAL NOT NULL,
             description TEXT,
             amount REAL NOT NULL,
-            date TEXT NOT NULL,  -- <-- Add this line
+            date TEXT NOT NULL,
             FOREIGN KEY (customer_id) REFERENCES customer(customer_id) ON DELETE CASCADE
-        )""")
-        c.execute("""
+        )""",
+        """
         CREATE TABLE IF NOT EXISTS customer_payment (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     customer_id TEXT NOT NULL,
@@ -48,16 +57,114 @@ CREATE TABLE IF NOT EXISTS customer (
     transaction_type TEXT NOT NULL DEFAULT 'debit',
     remarks TEXT,
     FOREIGN KEY (customer_id) REFERENCES customer(customer_id) ON DELETE CASCADE
-)""")
+)""",
+    ]),
+    (2, "secondary indexes for per-customer views", [
+        "CREATE INDEX IF NOT EXISTS idx_customer_name_phone ON customer(customer_name, phone_number)",
+        # NOCASE so that LIKE 'prefix%' (case-insensitive) can use the index
+        "CREATE INDEX IF NOT EXISTS idx_customer_phone_nocase ON customer(phone_number COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_customer_product_customer_date ON customer_product(customer_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_customer_product_date ON customer_product(date)",
+        "CREATE INDEX IF NOT EXISTS idx_customer_product_item ON customer_product(item COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_customer_payment_customer_date ON customer_payment(customer_id, date)",
+    ]),
+    (3, "sales bill register", [
+        """
+        CREATE TABLE IF NOT EXISTS customer_bill (
+            bill_no TEXT PRIMARY KEY,
+            customer_id TEXT NOT NULL,
+            date TEXT NOT NULL,
+            total_amount REAL NOT NULL,
+            amount_paid REAL NOT NULL,
+            FOREIGN KEY (customer_id) REFERENCES customer(customer_id) ON DELETE CASCADE
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_customer_bill_customer ON customer_bill(customer_id)",
+    ]),
+    (4, "sequence table for bill numbers and customer ids", [
+        SEQUENCE_TABLE_SQL,
+        lambda conn: _seed_sequences(conn.cursor()),
+    ]),
+    (5, "stock ledger of items sold", [
+        STOCK_LEDGER_TABLE_SQL,
+        *stock_ledger_triggers("customer_product"),
+        lambda conn: rebuild_stock_ledger(conn.cursor(), "customer_product"),
+    ]),
+    (6, "stock ledger change numbers", [
+        lambda conn: add_change_numbers(conn, "customer_product"),
+    ]),
+    (7, "full-text index on customer names and places",
+        name_index_sql("customer", "customer_name", "place")),
+    (8, "product catalog", [
+        PRODUCT_TABLE_SQL,
+        *catalog_sql("customer_product", "item", "price", "last_sale_price"),
+    ]),
+    (9, "dates as sortable YYYY-MM-DD HH:MM:SS text", [
+        *normalize_dates_sql("customer"),
+        *normalize_dates_sql("customer_product"),
+        *normalize_dates_sql("customer_payment"),
+        *normalize_dates_sql("customer_bill"),
+        "CREATE INDEX IF NOT EXISTS idx_customer_payment_date ON customer_payment(date)",
+    ]),
+    (10, "indexed lower-case status",
+        status_sql("customer")),
+    (11, "per-month change counters for the Parquet export", [
+        *month_changes_sql("customer_product"),
+        *month_changes_sql("customer_payment"),
+    ]),
+    # In case the database was vacuumed since the index was built
+    (12, "name index rebuilt against current rowids", [
+        rebuild_name_index_sql("customer"),
+    ]),
+    (13, "catalog follows price and description edits",
+        catalog_edit_sql("customer_product", "item", "price", "last_sale_price")),
+    # Payments from the Record Payment screen used to be inserted without a
+    # type and so took the column default, 'debit' (a refund), although they
+    # were counted as paid; their ids always start with CREDIT-
+    (14, "recorded payments typed as credit", [
+        """
+        UPDATE customer_payment SET transaction_type = 'credit'
+        WHERE payment_id GLOB 'CREDIT-*' AND transaction_type <> 'credit'
+        """,
+    ]),
+]
+
+def _seed_sequences(c):
+    # Carry on from the highest CU id in use and from the old JSON bill counter
+    c.execute("SELECT MAX(CAST(SUBSTR(customer_id, 3) AS INTEGER)) FROM customer WHERE customer_id LIKE 'CU%'")
+    seed_sequence(c, "customer_id", c.fetchone()[0])
+    c.execute("SELECT MAX(CAST(SUBSTR(bill_no, 9) AS INTEGER)) FROM customer_bill WHERE bill_no LIKE 'CUSTBILL%'")
+    last_bill = c.fetchone()[0] or 0
+    try:
+        if os.path.exists(BILL_COUNTER_PATH):
+            with open(BILL_COUNTER_PATH) as f:
+                # the JSON file stores the next number to hand out
+                last_bill = max(last_bill, int(json.load(f).get("counter", 1)) - 1)
+    except (ValueError, OSError) as e:
+        print(f"Could not import {BILL_COUNTER_PATH}: {e}")
+    seed_sequence(c, "customer_bill", last_bill)
+
+def _load_phone_entries():
+    return get_db_connection().execute(
+        "SELECT phone_number, customer_name, place FROM customer").fetchall()
+
+# Phone autocomplete answers from memory; see phone_index.py
+PHONE_INDEX = PhonePrefixIndex(_load_phone_entries)
+
+def create_tables():
+    run_migrations("customer", MIGRATIONS)
 
 create_tables()
+def _next_customer_id(c):
+    return f"CU{allocate(c, 'customer', 'customer_id'):05d}"
+
+def _next_bill_no(c):
+    return f"CUSTBILL{allocate(c, 'customer', 'customer_bill'):05d}"
+
 def get_next_customer_id():
+    """Returns the id the next new customer will get, without reserving it."""
     try:
         with get_db_connection() as conn:
-            c = conn.cursor()
-            c.execute("SELECT customer_id FROM customer ORDER BY customer_id DESC LIMIT 1")
-            row = c.fetchone()
-            return f"CU{int(row[0][2:])+1:05d}" if row else "CU00001"
+            return f"CU{peek_value(conn.cursor(), 'customer_id'):05d}"
     except sqlite3.Error as e:
         print(f"ID generation error: {e}")
         return "CU00001"  # Fallback
@@ -79,17 +186,18 @@ def add_customer(name, place, phone, total_amount, amount_paid):
 
     # 3. If both name and phone are new: Add
     try:
-        customer_id = get_next_customer_id()
-        date_now = datetime.now().strftime("%Y-%m-%d")
+        date_now = now()
         remaining = total_amount - amount_paid
         status = "completed" if remaining == 0 else "pending"
         with get_db_connection() as conn:
             c = conn.cursor()
+            customer_id = _next_customer_id(c)
             c.execute("""
             INSERT INTO customer VALUES
             (?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (customer_id, name, place, phone, total_amount, 
                  date_now, amount_paid, remaining, status))
+        PHONE_INDEX.add(phone, name, place)
         return customer_id
     except sqlite3.Error as e:
         print(f"Add customer error: {e}")
@@ -97,37 +205,35 @@ def add_customer(name, place, phone, total_amount, amount_paid):
 
 # Similar error handling for add_purchase_product() and add_purchase_payment()
 
+def _apply_balance_delta(c, customer_id, total_delta=0, paid_delta=0):
+    """
+    Moves the customer header's running balances by the given deltas instead of
+    re-summing every line and payment the customer has ever had.
+    """
+    c.execute("""
+        UPDATE customer
+        SET total_amount = total_amount + :total,
+            amount_paid = amount_paid + :paid,
+            remaining_amount = (total_amount + :total) - (amount_paid + :paid),
+            status = CASE WHEN (total_amount + :total) - (amount_paid + :paid) <= 0.001
+                          THEN 'completed' ELSE 'pending' END
+        WHERE customer_id = :id
+    """, {"total": total_delta, "paid": paid_delta, "id": customer_id})
+
+def _paid_delta(transaction_type, amount_paid):
+    # 'credit' rows are money paid towards the bill, 'debit' rows are refunds
+    return amount_paid if transaction_type == 'credit' else -amount_paid
+
 def add_customer_product(customer_id, item, qty, price, description, amount, date_now):
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
-            # Insert the new product (add 'date' field)
             c.execute("""
                 INSERT INTO customer_product 
                 (customer_id, item, qty, price, description, amount, date)
-                VALUES (?, ?, ?, ?, ?, ?, ?)      -- <-- Add one more ? here
-            """, (customer_id, item, qty, price, description, amount, date_now))  # <-- Add date_now here
-
-            # Recalculate total amount for this purchase
-            c.execute("""
-                SELECT SUM(amount) FROM customer_product WHERE customer_id=?
-            """, (customer_id,))
-            total_amount = c.fetchone()[0] or 0
-
-            # Get the amount paid so far
-            c.execute("""
-                SELECT amount_paid FROM customer WHERE customer_id=?
-            """, (customer_id,))
-            amount_paid = c.fetchone()[0] or 0
-
-            remaining = total_amount - amount_paid
-            status = "completed" if remaining <= 0.001 else "pending"
-
-            # Update purchaser table
-            c.execute("""
-                UPDATE customer SET total_amount=?, remaining_amount=?, status=?
-                WHERE customer_id=?
-            """, (total_amount, remaining, status, customer_id))
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (customer_id, item, qty, price, description, amount, date_now))
+            _apply_balance_delta(c, customer_id, total_delta=amount)
 
         return True
     except sqlite3.Error as e:
@@ -139,37 +245,12 @@ def add_customer_payment(customer_id, payment_id, date, amount_paid, transaction
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
-            # Insert the new payment
             c.execute("""
                 INSERT INTO customer_payment 
                 (customer_id, payment_id, date, amount_paid, transaction_type, remarks)
                 VALUES (?, ?, ?, ?, ?, ?)
             """, (customer_id, payment_id, date, amount_paid, transaction_type, remarks))
-
-            # Recalculate total paid for this purchase (debits minus credits)
-            c.execute("""
-    SELECT 
-        COALESCE(SUM(CASE WHEN transaction_type='credit' THEN amount_paid ELSE 0 END), 0) -
-        COALESCE(SUM(CASE WHEN transaction_type='debit' THEN amount_paid ELSE 0 END), 0)
-    FROM customer_payment WHERE customer_id=?
-""", (customer_id,))
-            total_paid = c.fetchone()[0] or 0
-
-
-            # Get the total amount for this purchase
-            c.execute("""
-                SELECT total_amount FROM customer WHERE customer_id=?
-            """, (customer_id,))
-            total_amount = c.fetchone()[0] or 0
-
-            remaining = total_amount - total_paid
-            status = "completed" if remaining <= 0.001 else "pending"
-
-            # Update purchaser table
-            c.execute("""
-                UPDATE customer SET amount_paid=?, remaining_amount=?, status=?
-                WHERE customer_id=?
-            """, (total_paid, remaining, status, customer_id))
+            _apply_balance_delta(c, customer_id, paid_delta=_paid_delta(transaction_type, amount_paid))
 
         return True
     except sqlite3.Error as e:
@@ -178,42 +259,91 @@ def add_customer_payment(customer_id, payment_id, date, amount_paid, transaction
 
 
 
+def commit_customer_bill(name, place, phone, products, amount_paid=0, payment_id=None, bill_no=None, date_now=None):
+    """
+    Writes a whole sales bill in one transaction: the customer (reused when the
+    name+phone pair exists), every line in products as
+    [(item, qty, price, description, amount), ...], the payment and the bill
+    record. The running balances are moved once for the whole bill, and the
+    bill number is taken from the database sequence unless bill_no is given.
+    Returns (customer_id, bill_no), or (None, None) if anything failed
+    (nothing is written then).
+    """
+    if date_now is None:
+        date_now = now()
+    conn = get_db_connection()
+    try:
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            c = conn.cursor()
+            c.execute("SELECT customer_id FROM customer WHERE customer_name=? AND phone_number=?", (name, phone))
+            row = c.fetchone()
+            created = not row
+            if row:
+                customer_id = row[0]
+            else:
+                # A phone already used by another name fails the UNIQUE check and rolls back
+                customer_id = _next_customer_id(c)
+                c.execute("""
+                INSERT INTO customer VALUES
+                (?, ?, ?, ?, 0, ?, 0, 0, 'pending')
+                """, (customer_id, name, place, phone, date_now))
+
+            c.executemany("""
+                INSERT INTO customer_product
+                (customer_id, item, qty, price, description, amount, date)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, [(customer_id, item, qty, price, description, amount, date_now)
+                  for item, qty, price, description, amount in products])
+
+            if amount_paid > 0:
+                c.execute("""
+                    INSERT INTO customer_payment
+                    (customer_id, payment_id, date, amount_paid, transaction_type, remarks)
+                    VALUES (?, ?, ?, ?, 'credit', NULL)
+                """, (customer_id, payment_id or generate_payment_id(), date_now, amount_paid))
+
+            bill_total = sum(p[4] for p in products)
+            _apply_balance_delta(c, customer_id, total_delta=bill_total, paid_delta=max(amount_paid, 0))
+
+            if not bill_no:
+                bill_no = _next_bill_no(c)
+            c.execute("""
+                INSERT INTO customer_bill (bill_no, customer_id, date, total_amount, amount_paid)
+                VALUES (?, ?, ?, ?, ?)
+            """, (bill_no, customer_id, date_now, bill_total, amount_paid))
+        if created:
+            PHONE_INDEX.add(phone, name, place)
+        return customer_id, bill_no
+    except sqlite3.Error as e:
+        print(f"Commit bill error: {e}")
+        return None, None
+
+
 def search_customer_by_name(prefix):
+    """
+    Returns up to 5 (customer_name, place, phone_number) where every word of
+    prefix starts a word of the name or place, best match first and a name
+    typed out in full ahead of the rest; the first 5 by name if prefix is empty.
+    """
     with get_db_connection() as conn:
         c = conn.cursor()
-        if prefix:
-            c.execute("""
-                SELECT customer_name, place, phone_number FROM customer
-                WHERE customer_name LIKE ?
-                ORDER BY customer_name ASC
-                LIMIT 5
-            """, ('%' + prefix + '%',))
-        else:
-            c.execute("""
-                SELECT customer_name, place, phone_number FROM customer
-                ORDER BY customer_name ASC
-                LIMIT 5
-            """)
+        if prefix.split():
+            rows = ranked_rows(c, "customer", ["customer_name", "place", "phone_number"],
+                               prefix.split(), operator="AND", limit=5)
+            typed = prefix.strip().lower()
+            return sorted(rows, key=lambda row: row[0].lower() != typed)
+        c.execute("""
+            SELECT customer_name, place, phone_number FROM customer
+            ORDER BY customer_name ASC
+            LIMIT 5
+        """)
         return c.fetchall()
 
 
 def search_customer_by_phone(prefix):
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        if prefix:
-            c.execute("""
-                SELECT phone_number, customer_name, place FROM customer
-                WHERE phone_number LIKE ?
-                ORDER BY phone_number ASC
-                LIMIT 5
-            """, (prefix + '%',))
-        else:
-            c.execute("""
-                SELECT phone_number, customer_name, place FROM customer
-                ORDER BY phone_number ASC
-                LIMIT 5
-            """)
-        return c.fetchall()
+    """Returns up to 5 (phone_number, customer_name, place) whose phone starts with prefix."""
+    return PHONE_INDEX.lookup(prefix, limit=5)
 
 def check_customer_name_phone_match(name, phone):
     with get_db_connection() as conn:
@@ -231,34 +361,28 @@ def phone_exists(phone):
         return c.fetchone() is not None
 
 def get_all_phone_numbers():
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        c.execute("SELECT phone_number FROM customer")
-        return [row[0] for row in c.fetchall()]
+    return PHONE_INDEX.phones()
     
 def search_products_by_prefix(prefix):
     with get_db_connection() as conn:
         c = conn.cursor()
         c.execute("""
-            SELECT item, price, description
-            FROM customer_product
-            WHERE item LIKE ?
-            GROUP BY item
-            ORDER BY item ASC
+            SELECT display_name, last_sale_price, description
+            FROM product
+            WHERE item_key LIKE ?
+            ORDER BY item_key ASC
             LIMIT 10
-        """, (prefix + '%',))
+        """, (prefix.strip() + '%',))
         return c.fetchall()
 
 def search_customer_by_name_words(words):
- 
+    """
+    Returns a list of (customer_name,) whose name or place has a word
+    starting with any of words, best match first.
+    """
     with get_db_connection() as conn:
-        c = conn.cursor()
-        if not words:
-            return []
-        query = "SELECT DISTINCT customer_name FROM customer WHERE " + " OR ".join(["customer_name LIKE ?"] * len(words))
-        params = [f"%{word}%" for word in words]
-        c.execute(query, params)
-        return c.fetchall()
+        rows = ranked_rows(conn.cursor(), "customer", ["customer_name"], words)
+    return list(dict.fromkeys(rows))
 
 def get_customer_by_name(name):
 
@@ -311,60 +435,6 @@ def get_payments_by_customer_id(customer_id):
         """, (customer_id,))
         return c.fetchall()
 
-def get_all_activity_dates(name, phone):
- 
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        # Product dates
-        c.execute("""
-            SELECT DISTINCT DATE(pp.date)
-FROM customer_product pp
-JOIN customer u ON pp.customer_id = u.customer_id
-WHERE u.customer_name=? AND u.phone_number=?
-
-        """, (name, phone))
-        product_dates = set(row[0] for row in c.fetchall())
-        # Payment dates
-        c.execute("""
-           SELECT DISTINCT DATE(p.date)
-FROM customer_payment p
-JOIN customer u ON p.customer_id = u.customer_id
-WHERE u.customer_name=? AND u.phone_number=?
-
-        """, (name, phone))
-        payment_dates = set(row[0] for row in c.fetchall())
-        return product_dates.union(payment_dates)
-
-def get_payment_dates_by_name_phone(name, phone):
-  
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        c.execute("""
-            SELECT DISTINCT DATE(p.date)
-FROM customer_payment p
-JOIN customer u ON p.customer_id = u.customer_id
-WHERE u.customer_name=? AND u.phone_number=?
-
-        """, (name, phone))
-        return set(row[0] for row in c.fetchall())
-    
-def get_payments_by_name_phone_and_date(name, phone, date):
-    """
-    Returns all payments for this customer on a specific date.
-    """
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        c.execute("""
-            SELECT p.date, p.payment_id, p.customer_id, p.amount_paid
-            FROM customer_payment p
-            JOIN customer u ON p.customer_id = u.customer_id
-            WHERE u.customer_name=? AND u.phone_number=? AND DATE(p.date)=?
-
-            ORDER BY p.date ASC
-        """, (name, phone, date))
-
-        return c.fetchall()
-
 def get_products_by_name_phone_and_date(name, phone, start_date=None, end_date=None):
    
     with get_db_connection() as conn:
@@ -376,27 +446,62 @@ def get_products_by_name_phone_and_date(name, phone, start_date=None, end_date=N
             WHERE u.customer_name=? AND u.phone_number=?
         """
         params = [name, phone]
-        if start_date and end_date:
-            base_query += " AND DATE(pp.date) BETWEEN ? AND ?"
-            params.extend([start_date, end_date])
-        elif start_date:
-            base_query += " AND DATE(pp.date) >= ?"
-            params.append(start_date)
-        elif end_date:
-            base_query += " AND DATE(pp.date) <= ?"
-            params.append(end_date)
+        in_range, range_params = day_range("pp.date", start_date, end_date)
+        if in_range:
+            base_query += " AND " + in_range
+            params.extend(range_params)
         base_query += " ORDER BY pp.date ASC"
         c.execute(base_query, params)
         return c.fetchall()
 
+def get_history_by_day(name, phone, start_date=None, end_date=None):
+    """
+    Returns the customer's products and payments grouped by day, newest day
+    first, as [(day, products, payments), ...] with products as
+    (item, qty, price, description, amount, date) and payments as
+    (date, payment_id, customer_id, amount_paid), each oldest first.
+    Two queries however many days there are; start_date/end_date bound the
+    days (both inclusive).
+    """
+    products_range, products_params = day_range("pp.date", start_date, end_date)
+    payments_range, payments_params = day_range("p.date", start_date, end_date)
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute(f"""
+            SELECT pp.item, pp.qty, pp.price, pp.description, pp.amount, pp.date
+            FROM customer_product pp
+            JOIN customer u ON pp.customer_id = u.customer_id
+            WHERE u.customer_name=? AND u.phone_number=? {"AND " + products_range if products_range else ""}
+            ORDER BY pp.date ASC
+        """, (name, phone, *products_params))
+        products = c.fetchall()
+        c.execute(f"""
+            SELECT p.date, p.payment_id, p.customer_id, p.amount_paid
+            FROM customer_payment p
+            JOIN customer u ON p.customer_id = u.customer_id
+            WHERE u.customer_name=? AND u.phone_number=? {"AND " + payments_range if payments_range else ""}
+            ORDER BY p.date ASC
+        """, (name, phone, *payments_params))
+        payments = c.fetchall()
+
+    days = {}
+    for row in products:
+        days.setdefault(row[5][:10], ([], []))[0].append(row)
+    for row in payments:
+        days.setdefault(row[0][:10], ([], []))[1].append(row)
+    return [(day, *days[day]) for day in sorted(days, reverse=True)]
+
 def generate_payment_id():
-    
-    return "CREDIT-" + datetime.now().strftime("%Y%m%d%H%M%S")
+    """Generate a payment ID like CREDIT-20250514185648-0000001-3fa2."""
+    return new_id("CREDIT-")
+
+def generate_refund_id():
+    """Generate a refund ID like REFUND-20250514185648-0000001-3fa2."""
+    return new_id("REFUND-")
 
 def add_customer_payment_to_record(customer_id, amount_paid):
  
-    from datetime import datetime
-    date_now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    date_now = now()
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
@@ -410,10 +515,10 @@ def add_customer_payment_to_record(customer_id, amount_paid):
                 return False, None, None
 
             # Insert payment
-            payment_id = f"CREDIT-{int(datetime.now().timestamp())}"
+            payment_id = generate_payment_id()
             c.execute("""
-                INSERT INTO customer_payment (customer_id, payment_id, date, amount_paid)
-                VALUES (?, ?, ?, ?)
+                INSERT INTO customer_payment (customer_id, payment_id, date, amount_paid, transaction_type)
+                VALUES (?, ?, ?, ?, 'credit')
             """, (customer_id, payment_id, date_now, amount_paid))
 
             # Update purchaser table
@@ -443,13 +548,14 @@ def get_customer_by_date_range(from_date=None, to_date=None):
     with get_db_connection() as conn:
         c = conn.cursor()
         if from_date and to_date:
-            c.execute("""
+            in_range, range_params = day_range("p.date", from_date, to_date)
+            c.execute(f"""
                 SELECT u.customer_name, p.item, p.qty, p.price, p.amount, p.date
                 FROM customer_product p
                 JOIN customer u ON p.customer_id = u.customer_id
-                WHERE DATE(p.date) BETWEEN ? AND ?
+                WHERE {in_range}
                 ORDER BY p.date DESC
-            """, (from_date, to_date))
+            """, range_params)
         else:
             c.execute("""
                 SELECT u.customer_name, p.item, p.qty, p.price, p.amount, p.date
@@ -460,6 +566,28 @@ def get_customer_by_date_range(from_date=None, to_date=None):
         return c.fetchall()
 
 
+def list_sales_page(from_date=None, to_date=None, after=None, limit=DEFAULT_PAGE_SIZE, order="recent"):
+    """
+    Returns one page of sales lines as (customer_name, item, qty, price, amount, date, id),
+    newest first ('recent') or oldest first ('oldest'), limited to the days
+    from_date..to_date when given. For the next page pass
+    after=db_paging.page_cursor(last_row, 5, 6).
+    """
+    in_range, range_params = day_range("p.date", from_date, to_date)
+    after_sql, after_params, order_sql = keyset_page("p.date", "p.id", after, order)
+    where = " AND ".join(clause for clause in (in_range, after_sql) if clause)
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute(f"""
+            SELECT u.customer_name, p.item, p.qty, p.price, p.amount, p.date, p.id
+            FROM customer_product p
+            JOIN customer u ON p.customer_id = u.customer_id
+            {"WHERE " + where if where else ""}
+            {order_sql}
+            LIMIT ?
+        """, (*range_params, *after_params, limit))
+        return c.fetchall()
+
 def get_recent_customer_payments(order='recent', limit=5):
    
     with get_db_connection() as conn:
@@ -468,29 +596,27 @@ def get_recent_customer_payments(order='recent', limit=5):
             SELECT u.customer_name, p.payment_id, p.amount_paid, p.date
             FROM customer_payment p
             JOIN customer u ON p.customer_id = u.customer_id
-            ORDER BY datetime(p.date) {"DESC" if order == "recent" else "ASC"}
+            ORDER BY p.date {"DESC" if order == "recent" else "ASC"}
             LIMIT ?
         """, (limit,))
         return c.fetchall()
 
 def update_customer_phone_place(old_name, old_place, new_phone, new_place):
-    conn = get_db_connection()
-    c = conn.cursor()
-    # Check if purchaser exists
-    c.execute("SELECT * FROM customer WHERE customer_name=? AND place=?", (old_name, old_place))
-    row = c.fetchone()
-    if not row:
-        conn.close()
-        return False
-    # Check if new_phone is already used by another purchaser
-    c.execute("SELECT * FROM customer WHERE phone_number=? AND NOT (customer_name=? AND place=?)", (new_phone, old_name, old_place))
-    if c.fetchone():
-        conn.close()
-        return False
-    # Update phone and place
-    c.execute("UPDATE customer SET phone_number=?, place=? WHERE customer_name=? AND place=?", (new_phone, new_place, old_name, old_place))
-    conn.commit()
-    conn.close()
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        # Check if purchaser exists
+        c.execute("SELECT * FROM customer WHERE customer_name=? AND place=?", (old_name, old_place))
+        row = c.fetchone()
+        if not row:
+            return False
+        # Check if new_phone is already used by another purchaser
+        c.execute("SELECT * FROM customer WHERE phone_number=? AND NOT (customer_name=? AND place=?)", (new_phone, old_name, old_place))
+        if c.fetchone():
+            return False
+        # Update phone and place
+        c.execute("UPDATE customer SET phone_number=?, place=? WHERE customer_name=? AND place=?", (new_phone, new_place, old_name, old_place))
+        conn.commit()
+    PHONE_INDEX.invalidate()
     return True
 
 def get_all_products_by_name_phone(name, phone):
@@ -581,12 +707,13 @@ def get_transactions_by_name_phone_and_date(name, phone, start, end):
             return []
         customer_id = row[0]
         if start and end:
-            c.execute("""
+            in_range, range_params = day_range("p.date", start, end)
+            c.execute(f"""
                 SELECT p.date, p.payment_id, p.customer_id, p.amount_paid
                 FROM customer_payment p
-                WHERE p.customer_id=? AND DATE(p.date) BETWEEN ? AND ?
+                WHERE p.customer_id=? AND {in_range}
                 ORDER BY p.date DESC
-            """, (customer_id, start, end))
+            """, (customer_id, *range_params))
         else:
             c.execute("""
                 SELECT p.date, p.payment_id, p.customer_id, p.amount_paid
@@ -613,11 +740,50 @@ def get_customer_by_name_phone_and_date(name, phone, from_date=None, to_date=Non
         """
         params = [name, phone]
         if from_date and to_date:
-            query += " AND DATE(p.date) BETWEEN ? AND ?"
-            params.extend([from_date, to_date])
+            in_range, range_params = day_range("p.date", from_date, to_date)
+            query += " AND " + in_range
+            params.extend(range_params)
         query += " ORDER BY p.date DESC"
         c.execute(query, params)
         return c.fetchall()
 
+
+def verify_balances(fix=False):
+    """
+    Re-derives every customer's total, paid, remaining and status from the
+    line items and payments in one pass and returns the rows that drifted
+    from the running balances as
+    [(customer_id, (stored total, paid, remaining, status), (derived ...)), ...].
+    With fix=True the stored balances are overwritten with the derived ones.
+    """
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute("""
+            SELECT h.customer_id, h.total_amount, h.amount_paid, h.remaining_amount, h.status,
+                   COALESCE(p.total, 0), COALESCE(pay.paid, 0)
+            FROM customer h
+            LEFT JOIN (SELECT customer_id, SUM(amount) AS total
+                       FROM customer_product GROUP BY customer_id) p ON p.customer_id = h.customer_id
+            LEFT JOIN (SELECT customer_id,
+                              SUM(CASE WHEN transaction_type='credit' THEN amount_paid ELSE -amount_paid END) AS paid
+                       FROM customer_payment GROUP BY customer_id) pay ON pay.customer_id = h.customer_id
+        """)
+        drift = []
+        for row_id, total, paid, remaining, status, real_total, real_paid in c.fetchall():
+            real_remaining = real_total - real_paid
+            real_status = "completed" if real_remaining <= 0.001 else "pending"
+            if (abs(total - real_total) > 0.001 or abs(paid - real_paid) > 0.001
+                    or abs(remaining - real_remaining) > 0.001 or status.lower() != real_status):
+                drift.append((row_id, (total, paid, remaining, status),
+                              (real_total, real_paid, real_remaining, real_status)))
+        if fix and drift:
+            c.executemany("""
+                UPDATE customer SET total_amount=?, amount_paid=?, remaining_amount=?, status=?
+                WHERE customer_id=?
+            """, [(*derived, row_id) for row_id, _, derived in drift])
+            conn.commit()
+        return drift
+
+
 if __name__ == "__main__":
     print("Tables created successfully!")
@@ -2,7 +2,7 @@ import tkinter as tk
 from tkinter import ttk
 import themes
 from outward import customer_backend
-from inward import db_backend
+from product_autocomplete import ProductAutocompleteEntry
 import os
 import json
 from reportlab.lib.pagesizes import A4
@@ -30,19 +30,6 @@ class OutwardAddFrame(tk.Frame):
                                 bg=colors["bg"], fg=colors["fg"])
         self.title_label.pack(pady=(20, 10))
     
-    def get_next_bill_number(self):
-        path = os.path.join("outward", "bill_counter.json")
-        if not os.path.exists(path):
-            with open(path, "w") as f:
-                json.dump({"counter": 1}, f)
-        with open(path) as f:
-            data = json.load(f)
-        bill_no = f"CUSTBILL{data['counter']:05d}"
-        data['counter'] += 1
-        with open(path, "w") as f:
-            json.dump(data, f)
-        return bill_no
-
     def load_company_info(self):
         with open("company_info.json") as f:
             return json.load(f)
@@ -497,31 +484,8 @@ class OutwardAddFrame(tk.Frame):
             self.show_notification("Amounts must be valid numbers.", title="Invalid Amount")
             return
 
-        # Check purchaser logic
-        # 1. If name and phone combo exists, allow (reuse purchaser_id)
-        # 2. If phone exists with different name, error
-        # 3. Else, add new purchaser
-
-        customer_id = None
-        if customer_backend.check_customer_name_phone_match(name, phone):
-            # Get existing purchaser_id for this name-phone combo
-            with customer_backend.get_db_connection() as conn:
-                c = conn.cursor()
-                c.execute("SELECT customer_id FROM customer WHERE customer_name=? AND phone_number=?", (name, phone))
-                row = c.fetchone()
-                if row:
-                    customer_id = row[0]
-        elif customer_backend.phone_exists(phone):
-            self.show_notification("This phone number is already registered with a different name.", title="Error")
-            return
-        else:
-            # New name and phone, add new purchaser
-            customer_id = customer_backend.add_customer(name, place, phone, total_amount, amount_to_pay)
-            if not customer_id:
-                self.show_notification("Failed to add Customer. Please try again.", title="Error")
-                return
-
-        # Add products
+        # Validate every product row before anything is written
+        products = []
         for row in self.rows:
             item = row['product_var'].get().strip()
             qty_str = row['qty_var'].get().strip()
@@ -540,30 +504,26 @@ class OutwardAddFrame(tk.Frame):
             except ValueError:
                 self.show_notification("Please enter valid numbers for quantity, price, and amount.", title="Invalid Product Data")
                 return
-                
-            customer_backend.add_customer_product(
-            customer_id,
-            item,
-            qty,
-            price,
-            description,
-            amount,
-            datetime.now().strftime("%Y-%m-%d %H:%M:%S")   # <-- Add this!
-        )
+            products.append((item, qty, price, description, amount))
 
+        # Check customer logic
+        # 1. If name and phone combo exists, allow (reuse customer_id)
+        # 2. If phone exists with different name, error
+        # 3. Else, a new customer is added together with the bill
+        if not customer_backend.check_customer_name_phone_match(name, phone) and customer_backend.phone_exists(phone):
+            self.show_notification("This phone number is already registered with a different name.", title="Error")
+            return
 
-        # Add payment record if any amount is paid
-        if amount_to_pay > 0:
-            payment_id = f"CREDIT-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            customer_backend.add_customer_payment(
-                customer_id,
-                payment_id,
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                amount_to_pay
-            )
+        # Customer, products, payment and bill number go in as one transaction
+        payment_id = customer_backend.generate_payment_id()
+        customer_id, bill_no = customer_backend.commit_customer_bill(
+            name, place, phone, products, amount_to_pay, payment_id=payment_id
+        )
+        if not customer_id:
+            self.show_notification("Failed to save the bill. Nothing was recorded, please try again.", title="Error")
+            return
         
         bill_company = self.load_company_info()
-        bill_no = self.get_next_bill_number()
         bill_customer = {
             "name": self.name_var.get().strip(),
             "phone": self.phone_var.get().strip(),
@@ -705,102 +665,6 @@ class AutocompleteEntry(tk.Entry):
         return [w for w in self.autocomplete_list if w.startswith(pattern)]
 import tkinter as tk
 
-class ProductAutocompleteEntry(tk.Entry):
-    def __init__(self, parent, row, *args, **kwargs):
-        super().__init__(parent, *args, **kwargs)
-        self.row = row  # Reference to the row dict
-        self.listbox = None
-        self.bind('<KeyRelease>', self.check_autocomplete)
-
-    def check_autocomplete(self, event):
-        typed = self.get()
-        if not typed:
-            self.hide_listbox()
-            return
-
-        # First, search in customer db
-        matches = customer_backend.search_products_by_prefix(typed)  # [(name, price, desc), ...]
-        if matches:
-            self.match_source = 'customer'
-            self.current_matches = matches
-            self.show_listbox([m[0] for m in matches])
-            return
-
-        # If not found, search in purchaser db
-        matches = db_backend.search_products_by_prefix(typed)  # [(name, desc), ...]
-        if matches:
-            self.match_source = 'purchaser'
-            self.current_matches = matches
-            self.show_listbox([m[0] for m in matches])
-            return
-
-        self.hide_listbox()
-
-    def show_listbox(self, names):
-        if not self.listbox:
-            root = self.winfo_toplevel()
-            self.listbox = tk.Listbox(root, width=20)
-            x = self.winfo_rootx()
-            y = self.winfo_rooty() + self.winfo_height()
-            self.listbox.place(x=x, y=y)
-            self.listbox.bind("<ButtonRelease-1>", lambda e: self.select_from_listbox())
-            self.listbox.bind("<Return>", lambda e: self.select_from_listbox())
-        self.listbox.delete(0, tk.END)
-        for name in names:
-            self.listbox.insert(tk.END, name)
-
-
-    def select_from_listbox(self, matches):
-        if not self.listbox:
-            return
-        idx = self.listbox.curselection()
-        if not idx:
-            return
-        selected = matches[idx[0]]
-
-        if getattr(self, 'match_source', None) == 'customer':
-            # selected: (name, price, desc)
-            self.delete(0, tk.END)
-            self.insert(0, selected[0])
-            self.row['price_var'].set(str(selected[1]))
-            self.row['description_var'].set(selected[2])
-        elif getattr(self, 'match_source', None) == 'purchaser':
-            # selected: (name, desc)
-            self.delete(0, tk.END)
-            self.insert(0, selected[0])
-            self.row['price_var'].set("")  # No price from purchaser db
-            self.row['description_var'].set(selected[1])
-        self.hide_listbox()
-
-
-    def hide_listbox(self):
-        if self.listbox:
-            self.listbox.destroy()
-            self.listbox = None
-
-    def select_from_listbox(self):
-        if not self.listbox:
-            return
-        idx = self.listbox.curselection()
-        if not idx:
-            return
-        selected = self.current_matches[idx[0]]
-
-        if getattr(self, 'match_source', None) == 'customer':
-            # selected: (name, price, desc)
-            self.delete(0, tk.END)
-            self.insert(0, selected[0])
-            self.row['price_var'].set(str(selected[1]))
-            self.row['description_var'].set(selected[2])
-        elif getattr(self, 'match_source', None) == 'purchaser':
-            # selected: (name, desc)
-            self.delete(0, tk.END)
-            self.insert(0, selected[0])
-            self.row['price_var'].set(selected[1])# No price from purchaser db
-            self.row['description_var'].set(selected[2])
-        self.hide_listbox()
-
-
 
 # Standalone test
 if __name__ == "__main__":
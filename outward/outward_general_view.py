@@ -1,7 +1,10 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
+from functools import partial
 from outward import customer_backend
+from db_paging import KeysetPager
+from virtual_table import VirtualTable, TableData
 from tkcalendar import DateEntry
 
 class OutwardGeneralViewFrame(tk.Frame):
@@ -20,6 +23,8 @@ class OutwardGeneralViewFrame(tk.Frame):
         #today_str = datetime.now().strftime("%Y-%m-%d")
         self.from_date_var = tk.StringVar(value='')
         self.to_date_var = tk.StringVar(value='')
+        # Days the paged listing is limited to
+        self.page_dates = (None, None)
         self.build_title()
 
         self.build_widgets()
@@ -80,16 +85,8 @@ class OutwardGeneralViewFrame(tk.Frame):
         self.table_frame.pack(fill='both', expand=True, padx=10, pady=10)
 
         columns = ("Customer", "Product", "Qty", "Price", "Amount", "Date")
-        self.tree = ttk.Treeview(self.table_frame, columns=columns, show='headings', selectmode='browse')
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, anchor='center', stretch=True, width=100)
-        self.tree.pack(side='left', fill='both', expand=True)
-
-        # Scrollbar
-        self.scrollbar = ttk.Scrollbar(self.table_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=self.scrollbar.set)
-        self.scrollbar.pack(side='right', fill='y')
+        self.table = VirtualTable(self.table_frame, columns, colors)
+        self.table.pack(fill='both', expand=True)
 
         # Initial layout
         self.on_view_mode_change()
@@ -127,8 +124,7 @@ class OutwardGeneralViewFrame(tk.Frame):
             limit = 5
 
         # Clear table
-        for row in self.tree.get_children():
-            self.tree.delete(row)
+        self.table.set_data([])
 
         view_mode = self.view_mode_var.get()
         if view_mode == 'product':
@@ -137,7 +133,7 @@ class OutwardGeneralViewFrame(tk.Frame):
 
             # On initial load, ignore date fields and show all products
             if not filter_clicked:
-                data = customer_backend.get_customer_by_date_range()
+                self.page_dates = (None, None)
             else:
                 # Only filter if both dates are provided
                 if from_date and to_date:
@@ -147,35 +143,24 @@ class OutwardGeneralViewFrame(tk.Frame):
                     except ValueError:
                         messagebox.showwarning("Invalid Date", "Please enter dates in YYYY-MM-DD format.")
                         return
-                    data = customer_backend.get_customer_by_date_range(from_date, to_date)
+                    self.page_dates = (from_date, to_date)
                 else:
-                    data = customer_backend.get_customer_by_date_range()
+                    self.page_dates = (None, None)
 
 
             columns = ("Customer", "Product", "Qty", "Price", "Amount", "Date")
-            self.tree["columns"] = columns
-            for col in columns:
-                self.tree.heading(col, text=col)
-
-            # Show only up to 'limit' entries
-            for purchaser, item, qty, price, amount, date in data:
-
-                self.tree.insert('', 'end', values=(purchaser, item, qty, price, amount, date))
+            self.table.set_columns(columns)
+            # Rows come a page at a time as the table is scrolled
+            pager = KeysetPager(partial(customer_backend.list_sales_page, *self.page_dates), 5, 6, keep=6)
+            self.table.set_data(TableData(fetch_more=pager))
 
 
         else:
             columns = ("Purchaser", "Payment ID", "Amount", "Date")
-            self.tree["columns"] = columns
-            for col in columns:
-                self.tree.heading(col, text=col)
-                self.tree.column(col, stretch=True)  # Allow column to expand
-
-            self.tree.pack(expand=True, fill='both')  # Make treeview expand to fill space
-
+            self.table.set_columns(columns)
             try:
                 data = customer_backend.get_recent_customer_payments(order=self.order_var.get(), limit=limit)
-                for purchaser, payment_id, amount, date in data:
-                    self.tree.insert('', 'end', values=(purchaser, payment_id, amount, date))
+                self.table.set_data(data)
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to fetch purchase payments: {e}")
 
@@ -189,23 +174,11 @@ class OutwardGeneralViewFrame(tk.Frame):
         self.table_frame.configure(bg=colors["bg"])
         self.update_widget_colors(self.controls)
         self.update_widget_colors(self.table_frame)
+        self.table.set_colors(colors)
 
         style = ttk.Style()
         style.theme_use('clam')
 
-        # Treeview
-        style.configure("Treeview",
-                        background=colors["table_bg"],
-                        foreground=colors["table_fg"],
-                        fieldbackground=colors["table_bg"],
-                        bordercolor=colors["table_border"],
-                        borderwidth=1)
-        style.configure("Treeview.Heading",
-                        background=colors["table_head_bg"],
-                        foreground=colors["table_head_fg"],
-                        font=("Arial", 11, "bold"))
-        style.map('Treeview', background=[('selected', colors["table_head_bg"])])
-
         # Combobox
         style.configure("Custom.TCombobox",
                         fieldbackground=colors["entry_bg"],
@@ -2,7 +2,10 @@ import tkinter as tk
 from tkinter import ttk
 from outward import customer_backend
 from tkcalendar import DateEntry
-from datetime import datetime
+
+# History cards are built this many days at a time; the next batch follows
+# when the user scrolls near the bottom.
+CARDS_PER_BATCH = 15
 
 class OutwardViewPurchaseFrame(tk.Frame):
     def __init__(self, parent, theme, get_colors, *args, **kwargs):
@@ -234,7 +237,7 @@ class OutwardViewPurchaseFrame(tk.Frame):
                         arrowcolor=colors["scroll_arrow"])
         self.scrollbar = ttk.Scrollbar(self.scroll_container, orient="vertical", command=self.canvas.yview, style="Custom.Vertical.TScrollbar")
         self.scrollbar.pack(side="right", fill="y")
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.canvas.configure(yscrollcommand=self.on_cards_scroll)
 
         self.cards_frame = tk.Frame(self.canvas, bg=colors["bg"])
         self.cards_window = self.canvas.create_window((0, 0), window=self.cards_frame, anchor="n")
@@ -323,175 +326,167 @@ class OutwardViewPurchaseFrame(tk.Frame):
         # 7. Build the scrollable area for cards
         self.build_scrollable_details_frame()
 
-        # --- Group all purchases and transactions by date ---
-        # Gather all transaction-only dates too!
-        all_dates = set()
-        purchases_by_date = {}
-        for purchase in purchases:
-            date = purchase[5]
-            purchases_by_date.setdefault(date, []).append(purchase)
-            all_dates.add(date)
-
-        # Also get all transaction dates for this customer (even if no purchase that day)
-        payment_dates = customer_backend.get_payment_dates_by_name_phone(name, phone)
-        for d in payment_dates:
-            all_dates.add(d)
-
-        # Clear previous cards
-        for widget in self.cards_frame.winfo_children():
-            widget.destroy()
-
-
-        activity_dates = customer_backend.get_all_activity_dates(name, phone)
-
-        # Filter dates if a filter is set
+        # --- Products and payments grouped by date, newest first ---
+        # Only both dates together filter, as before
         if self.filtered_start_date and self.filtered_end_date:
-            start_dt = datetime.strptime(self.filtered_start_date, '%Y-%m-%d')
-            end_dt = datetime.strptime(self.filtered_end_date, '%Y-%m-%d')
-            filtered_dates = [
-                date for date in activity_dates
-                if start_dt <= datetime.strptime(date, '%Y-%m-%d') <= end_dt
-            ]
+            self.history_days = customer_backend.get_history_by_day(
+                name, phone, self.filtered_start_date, self.filtered_end_date)
         else:
-            filtered_dates = activity_dates
+            self.history_days = customer_backend.get_history_by_day(name, phone)
+        self.cards_built = 0
+        self.cards_pending = False
+        self.build_more_cards()
+
+    def on_cards_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # Build the next cards once the view nears the end of those built so far
+        if float(last) > 0.9 and not self.cards_pending and self.cards_built < len(self.history_days):
+            self.cards_pending = True
+            self.after_idle(self.build_more_cards)
+
+    def build_more_cards(self):
+        self.cards_pending = False
+        if not self.cards_frame.winfo_exists():
+            return
+        batch = self.history_days[self.cards_built:self.cards_built + CARDS_PER_BATCH]
+        self.cards_built += len(batch)
+        for date, products, payments in batch:
+            self.build_history_card(date, products, payments)
 
-        for date in sorted(filtered_dates, reverse=True):
-            products = customer_backend.get_products_by_name_phone_and_date(name, phone, date)
-            payments = customer_backend.get_payments_by_name_phone_and_date(name, phone, date)
-            if not products and not payments:
-                continue  # Skip this date, nothing to show
-            card = tk.Frame(self.cards_frame, bd=2, relief="groove", bg=colors["card_bg"], padx=10, pady=10)
-            card.pack(fill="x", expand=True, padx=10, pady=10)
-            # ... display card content ...
+    def build_history_card(self, date, products, payments):
+        colors = self.get_colors()
+        card = tk.Frame(self.cards_frame, bd=2, relief="groove", bg=colors["card_bg"], padx=10, pady=10)
+        card.pack(fill="x", expand=True, padx=10, pady=10)
+        # ... display card content ...
 
 
 
-            # --- Centered Date label ---
-            date_label = tk.Label(
+        # --- Centered Date label ---
+        date_label = tk.Label(
+            card,
+            text=date,
+            font=("Arial", 12, "bold"),
+            bg=colors["card_bg"],
+            fg=colors["fg"]
+        )
+        date_label.pack(anchor="center", pady=(0, 10))
+
+        if products:
+            # Create a frame for the table and scrollbar
+            table_frame = tk.Frame(card, bg=colors["card_bg"])
+            table_frame.pack(fill="x", padx=5, pady=5)
+
+            # Create the Treeview with your custom style
+            table = ttk.Treeview(
+                table_frame,
+                columns=("item", "qty", "price", "desc", "amount"),
+                show="headings",
+                height=len(products),
+                style="Custom.Treeview"
+            )
+            for col, heading in zip(("item", "qty", "price", "desc", "amount"), ["Item", "Qty", "Price", "Description", "Amount"]):
+                table.heading(col, text=heading)
+                table.column(col, anchor="center", width=100)
+            for prod in products:
+                table.insert("", "end", values=prod)
+
+            # Create the vertical scrollbar with your custom style
+            scrollbar = ttk.Scrollbar(
+                table_frame,
+                orient="vertical",
+                command=table.yview,
+                style="Vertical.TScrollbar"
+            )
+            table.configure(yscrollcommand=scrollbar.set)
+
+            # Pack Treeview and scrollbar
+            table.pack(side="left", fill="both", expand=True)
+            scrollbar.pack(side="right", fill="y")
+
+
+            # --- Status/Amount info (for products on this date) ---
+            # You may need to aggregate these if multiple purchases on same date
+            # Example assumes all products on this date are part of the same purchase
+            # If not, you can sum/aggregate as needed
+            #total_amount = sum(float(p[4]) for p in products)  # Assuming amount is at index 4
+            #amount_paid = sum(float(pay[3]) for pay in payments) if payments else 0  # Assuming amount_paid is at index 3
+           # remaining_amount = total_amount - amount_paid
+            #status = "Pending" if remaining_amount > 0 else "Completed"
+
+            #status_label = tk.Label(
+               # card,
+               # text=f"Status: {status}   Total: {total_amount:.2f}   Paid: {amount_paid:.2f}   To Pay: {remaining_amount:.2f}",
+             #font=("Arial", 11, "bold"),
+               # bg=colors["card_bg"],
+                #fg=colors["fg"]
+           # )
+           # status_label.pack(anchor="w", padx=10, pady=5)
+        else:
+            no_prod_label = tk.Label(
                 card,
-                text=date,
-                font=("Arial", 12, "bold"),
+                text="No products purchased on this date.",
                 bg=colors["card_bg"],
-                fg=colors["fg"]
+                fg=colors["fg"],
+                font=("Arial", 10, "italic")
             )
-            date_label.pack(anchor="center", pady=(0, 10))
-
-            if products:
-    # Create a frame for the table and scrollbar
-                table_frame = tk.Frame(card, bg=colors["card_bg"])
-                table_frame.pack(fill="x", padx=5, pady=5)
-
-                # Create the Treeview with your custom style
-                table = ttk.Treeview(
-                    table_frame,
-                    columns=("item", "qty", "price", "desc", "amount"),
-                    show="headings",
-                    height=len(products),
-                    style="Custom.Treeview"
-                )
-                for col, heading in zip(("item", "qty", "price", "desc", "amount"), ["Item", "Qty", "Price", "Description", "Amount"]):
-                    table.heading(col, text=heading)
-                    table.column(col, anchor="center", width=100)
-                for prod in products:
-                    table.insert("", "end", values=prod)
-
-                # Create the vertical scrollbar with your custom style
-                scrollbar = ttk.Scrollbar(
-                    table_frame,
-                    orient="vertical",
-                    command=table.yview,
-                    style="Vertical.TScrollbar"
-                )
-                table.configure(yscrollcommand=scrollbar.set)
-
-                # Pack Treeview and scrollbar
-                table.pack(side="left", fill="both", expand=True)
-                scrollbar.pack(side="right", fill="y")
-
-
-                # --- Status/Amount info (for products on this date) ---
-                # You may need to aggregate these if multiple purchases on same date
-                # Example assumes all products on this date are part of the same purchase
-                # If not, you can sum/aggregate as needed
-                #total_amount = sum(float(p[4]) for p in products)  # Assuming amount is at index 4
-                #amount_paid = sum(float(pay[3]) for pay in payments) if payments else 0  # Assuming amount_paid is at index 3
-               # remaining_amount = total_amount - amount_paid
-                #status = "Pending" if remaining_amount > 0 else "Completed"
-
-                #status_label = tk.Label(
-                   # card,
-                   # text=f"Status: {status}   Total: {total_amount:.2f}   Paid: {amount_paid:.2f}   To Pay: {remaining_amount:.2f}",
-                 #font=("Arial", 11, "bold"),
-                   # bg=colors["card_bg"],
-                    #fg=colors["fg"]
-               # )
-               # status_label.pack(anchor="w", padx=10, pady=5)
+            no_prod_label.pack(anchor="w", padx=10, pady=5)
+
+        # --- Show Transaction History Button ---
+        btn = tk.Button(
+            card,
+            text="Show Transaction History",
+            bg=colors["button_bg"],
+            fg=colors["fg"]
+        )
+        btn.pack(anchor="e", padx=10, pady=5)
+
+        # --- Transaction history toggle ---
+        def toggle_history(frame=card, dt=date, btn=btn):
+            colors = self.get_colors()
+            if hasattr(frame, "_history_shown") and frame._history_shown:
+                if hasattr(frame, "_history_frame"):
+                    frame._history_frame.pack_forget()
+                frame._history_shown = False
+                btn.config(text="Show Transaction History")
             else:
-                no_prod_label = tk.Label(
-                    card,
-                    text="No products purchased on this date.",
-                    bg=colors["card_bg"],
-                    fg=colors["fg"],
-                    font=("Arial", 10, "italic")
-                )
-                no_prod_label.pack(anchor="w", padx=10, pady=5)
-
-            # --- Show Transaction History Button ---
-            btn = tk.Button(
-                card,
-                text="Show Transaction History",
-                bg=colors["button_bg"],
-                fg=colors["fg"]
-            )
-            btn.pack(anchor="e", padx=10, pady=5)
-
-            # --- Transaction history toggle ---
-            def toggle_history(frame=card, dt=date, btn=btn):
-                colors = self.get_colors()
-                if hasattr(frame, "_history_shown") and frame._history_shown:
-                    if hasattr(frame, "_history_frame"):
-                        frame._history_frame.pack_forget()
-                    frame._history_shown = False
-                    btn.config(text="Show Transaction History")
-                else:
-                    if not hasattr(frame, "_history_frame"):
-                        frame._history_frame = tk.Frame(frame, bg=colors["bg"])
-                        # Get all payments for this date
-                        local_payments = customer_backend.get_payments_by_name_phone_and_date(name, phone, dt)
-                        if not local_payments:
-                            no_pay_label = tk.Label(
-                                frame._history_frame,
-                                text="No transaction history.",
+                if not hasattr(frame, "_history_frame"):
+                    frame._history_frame = tk.Frame(frame, bg=colors["bg"])
+                    # Payments of this date came with the cards
+                    local_payments = payments
+                    if not local_payments:
+                        no_pay_label = tk.Label(
+                            frame._history_frame,
+                            text="No transaction history.",
+                            bg=colors["bg"],
+                            fg=colors["fg"]
+                        )
+                        no_pay_label.pack(anchor="w", padx=10, pady=5)
+                    else:
+                        history_canvas = tk.Canvas(frame._history_frame, bg=colors["bg"], height=120, highlightthickness=0)
+                        history_scrollbar = tk.Scrollbar(frame._history_frame, orient="vertical", command=history_canvas.yview)
+                        history_canvas.configure(yscrollcommand=history_scrollbar.set)
+                        history_canvas.pack(side="left", fill="both", expand=True)
+                        history_scrollbar.pack(side="right", fill="y")
+
+                        history_inner = tk.Frame(history_canvas, bg=colors["bg"])
+                        history_canvas.create_window((0, 0), window=history_inner, anchor="nw")
+
+                        def on_history_configure(event):
+                            history_canvas.configure(scrollregion=history_canvas.bbox("all"))
+                        history_inner.bind("<Configure>", on_history_configure)
+
+                        for pay in local_payments:
+                            pay_date, payment_id, purchaser_id, amount_paid = pay
+                            pay_label = tk.Label(
+                                history_inner,
+                                text=f"Payment ID: {payment_id}   Amount: {amount_paid:.2f}",
+                                font=("Arial", 10),
                                 bg=colors["bg"],
                                 fg=colors["fg"]
                             )
-                            no_pay_label.pack(anchor="w", padx=10, pady=5)
-                        else:
-                            history_canvas = tk.Canvas(frame._history_frame, bg=colors["bg"], height=120, highlightthickness=0)
-                            history_scrollbar = tk.Scrollbar(frame._history_frame, orient="vertical", command=history_canvas.yview)
-                            history_canvas.configure(yscrollcommand=history_scrollbar.set)
-                            history_canvas.pack(side="left", fill="both", expand=True)
-                            history_scrollbar.pack(side="right", fill="y")
-
-                            history_inner = tk.Frame(history_canvas, bg=colors["bg"])
-                            history_canvas.create_window((0, 0), window=history_inner, anchor="nw")
-
-                            def on_history_configure(event):
-                                history_canvas.configure(scrollregion=history_canvas.bbox("all"))
-                            history_inner.bind("<Configure>", on_history_configure)
-
-                            for pay in local_payments:
-                                pay_date, payment_id, purchaser_id, amount_paid = pay
-                                pay_label = tk.Label(
-                                    history_inner,
-                                    text=f"Payment ID: {payment_id}   Amount: {amount_paid:.2f}",
-                                    font=("Arial", 10),
-                                    bg=colors["bg"],
-                                    fg=colors["fg"]
-                                )
-                                pay_label.pack(anchor="w", padx=10, pady=2)
-                    frame._history_frame.pack(fill="x", padx=5, pady=5, before=btn)
-                    frame._history_shown = True
-                    btn.config(text="Hide Transaction History")
-
-            btn.config(command=lambda f=card, dt=date, b=btn: toggle_history(f, dt, b))
+                            pay_label.pack(anchor="w", padx=10, pady=2)
+                frame._history_frame.pack(fill="x", padx=5, pady=5, before=btn)
+                frame._history_shown = True
+                btn.config(text="Hide Transaction History")
+
+        btn.config(command=lambda f=card, dt=date, b=btn: toggle_history(f, dt, b))
@@ -0,0 +1,177 @@
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import date
+from db_dates import DATE_FORMAT
+from db_months import MONTH_PATTERN, month_changes
+from db_pool import get_connection
+from excel_export import ExportJob
+
+# Columnar export of the line item and payment tables for analysis in
+# notebooks (pandas.read_parquet, pyarrow.dataset, DuckDB). Each table is
+# written as a folder of zstd-compressed Parquet files with typed columns,
+# one per month in hive layout:
+#
+#     <folder>/customer_product/month=2024-05/part-0.parquet
+#
+# The export is incremental. Each table folder keeps a _manifest.json of the
+# month change counters (see db_months) its files were written at, and a run
+# only rewrites the months whose counter has moved since: new months, the
+# current one, and any older month whose rows were edited or deleted. A
+# month left with no rows loses its folder. Every database is read inside
+# one read transaction, so the files and manifest agree with each other.
+#
+# pyarrow is only needed once an export actually runs.
+
+PARQUET_CHUNK = 50000  # rows per row group
+PART_FILE = "part-0.parquet"
+MANIFEST_FILE = "_manifest.json"
+
+# database -> [(table, [(column, type)])]; date columns become timestamps
+PARQUET_TABLES = {
+    "customer": [
+        ("customer_product", [("id", "int"), ("customer_id", "text"), ("item", "text"), ("qty", "real"),
+                              ("price", "real"), ("description", "text"), ("amount", "real"),
+                              ("date", "date")]),
+        ("customer_payment", [("id", "int"), ("customer_id", "text"), ("payment_id", "text"),
+                              ("date", "date"), ("amount_paid", "real"), ("transaction_type", "text"),
+                              ("remarks", "text")]),
+    ],
+    "purchase": [
+        ("purchase_product", [("id", "int"), ("purchaser_id", "text"), ("item", "text"), ("qty", "real"),
+                              ("price", "real"), ("description", "text"), ("amount", "real"),
+                              ("date", "date")]),
+        ("purchase_payment", [("id", "int"), ("purchaser_id", "text"), ("payment_id", "text"),
+                              ("date", "date"), ("amount_paid", "real"), ("transaction_type", "text"),
+                              ("remarks", "text")]),
+    ],
+    "service": [
+        ("service_item", [("id", "int"), ("service_id", "text"), ("item_name", "text"),
+                          ("description", "text"), ("amount", "real"), ("date", "date")]),
+        ("service_payment", [("id", "int"), ("service_id", "text"), ("payment_id", "text"),
+                             ("date", "date"), ("amount_paid", "real"), ("transaction_type", "text"),
+                             ("remarks", "text")]),
+    ],
+}
+
+
+def _month_where(month):
+    # The rows of one month, as a range on the indexed date column
+    if month == "unknown":
+        return f"NOT date GLOB '{MONTH_PATTERN}'", ()
+    year, mon = int(month[:4]), int(month[5:7])
+    following = date(year + mon // 12, mon % 12 + 1, 1)
+    return "date >= ? AND date < ?", (f"{month}-01", following.isoformat())
+
+
+def _read_manifest(table_dir):
+    try:
+        with open(os.path.join(table_dir, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(table_dir, manifest):
+    path = os.path.join(table_dir, MANIFEST_FILE)
+    with open(path + ".part", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + ".part", path)
+
+
+def _arrow_table(rows, columns, schema, pa, pc):
+    arrays = []
+    for (name, kind), values in zip(columns, zip(*rows)):
+        if kind == "date":
+            arrays.append(pc.strptime(pa.array(values, pa.string()), format=DATE_FORMAT,
+                                      unit="s", error_is_null=True))
+        else:
+            arrays.append(pa.array(values, schema.field(name).type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def _write_month(conn, table, columns, month, month_dir, job, chunk_size):
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+
+    types = {"int": pa.int64(), "text": pa.string(), "real": pa.float64(), "date": pa.timestamp("s")}
+    schema = pa.schema([(name, types[kind]) for name, kind in columns])
+    where, params = _month_where(month)
+    cursor = conn.execute(f"""
+        SELECT {', '.join(name for name, kind in columns)} FROM {table}
+        WHERE {where} ORDER BY date, id""", params)
+    os.makedirs(month_dir, exist_ok=True)
+    # Hidden while being written, so a dataset reader never picks it up
+    partial = os.path.join(month_dir, "." + PART_FILE + ".part")
+    written = 0
+    try:
+        with pq.ParquetWriter(partial, schema, compression="zstd") as writer:
+            while True:
+                job.check_cancelled()
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                writer.write_table(_arrow_table(rows, columns, schema, pa, pc))
+                written += len(rows)
+                job.done += len(rows)
+        if written:
+            os.replace(partial, os.path.join(month_dir, PART_FILE))
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    if not written:
+        shutil.rmtree(month_dir, ignore_errors=True)
+
+
+def export_parquet(folder, job=None, chunk_size=PARQUET_CHUNK):
+    """
+    Brings the Parquet export in folder up to date with all six line item
+    and payment tables, writing only the months that changed since the last
+    run. Returns folder. Progress and cancelling go through job as with
+    excel_export.export_workbook; months finished before a cancel are kept.
+    """
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise RuntimeError("Parquet export needs the pyarrow package (pip install pyarrow)")
+
+    job = job or ExportJob()
+    for db_name, tables in PARQUET_TABLES.items():
+        conn = get_connection(db_name)
+        began = not conn.in_transaction
+        if began:
+            conn.execute("BEGIN")
+        try:
+            stale = []
+            for table, columns in tables:
+                table_dir = os.path.join(folder, table)
+                manifest = _read_manifest(table_dir)
+                for month, change in sorted(month_changes(conn, table).items()):
+                    if manifest.get(month) == change:
+                        continue
+                    month_dir = os.path.join(table_dir, f"month={month}")
+                    stale.append((table, columns, month, change, table_dir, month_dir))
+                    where, params = _month_where(month)
+                    job.total += conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {where}", params).fetchone()[0]
+            for table, columns, month, change, table_dir, month_dir in stale:
+                _write_month(conn, table, columns, month, month_dir, job, chunk_size)
+                manifest = _read_manifest(table_dir)
+                manifest[month] = change
+                _write_manifest(table_dir, manifest)
+        finally:
+            if began:
+                conn.rollback()
+    return folder
+
+
+if __name__ == "__main__":
+    # python parquet_export.py [folder]
+    out_folder = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.expanduser("~"), "Downloads", "TrackEdge Parquet")
+    started = time.perf_counter()
+    job = ExportJob()
+    export_parquet(out_folder, job=job)
+    print(f"Wrote {job.done:,} rows to {out_folder} in {time.perf_counter() - started:.1f}s")
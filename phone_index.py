@@ -0,0 +1,67 @@
+import bisect
+import threading
+import time
+
+# Phone autocomplete runs on every key release in the add/view/modify/payment
+# screens. Each backend keeps one PhonePrefixIndex: its (phone, name, place)
+# entries loaded once into a sorted list, so a prefix lookup is a bisect
+# instead of a LIKE query. The backend adds new parties as they are inserted
+# and invalidates the index when a phone, name or place is edited. Changes
+# made by another terminal show up after REFRESH_SECONDS.
+
+REFRESH_SECONDS = 300
+
+
+class PhonePrefixIndex:
+    def __init__(self, loader, refresh_seconds=REFRESH_SECONDS):
+        """loader() returns the (phone, name, place) rows of the party table."""
+        self._loader = loader
+        self._refresh_seconds = refresh_seconds
+        self._entries = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _entry(phone, name, place):
+        return (phone or "", name or "", place or "")
+
+    def _load(self):
+        # Caller holds _lock
+        if self._entries is None or time.monotonic() - self._loaded_at > self._refresh_seconds:
+            self._entries = sorted({self._entry(*row) for row in self._loader()})
+            self._loaded_at = time.monotonic()
+        return self._entries
+
+    def lookup(self, prefix, limit=None):
+        """Returns (phone, name, place) for phones starting with prefix, sorted by phone."""
+        prefix = prefix or ""
+        with self._lock:
+            entries = self._load()
+            start = bisect.bisect_left(entries, (prefix,))
+            end = len(entries) if limit is None else min(len(entries), start + limit)
+            result = []
+            for i in range(start, end):
+                if not entries[i][0].startswith(prefix):
+                    break
+                result.append(entries[i])
+        return result
+
+    def phones(self):
+        """Returns every distinct phone number, sorted."""
+        with self._lock:
+            return list(dict.fromkeys(entry[0] for entry in self._load()))
+
+    def add(self, phone, name, place):
+        """Records a newly inserted party; a no-op until the index is first used."""
+        entry = self._entry(phone, name, place)
+        with self._lock:
+            if self._entries is None:
+                return
+            i = bisect.bisect_left(self._entries, entry)
+            if i == len(self._entries) or self._entries[i] != entry:
+                self._entries.insert(i, entry)
+
+    def invalidate(self):
+        """Drops the entries; the next lookup reloads them."""
+        with self._lock:
+            self._entries = None
@@ -0,0 +1,106 @@
+import tkinter as tk
+import data_worker
+import product_index
+
+# Wait this long after the last key release before looking anything up,
+# so typing a word costs one query instead of one per letter.
+DEBOUNCE_MS = 150
+
+
+class ProductAutocompleteEntry(tk.Entry):
+    """
+    Product name entry for the sales and purchase bill tables. Suggestions
+    come from product_index on a worker thread; a lookup overtaken by more
+    typing is cancelled or its result dropped. The suggestion Listbox is
+    created once and shown/hidden as needed.
+    side picks which price and description fill the row: "sale" for sales
+    (falling back to the last purchase), "purchase" for purchases.
+    """
+
+    def __init__(self, parent, row, *args, side="sale", **kwargs):
+        super().__init__(parent, *args, **kwargs)
+        self.row = row  # Reference to the row dict
+        self.side = side
+        self.listbox = None
+        self.current_matches = []
+        self._after_id = None
+        self._job_key = f"product_autocomplete.{id(self)}"
+        self.bind('<KeyRelease>', self.check_autocomplete)
+        self.bind('<Destroy>', self._on_destroy, add="+")
+
+    def check_autocomplete(self, event):
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+            self._after_id = None
+        if not self.get().strip():
+            data_worker.cancel(self._job_key)
+            self.hide_listbox()
+            return
+        self._after_id = self.after(DEBOUNCE_MS, self._lookup)
+
+    def _lookup(self):
+        self._after_id = None
+        typed = self.get()
+        data_worker.submit(
+            self, product_index.search, typed,
+            on_result=lambda matches: self._show_matches(typed, matches),
+            key=self._job_key
+        )
+
+    def _show_matches(self, typed, matches):
+        if typed != self.get():
+            return  # the text changed while this lookup ran
+        self.current_matches = matches
+        if matches:
+            self.show_listbox([m["name"] for m in matches])
+        else:
+            self.hide_listbox()
+
+    def show_listbox(self, names):
+        top = self.winfo_toplevel()
+        if not self.listbox:
+            self.listbox = tk.Listbox(top, width=20)
+            self.listbox.bind("<ButtonRelease-1>", lambda e: self.select_from_listbox())
+            self.listbox.bind("<Return>", lambda e: self.select_from_listbox())
+        self.listbox.delete(0, tk.END)
+        for name in names:
+            self.listbox.insert(tk.END, name)
+        self.listbox.configure(height=min(len(names), 10))
+        # place() is relative to the toplevel, not the screen
+        x = self.winfo_rootx() - top.winfo_rootx()
+        y = self.winfo_rooty() - top.winfo_rooty() + self.winfo_height()
+        self.listbox.place(x=x, y=y)
+        self.listbox.lift()
+
+    def hide_listbox(self):
+        if self.listbox:
+            self.listbox.place_forget()
+
+    def select_from_listbox(self):
+        if not self.listbox:
+            return
+        idx = self.listbox.curselection()
+        if not idx:
+            return
+        selected = self.current_matches[idx[0]]
+        price = selected[f"{self.side}_price"]
+        description = selected[f"{self.side}_description"]
+        if price is None and self.side == "sale":
+            price = selected["purchase_price"]
+            description = selected["purchase_description"]
+        # Autofill product name, price, and description
+        self.delete(0, tk.END)
+        self.insert(0, selected["name"])
+        self.row['price_var'].set("" if price is None else str(price))
+        self.row['description_var'].set(description or "")
+        self.hide_listbox()
+
+    def _on_destroy(self, event):
+        if event.widget is not self:
+            return
+        if self._after_id is not None:
+            self.after_cancel(self._after_id)
+        data_worker.cancel(self._job_key)
+        if self.listbox:
+            self.listbox.destroy()
+            self.listbox = None
@@ -0,0 +1,68 @@
+import bisect
+import threading
+from db_months import change_count
+from db_pool import get_connection
+
+# One merged, in-memory list of every product sold or purchased, for the
+# product autocomplete in the sales and purchase forms, built from the
+# product catalogs of both databases (matched on item_key). Each item carries
+# the price and description of its latest sale and latest purchase.
+# Every write to a line table moves its month change counters (see
+# db_months), so a lookup only reloads after some line was added, edited or
+# deleted.
+
+# (database, which side of the product its catalog describes, line table)
+PRODUCT_SOURCES = (
+    ("customer", "sale", "customer_product"),
+    ("purchase", "purchase", "purchase_product"),
+)
+
+_lock = threading.Lock()
+_keys = []          # sorted item keys
+_products = {}      # key -> {"name", "sale_price", "sale_description", "purchase_price", ...}
+_stamp = None
+
+
+def _read_stamp():
+    return tuple(change_count(get_connection(db_name), table)
+                 for db_name, _, table in PRODUCT_SOURCES)
+
+
+def _load():
+    products = {}
+    for db_name, side, _ in PRODUCT_SOURCES:
+        rows = get_connection(db_name).execute(
+            f"SELECT item_key, display_name, last_{side}_price, description FROM product")
+        for key, name, price, description in rows:
+            product = products.setdefault(key, {
+                "name": name,
+                "sale_price": None, "sale_description": None,
+                "purchase_price": None, "purchase_description": None,
+            })
+            product[f"{side}_price"] = price
+            product[f"{side}_description"] = description
+    return sorted(products), products
+
+
+def search(prefix, limit=10):
+    """
+    Returns up to limit products whose name starts with prefix
+    (case-insensitive), sorted by name, as dicts with name, sale_price,
+    sale_description, purchase_price and purchase_description (None for a
+    side the product has never been sold or bought on).
+    Safe to call from worker threads.
+    """
+    global _keys, _products, _stamp
+    prefix = prefix.strip().lower()
+    with _lock:
+        stamp = _read_stamp()
+        if stamp != _stamp:
+            _keys, _products = _load()
+            _stamp = stamp
+        start = bisect.bisect_left(_keys, prefix)
+        result = []
+        for key in _keys[start:start + limit]:
+            if not key.startswith(prefix):
+                break
+            result.append(dict(_products[key]))
+    return result
@@ -1,13 +1,17 @@
 import tkinter as tk
 from tkinter import ttk
-import sqlite3
-import pandas as pd
 from datetime import datetime
 import math
 import os
 import sys
 from tkinter import messagebox
 from pathlib import Path
+from db_pool import get_connection
+from db_status import status_summary
+import data_worker
+from excel_export import export_workbook, party_sheets
+from export_progress import run_export
+from virtual_table import VirtualTable, TableData
 
 
 class PurchaseStats:
@@ -19,16 +23,8 @@ class PurchaseStats:
         self.setup_sales_stats()
 
     def get_customer_stats(self):
-        conn = sqlite3.connect("inward/purchase.db")
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM purchaser")
-        total = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM purchaser WHERE LOWER(status) = LOWER(?)", ('pending',))
-        pending = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM purchaser WHERE LOWER(status) = LOWER(?)", ('completed',))
-        completed = cur.fetchone()[0]
-        conn.close()
-        return total, pending, completed
+        # One cached GROUP BY pass; see db_status
+        return status_summary("purchase", "purchaser")
 
     def show_pending_customers(self):
         self._show_customer_details('pending')
@@ -37,12 +33,30 @@ class PurchaseStats:
         self._show_customer_details('completed')
 
     def _show_customer_details(self, status):
-        conn = sqlite3.connect("inward/purchase.db")
+        data_worker.submit(self.parent, self._fetch_customer_details, status,
+                           on_result=lambda data: self._open_customer_details(status, data),
+                           key="stats.purchase.details")
+
+    def _fetch_customer_details(self, status):
+        conn = get_connection("purchase")
         cur = conn.cursor()
-        cur.execute("SELECT purchaser_id, purchaser_name, Place, phone_number, total_amount, date, amount_paid, remaining_amount FROM purchaser WHERE LOWER(status) = LOWER(?) ORDER BY purchaser_name", (status,))
+        cur.execute("SELECT purchaser_id, purchaser_name, Place, phone_number, total_amount, date, amount_paid, remaining_amount FROM purchaser WHERE status = ? ORDER BY purchaser_name", (status.lower(),))
         rows = cur.fetchall()
-        conn.close()
+        if status.lower() == 'pending':
+            # remaining_amount splits into what is still owed and what is to be refunded
+            data = []
+            for row in rows:
+                remaining = row[7] if row[7] is not None else 0
+                data.append(row[:7] + (remaining if remaining > 0 else None,
+                                       -remaining if remaining < 0 else None))
+        else:
+            data = [row[:7] for row in rows]
+        data = TableData(data)
+        # Built here, off the Tk thread, so the first search does not wait on it
+        data.build_index()
+        return data
 
+    def _open_customer_details(self, status, data):
         top = tk.Toplevel(self.parent)
         top.title(f"{status.capitalize()} Purchaser")
         top.state('zoomed')
@@ -68,76 +82,22 @@ class PurchaseStats:
         table_frame = tk.Frame(top, bg=self.theme["bg"], bd=2, relief="groove")
         table_frame.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=10, pady=5)
 
-        style = ttk.Style()
-        style.theme_use("clam")
-        style.configure("Treeview",
-            background=self.theme["bg"],
-            foreground=self.theme["fg"],
-            fieldbackground=self.theme["bg"],
-            bordercolor=self.theme.get("notif_container_bg", self.theme["bg"]),
-            borderwidth=2,
-            relief="solid")
-        style.configure("Treeview.Heading",
-            background=self.theme.get("notif_container_bg", self.theme["bg"]),
-            foreground=self.theme["fg"],
-            font=("Arial", 12, "bold"),
-            relief="flat")
-        style.map("Treeview",
-            background=[("selected", self.theme.get("info", "#FF8C00"))],
-            foreground=[("selected", self.theme["fg"])])
-
+        money = lambda v: "" if v is None else f"{v:.2f}"
         if status.lower() == 'pending':
             columns = ("ID", "Name", "Place", "Phone", "Total", "Date", "Paid", "Remaining to Pay", "Refund")
+            formatters = {7: money, 8: money}
         else:
             columns = ("ID", "Name", "Place", "Phone", "Total", "Date", "Paid")
+            formatters = {}
 
-        tree = ttk.Treeview(table_frame, columns=columns, show="headings", style="Treeview")
-        for col in columns:
-            tree.heading(col, text=col)
-            tree.column(col, anchor="center")
-            tree.column(col, width=120, stretch=True)
+        table = VirtualTable(table_frame, columns, self.theme, data=data, formatters=formatters)
+        table.pack(fill=tk.BOTH, expand=True)
 
-        for row in rows:
-            if status.lower() == 'pending':
-                remaining = row[7] if row[7] is not None else 0
-                if remaining > 0:
-                    remaining_to_pay = f"{remaining:.2f}"
-                    refund = ""
-                elif remaining < 0:
-                    remaining_to_pay = ""
-                    refund = f"{-remaining:.2f}"
-                else:
-                    remaining_to_pay = ""
-                    refund = ""
-                tree.insert("", "end", values=(
-                    row[0], row[1], row[2], row[3], row[4], row[5], row[6],
-                    remaining_to_pay, refund
-                ))
-            else:
-                tree.insert("", "end", values=(
-                    row[0], row[1], row[2], row[3], row[4], row[5], row[6]
-                ))
-
-        scroll_y = ttk.Scrollbar(table_frame, orient="vertical", command=tree.yview)
-        scroll_y.pack(side=tk.RIGHT, fill=tk.Y)
-        tree.configure(yscrollcommand=scroll_y.set)
-        tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-
-        # Live search functionality
-        def search_customers(*args):
-            query = search_var.get().lower()
-            for child in tree.get_children():
-                values = tree.item(child)["values"]
-                if any(query in str(v).lower() for v in values):
-                    tree.selection_set(child)
-                    tree.focus(child)
-                    tree.see(child)
-                    break
-
-        search_var.trace_add("write", search_customers)
+        # Live search: show only the matching rows once typing pauses
+        search_var.trace_add("write", lambda *args: table.set_filter_later(search_var.get()))
 
         # Store widgets for theme updates
-        top._tree = tree
+        top._table = table
         top._table_frame = table_frame
         top._title_label = title_label
         top._search_frame = search_frame
@@ -199,71 +159,32 @@ class PurchaseStats:
                               fill="white" if completed_pct else "#888")
 
     def download_excel(self):
-        try:
-            
-            # Fetch all customer data
-            conn = sqlite3.connect("inward/purchase.db")
-            cur = conn.cursor()
-            cur.execute("SELECT purchaser_id, purchaser_name, Place, phone_number, total_amount, date, amount_paid, remaining_amount, status FROM purchaser ORDER BY purchaser_name")
-            rows = cur.fetchall()
-            conn.close()
-
-            # Prepare Pending and Completed data
-            pending_data = []
-            completed_data = []
-            pending_columns = ["ID", "Name", "Place", "Phone", "Total", "Date", "Paid", "Remaining to Pay", "Refund"]
-            completed_columns = ["ID", "Name", "Place", "Phone", "Total", "Date", "Paid"]
+        downloads = str(Path.home() / "Downloads")
+        filename = os.path.join(downloads, f"Purchases_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
+        # Streamed from the database on a background thread; see excel_export
+        run_export(self.parent, self.theme, "Exporting purchasers",
+                   export_workbook, filename, "purchase", party_sheets("purchase", include_lines=True),
+                   on_done=self._export_finished,
+                   on_error=lambda e: self.show_themed_messagebox("Error", f"Failed to export: {e}"))
+
+    def _export_finished(self, filename):
+        # Show themed notification
+        self.show_themed_messagebox(
+            "Success",
+            f"Data exported to {filename}\n\nClick OK to open the file."
+        )
 
-            for row in rows:
-                remaining = row[7] if row[7] is not None else 0
-                status = row[8].lower()
-                if status == 'pending':
-                    if remaining > 0:
-                        remaining_to_pay = f"{remaining:.2f}"
-                        refund = ""
-                    elif remaining < 0:
-                        remaining_to_pay = ""
-                        refund = f"{-remaining:.2f}"
-                    else:
-                        remaining_to_pay = ""
-                        refund = ""
-                    pending_data.append([
-                        row[0], row[1], row[2], row[3], row[4], row[5], row[6],
-                        remaining_to_pay, refund
-                    ])
-                elif status == 'completed':
-                    completed_data.append([
-                        row[0], row[1], row[2], row[3], row[4], row[5], row[6]
-                    ])
-
-            # Save to Excel with two sheets
-            downloads = str(Path.home() / "Downloads")
-            filename = os.path.join(downloads, f"Purchases_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx")
-
-            with pd.ExcelWriter(filename) as writer:
-                pd.DataFrame(pending_data, columns=pending_columns).to_excel(writer, sheet_name="Pending", index=False)
-                pd.DataFrame(completed_data, columns=completed_columns).to_excel(writer, sheet_name="Completed", index=False)
-
-            # Show themed notification
-            self.show_themed_messagebox(
-                "Success",
-                f"Data exported to {filename}\n\nClick OK to open the file."
-            )
-
-            # Open the file after OK
-            abs_filename = os.path.abspath(filename)
-            try:
-                if sys.platform.startswith('darwin'):
-                    os.system(f'open "{abs_filename}"')
-                elif os.name == 'nt':
-                    os.startfile(abs_filename)
-                elif os.name == 'posix':
-                    os.system(f'xdg-open "{abs_filename}"')
-            except Exception as open_err:
-                self.show_themed_messagebox("Open File", f"Could not open file automatically: {open_err}")
-
-        except Exception as e:
-            self.show_themed_messagebox("Error", f"Failed to export: {e}")
+        # Open the file after OK
+        abs_filename = os.path.abspath(filename)
+        try:
+            if sys.platform.startswith('darwin'):
+                os.system(f'open "{abs_filename}"')
+            elif os.name == 'nt':
+                os.startfile(abs_filename)
+            elif os.name == 'posix':
+                os.system(f'xdg-open "{abs_filename}"')
+        except Exception as open_err:
+            self.show_themed_messagebox("Open File", f"Could not open file automatically: {open_err}")
 
     def show_themed_messagebox(self, title, message):
         # Custom themed messagebox using your theme
@@ -300,10 +221,15 @@ class PurchaseStats:
         top.wait_window()
 
     def setup_sales_stats(self):
+        # The counts are read on a worker thread; the panel is drawn when they arrive
+        data_worker.submit(self.sales_frame, self.get_customer_stats,
+                           on_result=self._draw_sales_stats, key="stats.purchase")
+
+    def _draw_sales_stats(self, counts):
         for widget in self.sales_frame.winfo_children():
             widget.destroy()
 
-        total, pending, completed = self.get_customer_stats()
+        total, pending, completed = counts["total"], counts["pending"], counts["completed"]
 
         # Ensure the sales_frame expands fully
         self.sales_frame.grid(sticky="nsew", padx=5, pady=5)
@@ -328,7 +254,7 @@ class PurchaseStats:
         content_frame.grid(row=1, column=0, columnspan=3, sticky="nsew", padx=0, pady=0)
 
         # Make content_frame expand to fill sales_frame
-        for i in range(2):
+        for i in range(3):
             content_frame.rowconfigure(i, weight=1)
         for i in range(3):
             content_frame.columnconfigure(i, weight=1)
@@ -358,12 +284,18 @@ class PurchaseStats:
             command=self.download_excel
         )
         download_btn.grid(row=1, column=1, sticky="nsew", pady=4, padx=8)
-        # Right: Pie chart (centered over both rows)
+
+        # Bottom row: what is still to be settled, from the same pass as the counts
+        self.create_stat(
+            content_frame, f"₹{counts['outstanding']:,.2f}", "Outstanding",
+            self.theme.get("pending", "#FF3B30"), row=2, col=0
+        )
+        # Right: Pie chart (centered over all rows)
         pie_frame = tk.Frame(
             content_frame,
             bg=self.theme.get("notif_container_bg", self.theme["bg"])
         )
-        pie_frame.grid(row=0, column=2, rowspan=2, sticky="nsew", padx=(10, 0))
+        pie_frame.grid(row=0, column=2, rowspan=3, sticky="nsew", padx=(10, 0))
         self.create_pie_chart(pie_frame, pending, completed)
     def update_theme(self, theme):
         self.theme = theme
@@ -389,22 +321,6 @@ class PurchaseStats:
                     window._search_entry.configure(
                         bg=self.theme["bg"],
                         fg=self.theme["fg"])
-                if hasattr(window, '_tree'):
-                    style = ttk.Style()
-                    style.theme_use("clam")
-                    style.configure("Treeview",
-                        background=self.theme["bg"],
-                        foreground=self.theme["fg"],
-                        fieldbackground=self.theme["bg"],
-                        bordercolor=self.theme.get("notif_container_bg", self.theme["bg"]),
-                        borderwidth=2,
-                        relief="solid")
-                    style.configure("Treeview.Heading",
-                        background=self.theme.get("notif_container_bg", self.theme["bg"]),
-                        foreground=self.theme["fg"],
-                        font=("Arial", 12, "bold"),
-                        relief="flat")
-                    style.map("Treeview",
-                        background=[("selected", self.theme.get("info", "#FF8C00"))],
-                        foreground=[("selected", self.theme["fg"])])
+                if hasattr(window, '_table'):
+                    window._table.set_colors(self.theme)
 
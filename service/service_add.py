@@ -261,33 +261,22 @@ class ServiceAddFrame(tk.Frame):
             )
             return
 
-        # --- Add customer ---
-        status = "completed" if total_amount == amount_paid else "pending"
-        service_id, result, new_total, new_paid, new_remaining, status = service_backend.add_or_update_service_customer(
+        # --- Customer, service item, advance and bill number in one go ---
+        service_id, result, bill_number = service_backend.commit_service_bill(
             customer_name=name,
             place=place,
             phone_number=phone,
+            item_name=service,
+            description=desc,
             total_amount=total_amount,
             amount_paid=amount_paid
         )
-
-
-        # --- Add service item ---
-        now = datetime.now().strftime("%Y/%m/%d %H:%M:%S")
-        service_backend.add_service_item(
-            service_id,  # positional arguments as required!
-            service,
-            desc,
-            total_amount
-        )
-
-        # --- Add payment if any advance ---
-        if amount_paid > 0:
-            service_backend.add_service_payment(
-                service_id,
-                amount_paid,
-                "Payment"
+        if service_id is None:
+            self.show_notification(
+                "This name or phone number is already registered with another customer.",
+                title="Duplicate Customer"
             )
+            return
 
         to_pay = total_amount - amount_paid
 
@@ -301,6 +290,7 @@ class ServiceAddFrame(tk.Frame):
             "amount_paid": amount_paid,
             "to_pay": to_pay,
             "date": datetime.now().strftime("%d-%m-%Y"),
+            "bill_number": bill_number,
         }
 
         self.generate_and_print_bill(bill_data)
@@ -314,7 +304,7 @@ class ServiceAddFrame(tk.Frame):
             company = json.load(f)
         # Ensure bills folder exists
         os.makedirs("bills", exist_ok=True)
-        bill_number = get_next_bill_number()
+        bill_number = bill_data["bill_number"]
         item_name = "".join([c for c in bill_data['service'] if c.isalnum()])[:10]
         filename = f"bills/{item_name}_{bill_number}.pdf"
         c = canvas.Canvas(filename, pagesize=A4)
@@ -443,24 +433,6 @@ class ServiceAddFrame(tk.Frame):
 
    
    
-def get_next_bill_number():
-        counter_file = "bill_counter.json"
-        # If the file does not exist, create it
-        if not os.path.exists(counter_file):
-            with open(counter_file, "w") as f:
-                json.dump({"last_bill_number": 0}, f)
-        # Read the current counter
-        with open(counter_file, "r") as f:
-            data = json.load(f)
-        last_number = data.get("last_bill_number", 0)
-        next_number = last_number + 1
-        data["last_bill_number"] = next_number
-        # Write back the updated counter
-        with open(counter_file, "w") as f:
-            json.dump(data, f)
-        # Return the formatted bill number
-        return f"BILL{next_number:05d}"
-
 # Example usage:
 if __name__ == "__main__":
     def get_colors():
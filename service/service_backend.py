@@ -1,15 +1,27 @@
 import sqlite3
-from datetime import datetime
-
-DB_PATH = "service/service.db"
+import os
+import json
+from db_pool import BASE_DIR, DB_PATHS, get_connection
+from db_migrations import run_migrations
+from db_sequences import SEQUENCE_TABLE_SQL, allocate, seed_sequence
+from db_catalog import PRODUCT_TABLE_SQL, catalog_edit_sql, catalog_sql
+from db_dates import day_range, normalize_dates_sql, now
+from db_months import month_changes_sql
+from db_status import status_sql
+from db_paging import DEFAULT_PAGE_SIZE, keyset_page
+from db_name_search import name_index_sql, ranked_rows, rebuild_name_index_sql
+from id_generator import new_id
+from phone_index import PhonePrefixIndex
+
+DB_PATH = DB_PATHS["service"]
+BILL_COUNTER_PATH = os.path.join(BASE_DIR, "bill_counter.json")
 
 def get_db_connection():
-    return sqlite3.connect(DB_PATH)
+    return get_connection("service")
 
-def initialize_db():
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        c.execute("""
+MIGRATIONS = [
+    (1, "base tables", [
+        """
         CREATE TABLE IF NOT EXISTS service_customer (
             service_id TEXT PRIMARY KEY,
             customer_name TEXT NOT NULL,
@@ -21,8 +33,8 @@ def initialize_db():
             remaining_amount REAL NOT NULL,
             status TEXT NOT NULL
         )
-        """)
-        c.execute("""
+        """,
+        """
         CREATE TABLE IF NOT EXISTS service_item (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             service_id TEXT NOT NULL,
@@ -32,8 +44,8 @@ def initialize_db():
             date TEXT NOT NULL,
             FOREIGN KEY (service_id) REFERENCES service_customer(service_id) ON DELETE CASCADE
         )
-        """)
-        c.execute("""
+        """,
+        """
         CREATE TABLE IF NOT EXISTS service_payment (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             service_id TEXT NOT NULL,
@@ -44,8 +56,73 @@ def initialize_db():
             remarks TEXT,
             FOREIGN KEY (service_id) REFERENCES service_customer(service_id) ON DELETE CASCADE
         )
-        """)
-        conn.commit()
+        """,
+    ]),
+    (2, "secondary indexes for per-customer views", [
+        "CREATE INDEX IF NOT EXISTS idx_service_customer_name_phone ON service_customer(customer_name, phone_number, date)",
+        "CREATE INDEX IF NOT EXISTS idx_service_customer_phone_date ON service_customer(phone_number, date)",
+        # NOCASE so that LIKE 'prefix%' (case-insensitive) can use the index
+        "CREATE INDEX IF NOT EXISTS idx_service_customer_phone_nocase ON service_customer(phone_number COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_service_customer_name_nocase ON service_customer(customer_name COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS idx_service_item_service_date ON service_item(service_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_service_item_date ON service_item(date)",
+        "CREATE INDEX IF NOT EXISTS idx_service_payment_service_date ON service_payment(service_id, date)",
+        "CREATE INDEX IF NOT EXISTS idx_service_payment_date ON service_payment(date)",
+    ]),
+    (3, "sequence table for service ids and bill numbers", [
+        SEQUENCE_TABLE_SQL,
+        lambda conn: _seed_sequences(conn.cursor()),
+    ]),
+    (4, "full-text index on customer names and places",
+        name_index_sql("service_customer", "customer_name", "place")),
+    (5, "product catalog", [
+        PRODUCT_TABLE_SQL,
+        *catalog_sql("service_item", "item_name", "amount", "last_sale_price"),
+    ]),
+    (6, "dates as sortable YYYY-MM-DD HH:MM:SS text", [
+        *normalize_dates_sql("service_customer"),
+        *normalize_dates_sql("service_item"),
+        *normalize_dates_sql("service_payment"),
+    ]),
+    (7, "indexed lower-case status",
+        status_sql("service_customer")),
+    (8, "per-month change counters for the Parquet export", [
+        *month_changes_sql("service_item"),
+        *month_changes_sql("service_payment"),
+    ]),
+    # In case the database was vacuumed since the index was built
+    (9, "name index rebuilt against current rowids", [
+        rebuild_name_index_sql("service_customer"),
+    ]),
+    (10, "catalog follows price and description edits",
+        catalog_edit_sql("service_item", "item_name", "amount", "last_sale_price")),
+]
+
+def _seed_sequences(c):
+    # Service ids used to be timestamps, so the id counter starts fresh;
+    # bill numbers carry on from the old JSON counter.
+    last_bill = 0
+    try:
+        if os.path.exists(BILL_COUNTER_PATH):
+            with open(BILL_COUNTER_PATH) as f:
+                last_bill = int(json.load(f).get("last_bill_number", 0))
+    except (ValueError, OSError) as e:
+        print(f"Could not import {BILL_COUNTER_PATH}: {e}")
+    seed_sequence(c, "service_bill", last_bill)
+    seed_sequence(c, "service_id", 0)
+
+def _next_service_id(c):
+    return f"SVC-{allocate(c, 'service', 'service_id'):05d}"
+
+def _load_phone_entries():
+    return get_db_connection().execute(
+        "SELECT phone_number, customer_name, place FROM service_customer").fetchall()
+
+# Phone autocomplete answers from memory; see phone_index.py
+PHONE_INDEX = PhonePrefixIndex(_load_phone_entries)
+
+def initialize_db():
+    run_migrations("service", MIGRATIONS)
 
 # --- CUSTOMER ADD/UPDATE LOGIC WITH CONFLICT CHECKS ---
 
@@ -76,20 +153,21 @@ def add_service_customer(customer_name, place, phone_number, total_amount, amoun
     """
     with get_db_connection() as conn:
         c = conn.cursor()
-        service_id = f"SVC-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        date = datetime.now().strftime("%Y/%m/%d %H:%M:%S")
+        service_id = _next_service_id(c)
+        date = now()
         remaining_amount = total_amount - amount_paid
         c.execute("""
             INSERT INTO service_customer (service_id, customer_name, phone_number, place, date, total_amount, amount_paid, remaining_amount, status)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (service_id, customer_name, phone_number, place, date, total_amount, amount_paid, remaining_amount, status))
         conn.commit()
-        return service_id
+    PHONE_INDEX.add(phone_number, customer_name, place)
+    return service_id
 
 
 def add_service_item(service_id, item_name, description, amount, date=None):
     if not date:
-        date = datetime.now().strftime("%Y/%m/%d %H:%M:%S")
+        date = now()
     with get_db_connection() as conn:
         c = conn.cursor()
         c.execute("""
@@ -100,11 +178,15 @@ def add_service_item(service_id, item_name, description, amount, date=None):
 
 # --- SERVICE PAYMENT ---
 
+def generate_payment_id():
+    """Generate a payment ID like PAY-20250514185648-0000001-3fa2."""
+    return new_id("PAY-")
+
 def add_service_payment(service_id, amount_paid, remarks=None):
     with get_db_connection() as conn:
         c = conn.cursor()
-        payment_id = f"PAY-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        date = datetime.now().strftime("%Y/%m/%d %H:%M:%S")
+        payment_id = generate_payment_id()
+        date = now()
         c.execute("""
             INSERT INTO service_payment (service_id, payment_id, date, amount_paid, remarks)
             VALUES (?, ?, ?, ?, ?)
@@ -119,8 +201,8 @@ def add_service_payment_to_record(service_id, amount):
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
-            payment_id = f"PAY-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            date = datetime.now().strftime("%Y/%m/%d %H:%M:%S")
+            payment_id = generate_payment_id()
+            date = now()
             c.execute("""
                 INSERT INTO service_payment (service_id, payment_id, date, amount_paid)
                 VALUES (?, ?, ?, ?)
@@ -161,16 +243,6 @@ def search_customer_by_name(prefix):
         """, (f"{prefix}%",))
         return c.fetchall()
 
-def search_customer_by_phone(prefix):
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        c.execute("""
-            SELECT phone_number, customer_name, place FROM service_customer
-            WHERE phone_number LIKE ?
-            GROUP BY phone_number, customer_name, place
-        """, (f"{prefix}%",))
-        return c.fetchall()
-
 def customer_exists_by_name(name):
     with get_db_connection() as conn:
         c = conn.cursor()
@@ -202,6 +274,50 @@ def get_service_customer_by_name_phone(name, phone):
         """, (name, phone))
         return c.fetchone()
 
+def _save_service_customer(c, customer_name, place, phone_number, total_amount, amount_paid):
+    # add_or_update_service_customer inside the caller's transaction. Returns
+    # its tuple plus how PHONE_INDEX must follow once committed: "add",
+    # "invalidate" or None.
+    c.execute("SELECT service_id, customer_name, total_amount, amount_paid, place FROM service_customer WHERE phone_number=?", (phone_number,))
+    row = c.fetchone()
+    if row:
+        service_id, existing_name, prev_total, prev_paid, prev_place = row
+        if existing_name != customer_name:
+            return (None, "error_phone_conflict", None, None, None, None), None
+        # Update: add to totals
+        new_total = prev_total + total_amount
+        new_paid = prev_paid + amount_paid
+        new_remaining = new_total - new_paid
+        status = "completed" if abs(new_remaining) < 0.01 else "pending"
+        c.execute("""
+            UPDATE service_customer
+            SET customer_name=?, place=?, total_amount=?, amount_paid=?, remaining_amount=?, status=?
+            WHERE service_id=?
+        """, (customer_name, place, new_total, new_paid, new_remaining, status, service_id))
+        index_change = "invalidate" if place != prev_place else None
+        return (service_id, "updated", new_total, new_paid, new_remaining, status), index_change
+    # Check if name exists with different phone
+    c.execute("SELECT phone_number FROM service_customer WHERE customer_name=? ORDER BY date DESC LIMIT 1", (customer_name,))
+    row = c.fetchone()
+    if row and row[0] != phone_number:
+        return (None, "error_name_conflict", None, None, None, None), None
+    # Insert new
+    service_id = _next_service_id(c)
+    date = now()
+    remaining = total_amount - amount_paid
+    status = "completed" if abs(remaining) < 0.01 else "pending"
+    c.execute("""
+        INSERT INTO service_customer (service_id, customer_name, phone_number, place, date, total_amount, amount_paid, remaining_amount, status)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, (service_id, customer_name, phone_number, place, date, total_amount, amount_paid, remaining, status))
+    return (service_id, "inserted", total_amount, amount_paid, remaining, status), "add"
+
+def _follow_phone_index(index_change, phone_number, customer_name, place):
+    if index_change == "add":
+        PHONE_INDEX.add(phone_number, customer_name, place)
+    elif index_change == "invalidate":
+        PHONE_INDEX.invalidate()
+
 def add_or_update_service_customer(customer_name, place, phone_number, total_amount, amount_paid):
     """
     - If phone exists and name matches: update totals (add to total_amount, add to amount_paid, recalc remaining and status)
@@ -211,42 +327,45 @@ def add_or_update_service_customer(customer_name, place, phone_number, total_amo
     Returns: (service_id, result, new_total, new_paid, new_remaining, status)
     """
     with get_db_connection() as conn:
+        result, index_change = _save_service_customer(
+            conn.cursor(), customer_name, place, phone_number, total_amount, amount_paid)
+        conn.commit()
+    _follow_phone_index(index_change, phone_number, customer_name, place)
+    return result
+
+def commit_service_bill(customer_name, place, phone_number, item_name, description, total_amount, amount_paid):
+    """
+    Writes a whole service bill in one transaction: the customer (as
+    add_or_update_service_customer), the service item, the advance payment
+    if any, and the next bill number (BILL00001, ...), so a failure part way
+    leaves neither a half-written service nor a skipped bill number.
+    Returns (service_id, result, bill_no); on a name/phone conflict nothing is
+    written and service_id and bill_no are None.
+    """
+    date = now()
+    conn = get_db_connection()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
         c = conn.cursor()
-        # Check if phone exists
-        c.execute("SELECT service_id, customer_name, total_amount, amount_paid FROM service_customer WHERE phone_number=?", (phone_number,))
-        row = c.fetchone()
-        if row:
-            service_id, existing_name, prev_total, prev_paid = row
-            if existing_name != customer_name:
-                return None, "error_phone_conflict", None, None, None, None
-            # Update: add to totals
-            new_total = prev_total + total_amount
-            new_paid = prev_paid + amount_paid
-            new_remaining = new_total - new_paid
-            status = "completed" if abs(new_remaining) < 0.01 else "pending"
-            c.execute("""
-                UPDATE service_customer
-                SET customer_name=?, place=?, total_amount=?, amount_paid=?, remaining_amount=?, status=?
-                WHERE service_id=?
-            """, (customer_name, place, new_total, new_paid, new_remaining, status, service_id))
-            conn.commit()
-            return service_id, "updated", new_total, new_paid, new_remaining, status
-        # Check if name exists with different phone
-        c.execute("SELECT phone_number FROM service_customer WHERE customer_name=? ORDER BY date DESC LIMIT 1", (customer_name,))
-        row = c.fetchone()
-        if row and row[0] != phone_number:
-            return None, "error_name_conflict", None, None, None, None
-        # Insert new
-        service_id = f"SVC-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        date = datetime.now().strftime("%Y/%m/%d %H:%M:%S")
-        remaining = total_amount - amount_paid
-        status = "completed" if abs(remaining) < 0.01 else "pending"
+        saved, index_change = _save_service_customer(
+            c, customer_name, place, phone_number, total_amount, amount_paid)
+        service_id, result = saved[0], saved[1]
+        if service_id is None:
+            conn.rollback()
+            return None, result, None
         c.execute("""
-            INSERT INTO service_customer (service_id, customer_name, phone_number, place, date, total_amount, amount_paid, remaining_amount, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (service_id, customer_name, phone_number, place, date, total_amount, amount_paid, remaining, status))
-        conn.commit()
-        return service_id, "inserted", total_amount, amount_paid, remaining, status
+            INSERT INTO service_item (service_id, item_name, description, amount, date)
+            VALUES (?, ?, ?, ?, ?)
+        """, (service_id, item_name, description, total_amount, date))
+        if amount_paid > 0:
+            c.execute("""
+                INSERT INTO service_payment (service_id, payment_id, date, amount_paid, remarks)
+                VALUES (?, ?, ?, ?, ?)
+            """, (service_id, generate_payment_id(), date, amount_paid, "Payment"))
+        bill_no = f"BILL{allocate(c, 'service', 'service_bill'):05d}"
+    _follow_phone_index(index_change, phone_number, customer_name, place)
+    return service_id, result, bill_no
+
 def add_spare_amount_to_service(service_id, amount):
     try:
         with get_db_connection() as conn:
@@ -258,7 +377,7 @@ def add_spare_amount_to_service(service_id, amount):
             """, (amount, amount, service_id))
             item_name = "Spare Product"
             description = "Additional service to other repaired Parts"
-            date_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            date_str = now()
             c.execute("""
                 INSERT INTO service_item (service_id, item_name, description, amount, date)
                 VALUES (?, ?, ?, ?, ?)
@@ -287,50 +406,73 @@ def get_service_id(name, phone, place):
         return row[0] if row else None
 
 
-def get_all_activities_by_name_phone(name, phone, start_date=None, end_date=None):
-    """Return a list of all activities (service items and payments) for the customer, sorted by date/time descending."""
+# One page of a customer's timeline; see get_service_timeline()
+TIMELINE_PAGE_SIZE = 100
+
+def _timeline_branch(table, alias, columns, kind, start_date, end_date, before):
+    # One side of the timeline UNION: this customer's rows of table inside
+    # the day range and strictly after the cursor in timeline order
+    clauses = ["sc.customer_name=?", "sc.phone_number=?"]
+    params = []
+    in_range, range_params = day_range(f"{alias}.date", start_date, end_date)
+    if in_range:
+        clauses.append(in_range)
+        params.extend(range_params)
+    if before:
+        # The plain bound lets the date index narrow the range; the row
+        # value comparison settles ties on the same second
+        clauses.append(f"{alias}.date <= ? AND ({alias}.date, '{kind}', {alias}.id) < (?, ?, ?)")
+        params.extend([before[0], *before])
+    sql = f"""
+            SELECT {alias}.date, '{kind}', {alias}.id, {columns}, {alias}.service_id
+            FROM service_customer sc
+            JOIN {table} {alias} ON {alias}.service_id = sc.service_id
+            WHERE {" AND ".join(clauses)}"""
+    return sql, params
+
+def get_service_timeline(name, phone, start_date=None, end_date=None, before=None, limit=TIMELINE_PAGE_SIZE):
+    """
+    Returns one page of the customer's service items and payments, newest
+    first, as (date, kind, id, item_name, description, amount, service_id)
+    tuples. kind is 'item' (item_name, fault description, amount) or
+    'payment' (item_name None, remarks, amount paid).
+    start_date/end_date bound the days (inclusive). For the next page pass
+    before=timeline_cursor(last row of this page); limit=None returns
+    everything from the cursor on.
+    """
+    items_sql, items_params = _timeline_branch(
+        "service_item", "si", "si.item_name, si.description, si.amount",
+        "item", start_date, end_date, before)
+    payments_sql, payments_params = _timeline_branch(
+        "service_payment", "sp", "NULL, sp.remarks, sp.amount_paid",
+        "payment", start_date, end_date, before)
     with get_db_connection() as conn:
         c = conn.cursor()
-        # Service items
-        c.execute("""
-            SELECT si.date, 'service_item', si.item_name, si.description, si.amount, sc.service_id
-            FROM service_item si
-            JOIN service_customer sc ON sc.service_id = si.service_id
-            WHERE sc.customer_name=? AND sc.phone_number=?
-        """, (name, phone))
-        service_items = [{
-            "date": row[0],
-            "type": row[1],
-            "item_name": row[2],
-            "description": row[3],
-            "amount": row[4],
-            "service_id": row[5]
-        } for row in c.fetchall()]
-
-        # Payments
-        c.execute("""
-            SELECT sp.date, 'payment', NULL, sp.remarks, sp.amount_paid, sp.service_id
-            FROM service_payment sp
-            JOIN service_customer sc ON sc.service_id = sp.service_id
-            WHERE sc.customer_name=? AND sc.phone_number=?
-        """, (name, phone))
-        payments = [{
-            "date": row[0],
-            "type": row[1],
-            "item_name": None,
-            "description": row[3],
-            "amount": row[4],
-            "service_id": row[5]
-        } for row in c.fetchall()]
-
-        # Combine and filter by date if needed
-        all_activities = service_items + payments
-        if start_date:
-            all_activities = [a for a in all_activities if a["date"][:10].replace("-", "/") >= start_date.replace("-", "/")]
-        if end_date:
-            all_activities = [a for a in all_activities if a["date"][:10].replace("-", "/") <= end_date.replace("-", "/")]
-        all_activities.sort(key=lambda x: x["date"], reverse=True)
-        return all_activities
+        c.execute(f"""
+            {items_sql}
+            UNION ALL
+            {payments_sql}
+            ORDER BY 1 DESC, 2 DESC, 3 DESC
+            LIMIT ?
+        """, (name, phone, *items_params, name, phone, *payments_params,
+              -1 if limit is None else limit))
+        return c.fetchall()
+
+def timeline_cursor(row):
+    """The keyset cursor after a get_service_timeline() row."""
+    return row[0], row[1], row[2]
+
+def get_all_activities_by_name_phone(name, phone, start_date=None, end_date=None):
+    """Return a list of all activities (service items and payments) for the customer, sorted by date/time descending."""
+    return [{
+        "date": date,
+        "type": "service_item" if kind == "item" else "payment",
+        "item_name": item_name,
+        "description": description,
+        "amount": amount,
+        "service_id": service_id
+    } for date, kind, _, item_name, description, amount, service_id
+        in get_service_timeline(name, phone, start_date, end_date, limit=None)]
 def get_customer_by_name(name):
     with get_db_connection() as conn:
         c = conn.cursor()
@@ -344,19 +486,26 @@ def get_customer_by_phone(phone):
         return c.fetchone()
 
 def search_customer_by_name_words(words):
+    """
+    Returns distinct (customer_name, phone_number, place) where every one of
+    words starts a word of the name or place, best match first.
+    """
     with get_db_connection() as conn:
-        c = conn.cursor()
-        query = "SELECT DISTINCT customer_name, phone_number, place FROM service_customer WHERE "
-        query += " AND ".join(["customer_name LIKE ?"] * len(words))
-        params = [f"%{w}%" for w in words]
-        c.execute(query, params)
-        return c.fetchall()
+        rows = ranked_rows(conn.cursor(), "service_customer",
+                           ["customer_name", "phone_number", "place"], words, operator="AND")
+    return list(dict.fromkeys(rows))
 
 def search_customer_by_phone(prefix):
+    """Returns distinct (phone_number, customer_name, place) whose phone starts with prefix."""
+    return PHONE_INDEX.lookup(prefix)
+
+def update_customer_phone_place(name, old_phone, new_phone, new_place):
     with get_db_connection() as conn:
-        c = conn.cursor()
-        c.execute("SELECT DISTINCT phone_number, customer_name, place FROM service_customer WHERE phone_number LIKE ?", (f"{prefix}%",))
-        return c.fetchall()
+        conn.execute("""
+            UPDATE service_customer SET phone_number=?, place=?
+            WHERE customer_name=? AND phone_number=?
+        """, (new_phone, new_place, name, old_phone))
+    PHONE_INDEX.invalidate()
 def get_customer_summary(name, phone):
     """Return total, paid, remaining, status for this customer (across all services)."""
     with get_db_connection() as conn:
@@ -373,76 +522,50 @@ def get_customer_summary(name, phone):
         status = "Completed" if abs(remaining) < 0.01 else "Pending"
         return total, paid, remaining, status
 
-def get_service_history_by_date(name, phone, start_date=None, end_date=None):
-    from collections import defaultdict
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        # Get all service items
-        c.execute("""
-            SELECT si.item_name, si.amount, si.description, si.date
-            FROM service_item si
-            JOIN service_customer sc ON si.service_id = sc.service_id
-            WHERE sc.customer_name=? AND sc.phone_number=?
-        """, (name, phone))
-        items = c.fetchall()
+def group_timeline_by_day(rows, history=None):
+    """
+    Groups timeline rows into {'YYYY/MM/DD': {"items": [...], "payments": [...]}},
+    newest day first, adding to history when given (to extend it with a
+    further page).
+    """
+    if history is None:
+        history = {}
+    for date, kind, _, item_name, description, amount, _ in rows:
+        day = history.setdefault(date[:10].replace("-", "/"), {"items": [], "payments": []})
+        if kind == "item":
+            day["items"].append({
+                "item_name": item_name,
+                "amount": amount,
+                "description": description,
+                "time": date[11:]
+            })
+        else:
+            day["payments"].append({
+                "amount": amount,
+                "time": date[11:]
+            })
+    return history
 
-        # Get all payments
-        c.execute("""
-            SELECT sp.amount_paid, sp.date
-            FROM service_payment sp
-            JOIN service_customer sc ON sp.service_id = sc.service_id
-            WHERE sc.customer_name=? AND sc.phone_number=?
-        """, (name, phone))
-        payments = c.fetchall()
-
-    # Group by date (YYYY/MM/DD)
-    history = defaultdict(lambda: {"items": [], "payments": []})
-
-    for item_name, amount, desc, dt in items:
-        date_part = dt[:10].replace("-", "/")
-        time_part = dt[11:] if len(dt) > 10 else ""
-        history[date_part]["items"].append({
-            "item_name": item_name,
-            "amount": amount,
-            "description": desc,
-            "time": time_part
-        })
-
-    for amt, dt in payments:
-        date_part = dt[:10].replace("-", "/")
-        time_part = dt[11:] if len(dt) > 10 else ""
-        history[date_part]["payments"].append({
-            "amount": amt,
-            "time": time_part
-        })
-
-    # Filter by date range if needed
-    if start_date:
-        history = {d: v for d, v in history.items() if d >= start_date.replace("-", "/")}
-    if end_date:
-        history = {d: v for d, v in history.items() if d <= end_date.replace("-", "/")}
-
-    return dict(sorted(history.items(), reverse=True))
+def get_service_history_by_date(name, phone, start_date=None, end_date=None):
+    rows = get_service_timeline(name, phone, start_date, end_date, limit=None)
+    return group_timeline_by_day(rows)
 
 def get_service_items_general_view(from_date=None, to_date=None):
     """
     Returns list of tuples: (customer_name, item_name, description, amount, date)
-    Filters by date range on service_item.date (date part only, ignores time).
+    Filters by date range on service_item.date (whole days, both inclusive).
     """
     with get_db_connection() as conn:
         c = conn.cursor()
-        # Convert YYYY-MM-DD to YYYY/MM/DD for LIKE pattern matching
         if from_date and to_date:
-            # Accept both '-' and '/' as separator for robustness
-            from_date_str = from_date.replace("-", "/")
-            to_date_str = to_date.replace("-", "/")
-            c.execute("""
+            in_range, range_params = day_range("si.date", from_date, to_date)
+            c.execute(f"""
                 SELECT sc.customer_name, si.item_name, si.description, si.amount, si.date
                 FROM service_item si
                 JOIN service_customer sc ON sc.service_id = si.service_id
-                WHERE substr(replace(si.date, '-', '/'), 1, 10) BETWEEN ? AND ?
+                WHERE {in_range}
                 ORDER BY si.date DESC
-            """, (from_date_str, to_date_str))
+            """, range_params)
         else:
             c.execute("""
                 SELECT sc.customer_name, si.item_name, si.description, si.amount, si.date
@@ -452,6 +575,28 @@ def get_service_items_general_view(from_date=None, to_date=None):
             """)
         return c.fetchall()
 
+def list_service_items_page(from_date=None, to_date=None, after=None, limit=DEFAULT_PAGE_SIZE, order="recent"):
+    """
+    Returns one page of service items as (customer_name, item_name, description, amount, date, id),
+    newest first ('recent') or oldest first ('oldest'), limited to the days
+    from_date..to_date when given. For the next page pass
+    after=db_paging.page_cursor(last_row, 4, 5).
+    """
+    in_range, range_params = day_range("si.date", from_date, to_date)
+    after_sql, after_params, order_sql = keyset_page("si.date", "si.id", after, order)
+    where = " AND ".join(clause for clause in (in_range, after_sql) if clause)
+    with get_db_connection() as conn:
+        c = conn.cursor()
+        c.execute(f"""
+            SELECT sc.customer_name, si.item_name, si.description, si.amount, si.date, si.id
+            FROM service_item si
+            JOIN service_customer sc ON sc.service_id = si.service_id
+            {"WHERE " + where if where else ""}
+            {order_sql}
+            LIMIT ?
+        """, (*range_params, *after_params, limit))
+        return c.fetchall()
+
 def get_recent_service_payments_general(order='recent', limit=10):
     """
     Returns list of tuples: (customer_name, payment_id, amount_paid, date)
@@ -496,23 +641,5 @@ def delete_service_item(item_id):
         conn.commit()
         return c.rowcount > 0
 
-def search_service_customers_by_name(prefix):
-    with get_db_connection() as conn:
-        c = conn.cursor()
-        if prefix:
-            c.execute("""
-                SELECT customer_name, place, phone_number FROM service_customer
-                WHERE customer_name LIKE ?
-                ORDER BY customer_name ASC
-                LIMIT 5
-            """, ('%' + prefix + '%',))
-        else:
-            c.execute("""
-                SELECT customer_name, place, phone_number FROM service_customer
-                ORDER BY customer_name ASC
-                LIMIT 5
-            """)
-        return c.fetchall()
-
 # --- Call this at app start ---
 initialize_db()
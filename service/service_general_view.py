@@ -1,7 +1,10 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from datetime import datetime
+from functools import partial
 from service import service_backend
+from db_paging import KeysetPager
+from virtual_table import VirtualTable, TableData
 from tkcalendar import DateEntry
 
 class ServiceGeneralViewFrame(tk.Frame):
@@ -16,6 +19,8 @@ class ServiceGeneralViewFrame(tk.Frame):
 
         self.from_date_var = tk.StringVar(value='')
         self.to_date_var = tk.StringVar(value='')
+        # Days the paged listing is limited to
+        self.page_dates = (None, None)
 
         self.build_title()
         self.build_widgets()
@@ -60,27 +65,11 @@ class ServiceGeneralViewFrame(tk.Frame):
         self.table_frame.pack(fill='both', expand=True, padx=10, pady=10)
 
         columns = ("Customer", "Item", "Fault", "Amount", "Date")
-        self.tree = ttk.Treeview(self.table_frame, columns=columns, show='headings', selectmode='browse')
-        for col in columns:
-            self.tree.heading(col, text=col)
-            self.tree.column(col, anchor='center', stretch=True, width=1, minwidth=80)
-        self.tree.pack(side='left', fill='both', expand=True)
-        self.tree.bind('<Configure>', self._resize_columns)
-
-        self.scrollbar = ttk.Scrollbar(self.table_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=self.scrollbar.set)
-        self.scrollbar.pack(side='right', fill='y')
+        self.table = VirtualTable(self.table_frame, columns, colors)
+        self.table.pack(fill='both', expand=True)
 
         self.on_view_mode_change()
 
-    def _resize_columns(self, event=None):
-        total_width = self.tree.winfo_width()
-        num_cols = len(self.tree["columns"])
-        if num_cols > 0:
-            col_width = int(total_width / num_cols)
-            for col in self.tree["columns"]:
-                self.tree.column(col, width=col_width)
-
     def on_view_mode_change(self):
         for widget in [self.from_label, self.from_entry, self.to_label, self.to_entry,
                        self.num_label, self.num_entry, self.order_label, self.order_combo]:
@@ -110,15 +99,14 @@ class ServiceGeneralViewFrame(tk.Frame):
             self.num_var.set(5)
             limit = 5
 
-        for row in self.tree.get_children():
-            self.tree.delete(row)
+        self.table.set_data([])
 
         view_mode = self.view_mode_var.get()
         if view_mode == 'service':
             from_date = self.from_date_var.get().strip()
             to_date = self.to_date_var.get().strip()
             if not filter_clicked:
-                data = service_backend.get_service_items_general_view()
+                self.page_dates = (None, None)
             else:
                 if from_date and to_date:
                     try:
@@ -127,26 +115,20 @@ class ServiceGeneralViewFrame(tk.Frame):
                     except ValueError:
                         messagebox.showwarning("Invalid Date", "Please enter dates in YYYY-MM-DD format.")
                         return
-                    data = service_backend.get_service_items_general_view(from_date, to_date)
+                    self.page_dates = (from_date, to_date)
                 else:
-                    data = service_backend.get_service_items_general_view()
+                    self.page_dates = (None, None)
             columns = ("Customer", "Item", "Fault", "Amount", "Date")
-            self.tree["columns"] = columns
-            for col in columns:
-                self.tree.heading(col, text=col)
-            for customer, item, desc, amount, date in data:
-                self.tree.insert('', 'end', values=(customer, item, desc, amount, date))
-            self._resize_columns()
+            self.table.set_columns(columns)
+            # Rows come a page at a time as the table is scrolled
+            pager = KeysetPager(partial(service_backend.list_service_items_page, *self.page_dates), 4, 5, keep=5)
+            self.table.set_data(TableData(fetch_more=pager))
         else:
             columns = ("Customer", "Payment ID", "Amount", "Date")
-            self.tree["columns"] = columns
-            for col in columns:
-                self.tree.heading(col, text=col)
+            self.table.set_columns(columns)
             try:
                 data = service_backend.get_recent_service_payments_general(order=self.order_var.get(), limit=limit)
-                for customer, payment_id, amount, date in data:
-                    self.tree.insert('', 'end', values=(customer, payment_id, amount, date))
-                self._resize_columns()
+                self.table.set_data(data)
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to fetch service payments: {e}")
 
@@ -163,20 +145,10 @@ class ServiceGeneralViewFrame(tk.Frame):
         self.table_frame.configure(bg=colors["bg"])
         self.update_widget_colors(self.controls)
         self.update_widget_colors(self.table_frame)
+        self.table.set_colors(colors)
 
         style = ttk.Style()
         style.theme_use('clam')
-        style.configure("Treeview",
-                        background=colors["table_bg"],
-                        foreground=colors["table_fg"],
-                        fieldbackground=colors["table_bg"],
-                        bordercolor=colors["table_border"],
-                        borderwidth=1)
-        style.configure("Treeview.Heading",
-                        background=colors["table_head_bg"],
-                        foreground=colors["table_head_fg"],
-                        font=("Arial", 11, "bold"))
-        style.map('Treeview', background=[('selected', colors["table_head_bg"])])
         style.configure("Custom.TCombobox",
                         fieldbackground=colors["entry_bg"],
                         background=colors["entry_bg"],
@@ -224,13 +224,7 @@ class CustomerModifyFrame(tk.Frame):
                     return
 
         try:
-            with service_backend.get_db_connection() as conn:
-                c = conn.cursor()
-                c.execute("""
-                    UPDATE service_customer SET phone_number=?, place=?
-                    WHERE customer_name=? AND phone_number=?
-                """, (new_phone, new_place, name, self.current_phone))
-                conn.commit()
+            service_backend.update_customer_phone_place(name, self.current_phone, new_phone, new_place)
             self.show_notification(f"Place '{new_place}', Phone '{new_phone}' updated.", "success")
             self.current_phone = new_phone
             self.update_status_bar(name, new_phone)
@@ -225,47 +225,85 @@ class ServiceViewCustomerFrame(tk.Frame):
 
         self.build_scrollable_details_frame()
 
-        # --- Get all service items and payments grouped by date ---
-        history = service_backend.get_service_history_by_date(
-            name, phone, self.filtered_start_date, self.filtered_end_date
+        # --- Service items and payments, one page at a time, grouped by date ---
+        self.timeline_cursor = None
+        self.day_cards = {}
+        self.more_button = None
+        self.load_timeline_page()
+
+    def load_timeline_page(self):
+        """Appends the next (older) page of the customer's timeline to the cards."""
+        rows = service_backend.get_service_timeline(
+            self.current_name, self.current_phone,
+            self.filtered_start_date, self.filtered_end_date,
+            before=self.timeline_cursor
         )
+        if rows:
+            self.timeline_cursor = service_backend.timeline_cursor(rows[-1])
+        if self.more_button is not None:
+            self.more_button.destroy()
+            self.more_button = None
+
+        for date, data in service_backend.group_timeline_by_day(rows).items():
+            card = self.day_cards.get(date) or self.create_day_card(date)
+            for item in data["items"]:
+                self.add_service_line(card, item)
+            for pay in data["payments"]:
+                self.add_payment_line(card, pay)
+
+        if len(rows) == service_backend.TIMELINE_PAGE_SIZE:
+            colors = self.get_colors()
+            self.more_button = tk.Button(self.cards_frame, text="Load older entries",
+                                         command=self.load_timeline_page,
+                                         bg=colors["button_bg"], fg=colors["fg"])
+            self.more_button.pack(pady=10)
+
+    def create_day_card(self, date):
+        # A day can continue on the next page, so a card keeps its two
+        # sections and their counts to add lines to later
+        colors = self.get_colors()
+        frame = tk.Frame(self.cards_frame, bd=2, relief="groove", bg=colors["card_bg"])
+        frame.pack(pady=10, padx=20, fill="x", anchor="center")
 
-        # Clear previous cards
-        for widget in self.cards_frame.winfo_children():
-            widget.destroy()
+        # Card header: Date
+        tk.Label(frame, text=f"Date: {date}", font=("Arial", 13, "bold"),
+                bg=colors["card_bg"], fg=colors["fg"]).pack(anchor="w", padx=10, pady=(5, 2))
+
+        card = {"items": tk.Frame(frame, bg=colors["card_bg"]), "item_count": 0,
+                "payments": tk.Frame(frame, bg=colors["card_bg"]), "payment_count": 0}
+        card["items"].pack(anchor="w", fill="x")
+        card["payments"].pack(anchor="w", fill="x")
+        self.day_cards[date] = card
+        return card
 
-        for date, data in history.items():
-            card = tk.Frame(self.cards_frame, bd=2, relief="groove", bg=colors["card_bg"])
-            card.pack(pady=10, padx=20, fill="x", anchor="center")
-
-            # Card header: Date
-            tk.Label(card, text=f"Date: {date}", font=("Arial", 13, "bold"),
-                    bg=colors["card_bg"], fg=colors["fg"]).pack(anchor="w", padx=10, pady=(5, 2))
-
-            # --- Services Section ---
-            if data["items"]:
-                tk.Label(card, text="Services", font=("Arial", 12, "underline"),
-                        bg=colors["card_bg"], fg=colors["fg"]).pack(anchor="w", padx=20, pady=(2, 0))
-                for idx, item in enumerate(data["items"], 1):
-                    text = f"{idx}. {item['item_name']}"
-                    tk.Label(card, text=text, font=("Arial", 12, "bold"),
-                            bg=colors["card_bg"], fg=colors["fg"]).pack(anchor="w", padx=40, pady=(2, 0))
-                    if item["description"]:
-                        tk.Label(card, text=f"   Fault: {item['description']}", font=("Arial", 11),
-                                bg=colors["card_bg"], fg=colors["fg"]).pack(anchor="w", padx=60, pady=0)
-                    tk.Label(card, text=f"   Amount: {item['amount']:.2f}", font=("Arial", 11),
-                            bg=colors["card_bg"], fg=colors["fg"]).pack(anchor="w", padx=60, pady=(0, 2))
-
-            # --- Transactions Section ---
-            if data["payments"]:
-                tk.Label(card, text="Transactions", font=("Arial", 12, "underline"),
-                        bg=colors["card_bg"], fg=colors["fg"]).pack(anchor="w", padx=20, pady=(5, 0))
-                for idx, pay in enumerate(data["payments"], 1):
-                    text = f"{idx}. Payment: {pay['amount']:.2f}"
-                    if pay["time"]:
-                        text += f" | Time: {pay['time']}"
-                    tk.Label(card, text=text, font=("Arial", 11, "italic"),
-                            bg=colors["card_bg"], fg=colors["fg"]).pack(anchor="w", padx=40, pady=(2, 0))
+    def add_service_line(self, card, item):
+        colors = self.get_colors()
+        section = card["items"]
+        if card["item_count"] == 0:
+            tk.Label(section, text="Services", font=("Arial", 12, "underline"),
+                    bg=colors["card_bg"], fg=colors["fg"]).pack(anchor="w", padx=20, pady=(2, 0))
+        card["item_count"] += 1
+        text = f"{card['item_count']}. {item['item_name']}"
+        tk.Label(section, text=text, font=("Arial", 12, "bold"),
+                bg=colors["card_bg"], fg=colors["fg"]).pack(anchor="w", padx=40, pady=(2, 0))
+        if item["description"]:
+            tk.Label(section, text=f"   Fault: {item['description']}", font=("Arial", 11),
+                    bg=colors["card_bg"], fg=colors["fg"]).pack(anchor="w", padx=60, pady=0)
+        tk.Label(section, text=f"   Amount: {item['amount']:.2f}", font=("Arial", 11),
+                bg=colors["card_bg"], fg=colors["fg"]).pack(anchor="w", padx=60, pady=(0, 2))
+
+    def add_payment_line(self, card, pay):
+        colors = self.get_colors()
+        section = card["payments"]
+        if card["payment_count"] == 0:
+            tk.Label(section, text="Transactions", font=("Arial", 12, "underline"),
+                    bg=colors["card_bg"], fg=colors["fg"]).pack(anchor="w", padx=20, pady=(5, 0))
+        card["payment_count"] += 1
+        text = f"{card['payment_count']}. Payment: {pay['amount']:.2f}"
+        if pay["time"]:
+            text += f" | Time: {pay['time']}"
+        tk.Label(section, text=text, font=("Arial", 11, "italic"),
+                bg=colors["card_bg"], fg=colors["fg"]).pack(anchor="w", padx=40, pady=(2, 0))
 
 
     def update_theme(self):
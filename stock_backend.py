@@ -1,25 +1,59 @@
-import sqlite3
 import os
+import sys
+import threading
+from db_pool import DB_PATHS, get_connection
+from db_stock_ledger import read_stock_ledger, rebuild_stock_ledger
 
-def aggregate_items(db_path, table_name):
+# (database, product table) for each side of the stock; the purchase side
+# adds stock, the customer side takes it away.
+STOCK_SOURCES = {
+    "purchase": "purchase_product",
+    "customer": "customer_product",
+}
+
+# Per database: the ledger generation and highest change number folded in so
+# far, and the totals they add up to. A refresh only reads ledger rows changed
+# since the watermark; a rebuild (new generation) starts from scratch.
+# When neither PRAGMA data_version (commits from other connections) nor the
+# connection's own total_changes has moved, nothing is read at all.
+_ledger_cache = {}
+_cache_lock = threading.Lock()
+
+def aggregate_items(db_name):
     """
-    Returns a dict {item_name: total_qty} for all rows in the table,
-    summing up all quantities for each item (case-insensitive).
+    Returns a dict {item_name: total_qty} for the database's products,
+    summed per item (case-insensitive), kept up to date from its stock ledger.
     """
-    data = {}
+    db_path = DB_PATHS[db_name]
     if not os.path.exists(db_path):
-        return data
-    try:
-        conn = sqlite3.connect(db_path)
-        cur = conn.cursor()
-        cur.execute(f"SELECT item, qty FROM {table_name}")
-        for item, qty in cur.fetchall():
-            base = item.strip().lower()
-            data[base] = data.get(base, 0) + int(qty)
-        conn.close()
-    except Exception as e:
-        print(f"Error reading {db_path}: {e}")
-    return data
+        return {}
+    with _cache_lock:
+        cached = _ledger_cache.get(db_name)
+        try:
+            conn = get_connection(db_name)
+            stamp = (id(conn), conn.execute("PRAGMA data_version").fetchone()[0], conn.total_changes)
+            if cached is not None and cached["stamp"] == stamp:
+                return dict(cached["items"])
+            if cached is None:
+                generation, watermark, rows = read_stock_ledger(db_name)
+                data = {}
+            else:
+                generation, watermark, rows = read_stock_ledger(db_name, cached["watermark"])
+                data = cached["items"]
+                if generation != cached["generation"]:
+                    generation, watermark, rows = read_stock_ledger(db_name)
+                    data = {}
+        except Exception as e:
+            print(f"Error reading {db_path}: {e}")
+            return dict(cached["items"]) if cached else {}
+        for item, qty, line_count in rows:
+            if line_count > 0:
+                data[item] = qty
+            else:
+                data.pop(item, None)
+        _ledger_cache[db_name] = {"stamp": stamp, "generation": generation,
+                                  "watermark": watermark, "items": data}
+        return dict(data)
 
 def get_stock_data():
     """
@@ -27,8 +61,8 @@ def get_stock_data():
     where remaining_stock = total_purchased - total_sold, always >= 0.
     Also returns a dict of items where sales > purchases.
     """
-    purchases = aggregate_items(os.path.join("inward", "purchase.db"), "purchase_product")
-    sales = aggregate_items(os.path.join("outward", "customer.db"), "customer_product")
+    purchases = aggregate_items("purchase")
+    sales = aggregate_items("customer")
     all_items = set(purchases.keys()) | set(sales.keys())
     stock = {}
     missing_purchase = {}
@@ -39,3 +73,33 @@ def get_stock_data():
             missing_purchase[item] = sale_qty - purchase_qty
         stock[item] = max(0, purchase_qty - sale_qty)
     return stock, missing_purchase
+
+def rebuild_stock():
+    """
+    Rebuilds both stock ledgers from the raw product rows, e.g. after the
+    databases were edited by hand. Returns {db_name: number_of_items}.
+    """
+    counts = {}
+    for db_name, table in STOCK_SOURCES.items():
+        conn = get_connection(db_name)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            counts[db_name] = rebuild_stock_ledger(conn.cursor(), table)
+        print(f"[{db_name}] stock ledger rebuilt: {counts[db_name]} items")
+    with _cache_lock:
+        _ledger_cache.clear()
+    return counts
+
+if __name__ == "__main__":
+    # python stock_backend.py rebuild
+    # Importing the backends brings both databases up to date first
+    from outward import customer_backend
+    from inward import db_backend
+    if sys.argv[1:] == ["rebuild"]:
+        rebuild_stock()
+    else:
+        stock, missing_purchase = get_stock_data()
+        for item in sorted(stock):
+            print(f"{item}: {stock[item]}")
+        if missing_purchase:
+            print("Sold without purchase:", ", ".join(sorted(missing_purchase)))
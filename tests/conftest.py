@@ -0,0 +1,35 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import db_pool  # noqa: E402
+
+# The backends open and migrate their database as soon as they are imported,
+# so every database is pointed at a scratch folder before any test module
+# imports one; the shop's own .db files are never opened.
+_SCRATCH = tempfile.mkdtemp(prefix="trackedge-tests-")
+for _name in db_pool.DB_PATHS:
+    db_pool.DB_PATHS[_name] = os.path.join(_SCRATCH, f"{_name}.db")
+
+
+def pytest_sessionfinish(session, exitstatus):
+    db_pool.close_thread_connections()
+    shutil.rmtree(_SCRATCH, ignore_errors=True)
+
+
+@pytest.fixture
+def fresh_db(tmp_path):
+    """Points every database at a new, empty file in tmp_path for one test."""
+    db_pool.close_thread_connections()
+    saved = dict(db_pool.DB_PATHS)
+    for name in db_pool.DB_PATHS:
+        db_pool.DB_PATHS[name] = str(tmp_path / f"{name}.db")
+    yield tmp_path
+    db_pool.close_thread_connections()
+    db_pool.DB_PATHS.update(saved)
@@ -0,0 +1,34 @@
+from db_migrations import run_migrations
+from db_pool import get_connection
+from outward import customer_backend
+
+
+def test_recorded_payments_still_count_as_paid(fresh_db):
+    # A database from before the payment types were fixed
+    run_migrations("customer", [m for m in customer_backend.MIGRATIONS if m[0] < 14])
+    conn = get_connection("customer")
+    with conn:
+        conn.execute("""
+            INSERT INTO customer (customer_id, customer_name, place, phone_number, total_amount,
+                                  date, amount_paid, remaining_amount, status)
+            VALUES ('CU00001', 'Ravi', 'Salem', '9876543210', 100,
+                    '2024-05-01 10:00:00', 30, 70, 'pending')""")
+        conn.execute("""
+            INSERT INTO customer_product (customer_id, item, qty, price, description, amount, date)
+            VALUES ('CU00001', 'Bolt', 1, 100, '', 100, '2024-05-01 10:00:00')""")
+        # As add_customer_payment_to_record wrote it, without a type
+        conn.execute("""
+            INSERT INTO customer_payment (customer_id, payment_id, date, amount_paid)
+            VALUES ('CU00001', 'CREDIT-20240502100000', '2024-05-02 10:00:00', 40)""")
+        conn.execute("""
+            INSERT INTO customer_payment (customer_id, payment_id, date, amount_paid, transaction_type)
+            VALUES ('CU00001', 'REFUND-20240503100000', '2024-05-03 10:00:00', 10, 'debit')""")
+
+    customer_backend.create_tables()
+
+    types = dict(conn.execute("SELECT payment_id, transaction_type FROM customer_payment"))
+    assert types == {"CREDIT-20240502100000": "credit", "REFUND-20240503100000": "debit"}
+    assert customer_backend.verify_balances(fix=True) == []
+    assert conn.execute(
+        "SELECT total_amount, amount_paid, remaining_amount, status FROM customer").fetchone() == (
+        100, 30, 70, "pending")
@@ -0,0 +1,110 @@
+import pytest
+
+from db_migrations import find_table_scans, traced_statements
+from db_stock_ledger import read_stock_ledger
+from inward import db_backend
+from outward import customer_backend
+from service import service_backend
+
+NAME, PLACE, PHONE = "Ravi Kumar", "Salem", "9876543210"
+DAY = "2024-05-01 10:00:00"
+FROM, TO = "2024-05-01", "2024-05-31"
+
+# The lookups behind billing, the party views and the general views, called
+# for real so that the statements checked are the ones the app runs
+CUSTOMER_CALLS = [
+    (customer_backend.search_customer_by_name, "rav"),
+    (customer_backend.search_customer_by_name_words, ["rav"]),
+    (customer_backend.search_products_by_prefix, "bo"),
+    (customer_backend.check_customer_name_phone_match, NAME, PHONE),
+    (customer_backend.phone_exists, PHONE),
+    (customer_backend.get_customer_by_name, NAME),
+    (customer_backend.get_customer_by_phone, PHONE),
+    (customer_backend.get_customer_by_name_phone, NAME, PHONE),
+    (customer_backend.get_customer_id, NAME, PHONE, PLACE),
+    (customer_backend.get_products_by_customer_id, "CU00001"),
+    (customer_backend.get_payments_by_customer_id, "CU00001"),
+    (customer_backend.get_amount_paid_by_customer_id, "CU00001"),
+    (customer_backend.get_products_by_name_phone_and_date, NAME, PHONE, FROM, TO),
+    (customer_backend.get_all_products_by_name_phone, NAME, PHONE),
+    (customer_backend.get_history_by_day, NAME, PHONE),
+    (customer_backend.get_history_by_day, NAME, PHONE, FROM, TO),
+    (customer_backend.get_transactions_by_name_phone_and_date, NAME, PHONE, FROM, TO),
+    (customer_backend.get_customer_by_name_phone_and_date, NAME, PHONE, FROM, TO),
+    (customer_backend.get_customer_by_date_range, FROM, TO),
+    (customer_backend.list_sales_page,),
+    (customer_backend.list_sales_page, FROM, TO, (DAY, 10)),
+    (customer_backend.get_recent_customer_payments,),
+    (read_stock_ledger, "customer", 1),
+]
+
+PURCHASE_CALLS = [
+    (db_backend.search_purchasers_by_name, "rav"),
+    (db_backend.search_purchasers_by_name_words, ["rav"]),
+    (db_backend.search_products_by_prefix, "bo"),
+    (db_backend.check_purchaser_name_phone_match, NAME, PHONE),
+    (db_backend.phone_exists, PHONE),
+    (db_backend.get_purchaser_by_name, NAME),
+    (db_backend.get_purchaser_by_phone, PHONE),
+    (db_backend.get_purchases_by_name_phone, NAME, PHONE),
+    (db_backend.get_purchaser_id, NAME, PHONE, PLACE),
+    (db_backend.get_products_by_purchaser_id, "PU00001"),
+    (db_backend.get_payments_by_purchaser_id, "PU00001"),
+    (db_backend.get_amount_paid_by_purchaser_id, "PU00001"),
+    (db_backend.get_products_by_name_phone_and_date, NAME, PHONE, FROM, TO),
+    (db_backend.get_all_products_by_name_phone, NAME, PHONE),
+    (db_backend.get_history_by_day, NAME, PHONE),
+    (db_backend.get_history_by_day, NAME, PHONE, FROM, TO),
+    (db_backend.get_transactions_by_name_phone_and_date, NAME, PHONE, FROM, TO),
+    (db_backend.get_purchases_by_name_phone_and_date, NAME, PHONE, FROM, TO),
+    (db_backend.get_purchases_by_date_range, FROM, TO),
+    (db_backend.list_purchases_page,),
+    (db_backend.list_purchases_page, FROM, TO, (DAY, 10)),
+    (db_backend.get_recent_purchase_payments,),
+    (read_stock_ledger, "purchase", 1),
+]
+
+SERVICE_CALLS = [
+    (service_backend.search_customer_by_name, "rav"),
+    (service_backend.search_customer_by_name_words, ["rav"]),
+    (service_backend.check_name_phone_conflict, NAME, PHONE),
+    (service_backend.customer_exists_by_name, NAME),
+    (service_backend.customer_exists_by_phone, PHONE),
+    (service_backend.get_customer_by_name, NAME),
+    (service_backend.get_customer_by_phone, PHONE),
+    (service_backend.get_service_customer_by_name_phone, NAME, PHONE),
+    (service_backend.get_service_id, NAME, PHONE, PLACE),
+    (service_backend.get_customer_summary, NAME, PHONE),
+    (service_backend.get_service_timeline, NAME, PHONE),
+    (service_backend.get_service_timeline, NAME, PHONE, FROM, TO, (DAY, "item", 10)),
+    (service_backend.get_service_items_general_view, FROM, TO),
+    (service_backend.list_service_items_page,),
+    (service_backend.list_service_items_page, FROM, TO, (DAY, 10)),
+    (service_backend.get_recent_service_payments_general,),
+]
+
+
+@pytest.fixture
+def billed_db(fresh_db):
+    # One bill in each database, so that no lookup stops short for want of a row
+    customer_backend.create_tables()
+    db_backend.create_tables()
+    service_backend.initialize_db()
+    products = [("Bolt", 2, 50, "", 100)]
+    customer_backend.commit_customer_bill(NAME, PLACE, PHONE, products, 40, date_now=DAY)
+    db_backend.commit_purchase_bill(NAME, PLACE, PHONE, products, 40, date_now=DAY)
+    service_backend.commit_service_bill(NAME, PLACE, PHONE, "Motor", "rewind", 100, 40)
+
+
+@pytest.mark.parametrize("db_name, calls", [
+    ("customer", CUSTOMER_CALLS),
+    ("purchase", PURCHASE_CALLS),
+    ("service", SERVICE_CALLS),
+])
+def test_lookups_use_indexes(billed_db, db_name, calls):
+    with traced_statements(db_name) as statements:
+        for func, *args in calls:
+            func(*args)
+    assert statements
+    scans = find_table_scans(db_name, statements)
+    assert scans == {}, "\n\n".join(sql + "\n    " + "\n    ".join(plan) for sql, plan in scans.items())
@@ -0,0 +1,474 @@
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import ttk
+import data_worker
+
+# A table for result sets too large for a Treeview or a grid of Labels.
+# Only the rows that fit on screen are ever drawn: the body is a Canvas with
+# one slot per visible line (a background rectangle and a text item for each
+# cell), and scrolling re-fills the same slots from the row source, so a
+# table of 100k rows opens as fast, and with as few widgets, as one of 50.
+#
+# Rows come from a TableData: a list in memory, optionally extended a page
+# at a time by a fetch_more() callback as the view nears its end (e.g. the
+# keyset pages of db_paging). Sorting and filtering work on the rows held;
+# on a paged source the table first reads the remaining pages on a
+# data_worker thread, with fetch_more detached meanwhile so that scrolling
+# does not fetch alongside it, and sorts and filters again once they arrive.
+#
+# Filtering matches against a lowercase copy of each row, built once (by
+# build_index(), which callers can run on a worker thread), and keeps the
+# sorted order cached, so a keystroke costs one pass of substring checks
+# over prebuilt strings, or only over the previous matches while the search
+# text keeps growing.
+
+ROW_HEIGHT = 26
+FONT = ("Arial", 11)
+HEADING_FONT = ("Arial", 11, "bold")
+PREFETCH_ROWS = 50  # fetch the next page when the view is this close to the end
+FILTER_DELAY_MS = 150  # set_filter_later() waits this long for typing to pause
+
+
+def _sort_key(value):
+    # Numbers before text, text case-insensitively, blanks last
+    if value is None or value == "":
+        return (2, 0)
+    if isinstance(value, (int, float)):
+        return (0, value)
+    return (1, str(value).lower())
+
+
+def _haystack(row):
+    # Tabs keep a match from running across two columns
+    return "\t".join("" if v is None else str(v) for v in row).lower()
+
+
+def fetch_rest(fetch_more):
+    """
+    Calls fetch_more until it runs dry and returns (rows, their search text)
+    for TableData.add_rows(). Meant for a worker thread.
+    """
+    rows = []
+    while True:
+        page = fetch_more()
+        if not page:
+            return rows, [_haystack(row) for row in rows]
+        rows.extend(page)
+
+
+class TableData:
+    """
+    The rows of a VirtualTable, as tuples. fetch_more, if given, is called
+    with no arguments for the next page of rows and returns an empty list
+    once there are none left.
+    """
+
+    def __init__(self, rows=(), fetch_more=None):
+        self.all_rows = list(rows)
+        self.fetch_more = fetch_more
+        self._shown = None      # indexes into all_rows in display order; None shows all as is
+        self._sort = None       # (column, descending)
+        self._order = None      # all indexes sorted by _sort, kept until rows or sort change
+        self._text = ""
+        self._matches = None    # (text, matching indexes in display order) of the last filter
+        self._haystacks = []    # lowercase text of each row, for filter()
+
+    def count(self):
+        return len(self.all_rows) if self._shown is None else len(self._shown)
+
+    def has_more(self):
+        return self.fetch_more is not None
+
+    def load_more(self):
+        """Fetches one more page. Returns False once the source is exhausted."""
+        if self.fetch_more is None:
+            return False
+        page = self.fetch_more()
+        if not page:
+            self.fetch_more = None
+            return False
+        self.add_rows(page)
+        return True
+
+    def add_rows(self, rows, haystacks=None):
+        """
+        Appends rows, keeping the current sort and filter. haystacks, their
+        search text from fetch_rest(), saves building it here.
+        """
+        if haystacks is not None and len(self._haystacks) == len(self.all_rows):
+            self._haystacks.extend(haystacks)
+        self.all_rows.extend(rows)
+        self._order = None
+        self._matches = None
+        if self._shown is not None:
+            self._apply()
+
+    def rows(self, start, stop):
+        if self._shown is None:
+            return self.all_rows[start:stop]
+        return [self.all_rows[i] for i in self._shown[start:stop]]
+
+    def row(self, index):
+        return self.rows(index, index + 1)[0]
+
+    def sort(self, column, descending=False):
+        self._sort = (column, descending)
+        self._order = None
+        self._matches = None
+        self._apply()
+
+    def filter(self, text):
+        """Keeps only the rows with text in any of their values (case-insensitive)."""
+        self._text = text.strip().lower()
+        self._apply()
+
+    def build_index(self):
+        """Builds the lowercase search text of the rows not indexed yet."""
+        self._haystacks.extend(_haystack(row) for row in self.all_rows[len(self._haystacks):])
+
+    def _apply(self):
+        if self._sort is not None and self._order is None:
+            column, descending = self._sort
+            rows = self.all_rows
+            self._order = sorted(range(len(rows)), key=lambda i: _sort_key(rows[i][column]),
+                                 reverse=descending)
+        if not self._text:
+            self._shown = self._order
+            self._matches = None
+            return
+        self.build_index()
+        text = self._text
+        candidates = self._order if self._order is not None else range(len(self.all_rows))
+        if self._matches is not None and self._matches[0] in text:
+            # Anything matching the longer text matched the shorter one
+            candidates = self._matches[1]
+        haystacks = self._haystacks
+        self._shown = [i for i in candidates if text in haystacks[i]]
+        self._matches = (text, self._shown)
+
+
+class VirtualTable(tk.Frame):
+    """
+    A scrolling table that draws only its visible rows.
+
+    columns are the heading texts; clicking a heading sorts by it.
+    formatters maps a column index to a function turning a value into its
+    display text (sorting and filtering still see the value). actions is a
+    list of (label, callback) drawn as buttons in a last "Actions" column;
+    callback gets the row. on_select(row) runs when a row is clicked and
+    on_activate(row) when it is double-clicked or Enter is pressed.
+    colors is a themes.THEMES entry.
+    """
+
+    def __init__(self, parent, columns, colors, data=None, formatters=None, actions=None,
+                 on_select=None, on_activate=None, empty_text="No records found"):
+        super().__init__(parent, bg=colors["bg"])
+        self.colors = colors
+        self.actions = actions or []
+        self.on_select = on_select
+        self.on_activate = on_activate
+        self.empty_text = empty_text
+        self.font = tkfont.Font(self, font=FONT)
+        self.heading_font = tkfont.Font(self, font=HEADING_FONT)
+
+        self.data = TableData()
+        self.top = 0            # index of the row in the first slot
+        self.selected = None    # index of the selected row
+        self.sort_column = None
+        self.sort_descending = False
+        self.filter_after = None  # pending set_filter_later() call
+        self.slots = []         # per visible line: {"bg", "cells", "actions"} canvas item ids
+        self.column_x = []      # (left, right) of each column, the actions column last
+
+        self.header = tk.Canvas(self, height=ROW_HEIGHT + 4, highlightthickness=0)
+        self.body = tk.Canvas(self, highlightthickness=0, takefocus=1)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.header.grid(row=0, column=0, sticky="ew")
+        self.body.grid(row=1, column=0, sticky="nsew")
+        self.scrollbar.grid(row=1, column=1, sticky="ns")
+        self.grid_rowconfigure(1, weight=1)
+        self.grid_columnconfigure(0, weight=1)
+
+        self.body.bind("<Configure>", lambda e: self._layout())
+        self.header.bind("<Button-1>", self._on_header_click)
+        self.body.bind("<Button-1>", self._on_click)
+        self.body.bind("<Double-Button-1>", self._on_double_click)
+        self.body.bind("<Return>", lambda e: self._activate(self.selected))
+        self.body.bind("<Up>", lambda e: self._move_selection(-1))
+        self.body.bind("<Down>", lambda e: self._move_selection(1))
+        self.body.bind("<Prior>", lambda e: self.yview("scroll", -1, "pages"))
+        self.body.bind("<Next>", lambda e: self.yview("scroll", 1, "pages"))
+        for widget in (self.header, self.body):
+            widget.bind("<MouseWheel>", self._on_mousewheel)
+            widget.bind("<Button-4>", lambda e: self._scroll_units(-3))
+            widget.bind("<Button-5>", lambda e: self._scroll_units(3))
+
+        self.set_columns(columns, formatters)
+        if data is not None:
+            self.set_data(data)
+        self.set_colors(colors)
+
+    # --- Public interface ---
+
+    def set_columns(self, columns, formatters=None):
+        """Replaces the columns; call set_data() with rows to match."""
+        self.columns = list(columns)
+        self.formatters = formatters or {}
+        self.sort_column = None
+        self._layout()
+
+    def set_data(self, data):
+        """Shows data, a TableData or a list of row tuples, from the top."""
+        self.data = data if isinstance(data, TableData) else TableData(data)
+        self.top = 0
+        self.selected = None
+        self.sort_column = None
+        self._draw_header()
+        self._redraw()
+
+    def set_filter(self, text):
+        """Shows only the rows containing text; an empty text shows them all."""
+        self.data.filter(text)
+        self.top = 0
+        self.selected = None
+        self._redraw()
+        if text.strip():
+            self._load_rest()
+
+    def set_filter_later(self, text):
+        """set_filter() once typing pauses for FILTER_DELAY_MS."""
+        if self.filter_after is not None:
+            self.after_cancel(self.filter_after)
+        self.filter_after = self.after(FILTER_DELAY_MS, self._run_filter, text)
+
+    def _run_filter(self, text):
+        self.filter_after = None
+        self.set_filter(text)
+
+    def sort_by(self, column, descending=False):
+        self.data.sort(column, descending)
+        self.sort_column = column
+        self.sort_descending = descending
+        self.top = 0
+        self.selected = None
+        self._draw_header()
+        self._redraw()
+        self._load_rest()
+
+    def _load_rest(self):
+        # Reads the pages not fetched yet on a worker thread; see the top
+        data = self.data
+        if not data.has_more():
+            return
+        fetch_more, data.fetch_more = data.fetch_more, None
+        data_worker.submit(self, fetch_rest, fetch_more,
+                           on_result=lambda result: self._add_rest(data, *result),
+                           on_error=lambda e: print(f"Could not load the remaining rows: {e}"))
+
+    def _add_rest(self, data, rows, haystacks):
+        if data is not self.data:
+            return  # set_data() has replaced it since
+        data.add_rows(rows, haystacks)
+        self._redraw()
+
+    def selected_row(self):
+        if self.selected is None or self.selected >= self.data.count():
+            return None
+        return self.data.row(self.selected)
+
+    def set_colors(self, colors):
+        self.colors = colors
+        self.configure(bg=colors["bg"])
+        self.header.configure(bg=colors.get("table_head_bg", colors["bg"]))
+        self.body.configure(bg=colors.get("table_bg", colors["bg"]))
+        self._layout()
+
+    def yview(self, *args):
+        """Scrollbar protocol: ('moveto', fraction) or ('scroll', n, 'units'|'pages')."""
+        if args[0] == "moveto":
+            self._scroll_to(int(float(args[1]) * self.data.count()))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= max(1, self._full_rows() - 1)
+            self._scroll_units(amount)
+
+    # --- Drawing ---
+
+    def _full_rows(self):
+        return max(1, self.body.winfo_height() // ROW_HEIGHT)
+
+    def _layout(self):
+        # Lays out columns and rebuilds the slots for the current size
+        width = self.body.winfo_width()
+        height = self.body.winfo_height()
+        if width <= 1 or not hasattr(self, "columns"):
+            return
+        count = len(self.columns) + (1 if self.actions else 0)
+        step = width / max(1, count)
+        self.column_x = [(round(i * step), round((i + 1) * step)) for i in range(count)]
+
+        colors = self.colors
+        table_bg = colors.get("table_bg", colors["bg"])
+        table_fg = colors.get("table_fg", colors["fg"])
+        border = colors.get("table_border", table_fg)
+        self.body.delete("all")
+        self.slots = []
+        for i in range(height // ROW_HEIGHT + 1):
+            y = i * ROW_HEIGHT
+            slot = {
+                "bg": self.body.create_rectangle(0, y, width, y + ROW_HEIGHT,
+                                                 fill=table_bg, outline=border),
+                "cells": [],
+                "actions": [],
+            }
+            for left, right in self.column_x[:len(self.columns)]:
+                slot["cells"].append(self.body.create_text(
+                    (left + right) / 2, y + ROW_HEIGHT / 2, text="", font=self.font, fill=table_fg))
+            if self.actions:
+                left, right = self.column_x[-1]
+                button_width = (right - left) / len(self.actions)
+                for k, (label, _) in enumerate(self.actions):
+                    x0 = left + k * button_width
+                    tags = ("action", f"action{k}")
+                    slot["actions"].append(self.body.create_rectangle(
+                        x0 + 3, y + 3, x0 + button_width - 3, y + ROW_HEIGHT - 3,
+                        fill=colors.get("button_bg", table_bg), outline=border, tags=tags))
+                    slot["actions"].append(self.body.create_text(
+                        x0 + button_width / 2, y + ROW_HEIGHT / 2, text=label,
+                        font=self.font, fill=colors["fg"], tags=tags))
+            self.slots.append(slot)
+        self.body.create_text(width / 2, ROW_HEIGHT, text=self.empty_text, font=self.font,
+                              fill=table_fg, tags="empty", state="hidden")
+        self._draw_header()
+        self._redraw()
+
+    def _draw_header(self):
+        colors = self.colors
+        head_fg = colors.get("table_head_fg", colors["fg"])
+        self.header.delete("all")
+        titles = self.columns + (["Actions"] if self.actions else [])
+        for index, ((left, right), title) in enumerate(zip(self.column_x, titles)):
+            if index == self.sort_column:
+                title += " ▼" if self.sort_descending else " ▲"
+            self.header.create_text((left + right) / 2, (ROW_HEIGHT + 4) / 2,
+                                    text=self._fit(title, right - left - 8, self.heading_font),
+                                    font=self.heading_font, fill=head_fg)
+
+    def _redraw(self):
+        if not self.slots:
+            return
+        full = self._full_rows()
+        if self.top + len(self.slots) + PREFETCH_ROWS > self.data.count() and self.data.has_more():
+            self.data.load_more()
+        count = self.data.count()
+        self.top = max(0, min(self.top, count - full))
+        rows = self.data.rows(self.top, self.top + len(self.slots))
+
+        colors = self.colors
+        table_bg = colors.get("table_bg", colors["bg"])
+        selected_bg = colors.get("info", colors.get("table_head_bg", table_bg))
+        for i, slot in enumerate(self.slots):
+            if i >= len(rows):
+                for item in [slot["bg"]] + slot["cells"] + slot["actions"]:
+                    self.body.itemconfigure(item, state="hidden")
+                continue
+            row = rows[i]
+            fill = selected_bg if self.top + i == self.selected else table_bg
+            self.body.itemconfigure(slot["bg"], state="normal", fill=fill)
+            for column, item in enumerate(slot["cells"]):
+                value = row[column] if column < len(row) else ""
+                formatter = self.formatters.get(column)
+                if formatter is not None:
+                    text = formatter(value)
+                else:
+                    text = "" if value is None else str(value)
+                left, right = self.column_x[column]
+                self.body.itemconfigure(item, state="normal", text=self._fit(text, right - left - 8))
+            for item in slot["actions"]:
+                self.body.itemconfigure(item, state="normal")
+        self.body.itemconfigure("empty", state="hidden" if count else "normal")
+
+        if count:
+            self.scrollbar.set(self.top / count, min(1.0, (self.top + full) / count))
+        else:
+            self.scrollbar.set(0, 1)
+
+    def _fit(self, text, width, font=None):
+        # Cuts text to width pixels, ending it with an ellipsis
+        font = font or self.font
+        if font.measure(text) <= width:
+            return text
+        low, high = 0, len(text)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if font.measure(text[:middle] + "…") <= width:
+                low = middle
+            else:
+                high = middle - 1
+        return text[:low] + "…"
+
+    # --- Events ---
+
+    def _scroll_to(self, index):
+        self.top = index
+        self._redraw()
+
+    def _scroll_units(self, amount):
+        self._scroll_to(self.top + amount)
+        return "break"
+
+    def _on_mousewheel(self, event):
+        return self._scroll_units(-3 if event.delta > 0 else 3)
+
+    def _row_at(self, y):
+        index = self.top + int(y // ROW_HEIGHT)
+        return index if index < self.data.count() else None
+
+    def _on_header_click(self, event):
+        for column, (left, right) in enumerate(self.column_x[:len(self.columns)]):
+            if left <= event.x < right:
+                descending = self.sort_column == column and not self.sort_descending
+                self.sort_by(column, descending)
+                break
+
+    def _on_click(self, event):
+        self.body.focus_set()
+        index = self._row_at(event.y)
+        if index is None:
+            return
+        for tag in self.body.gettags("current"):
+            if tag.startswith("action") and tag != "action":
+                _, callback = self.actions[int(tag[len("action"):])]
+                callback(self.data.row(index))
+                return
+        self._select(index)
+
+    def _on_double_click(self, event):
+        index = self._row_at(event.y)
+        if index is not None and "action" not in self.body.gettags("current"):
+            self._activate(index)
+
+    def _select(self, index):
+        self.selected = index
+        self._redraw()
+        if self.on_select is not None:
+            self.on_select(self.data.row(index))
+
+    def _activate(self, index):
+        if index is not None and index < self.data.count() and self.on_activate is not None:
+            self.on_activate(self.data.row(index))
+
+    def _move_selection(self, step):
+        count = self.data.count()
+        if not count:
+            return "break"
+        index = 0 if self.selected is None else max(0, min(count - 1, self.selected + step))
+        # Keep the selected row on screen
+        full = self._full_rows()
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + full:
+            self.top = index - full + 1
+        self._select(index)
+        return "break"